@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of restful-distributed-lock-manager released under the MIT license.
+# See the LICENSE file for more information.
+
+"""
+In-process micro-benchmarks of the lock manager hot paths
+
+- Lock.__init__ and Lock.to_dict
+- LockManager.add_lock on many (cold) resources
+- LockManager.add_lock on a single resource with many waiters
+- Resource.remove_active_lock (hand-off to the next waiter)
+- Resource.delete(uid) of waiting locks (in random order)
+- memory per lock and memory per resource (needs python >= 3.4 for
+  the tracemalloc module)
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from rdlm.lock import LockManager, Lock, Resource  # noqa
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+try:
+    timer = time.perf_counter
+except AttributeError:
+    timer = time.time
+
+
+def result(name, count, elapsed):
+    '''
+    @summary: returns the result of a timed benchmark
+    @result: python dict
+    '''
+    return {"name": name, "count": count, "ops_per_s": count / elapsed,
+            "us_per_op": elapsed * 1000000.0 / count}
+
+
+def bench_lock_init(count):
+    before = timer()
+    for i in range(0, count):
+        Lock("resource", "bench", 5, 300)
+    return result("lock_init", count, timer() - before)
+
+
+def bench_lock_to_dict(count):
+    lock = Lock("resource", "bench", 5, 300)
+    before = timer()
+    for i in range(0, count):
+        lock.to_dict()
+    return result("lock_to_dict", count, timer() - before)
+
+
+def bench_add_lock_cold(resources):
+    manager = LockManager()
+    locks = [Lock("resource%i" % i, "bench", 5, 300) for i in range(0, resources)]
+    before = timer()
+    for lock in locks:
+        manager.add_lock(lock.resource_name, lock)
+    return result("add_lock_cold_resources", resources, timer() - before)
+
+
+def bench_waiters(waiters):
+    '''
+    @summary: add_lock of waiters, hand-offs and deletes by uid on a single resource
+    @result: python list of dicts
+    '''
+    res = []
+    resource = Resource("resource")
+    locks = [Lock("resource", "bench", 3600, 3600) for i in range(0, waiters)]
+    before = timer()
+    for lock in locks:
+        resource.add_lock(lock)
+    res.append(result("add_lock_waiters", waiters, timer() - before))
+    handoffs = waiters // 2
+    before = timer()
+    for i in range(0, handoffs):
+        resource.remove_active_lock(timeout=False, uid=locks[i].uid)
+    res.append(result("remove_active_lock_handoff", handoffs, timer() - before))
+    remaining = [lock.uid for lock in locks[handoffs + 1:]]
+    random.Random(0).shuffle(remaining)
+    before = timer()
+    for uid in remaining:
+        resource.delete(uid)
+    res.append(result("delete_waiting_uid", len(remaining), timer() - before))
+    return res
+
+
+def measure_memory(function, count):
+    '''
+    @summary: measures the memory allocated (and kept) by the given function
+    @param function: function which returns the objects to keep
+    @param count: number of objects built by the function
+    @result: number of bytes per object (or None without tracemalloc)
+    '''
+    if tracemalloc is None:
+        return None
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = function()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del(kept)
+    return float(after - before) / count
+
+
+def bench_memory(count):
+    def locks():
+        return [Lock("resource", "bench", 5, 300) for i in range(0, count)]
+
+    def waiting_locks():
+        resource = Resource("resource")
+        for i in range(0, count):
+            resource.add_lock(Lock("resource", "bench", 3600, 3600))
+        return resource
+
+    def resources():
+        manager = LockManager()
+        for i in range(0, count):
+            manager.add_lock("resource%i" % i, Lock("resource%i" % i, "bench", 5, 300))
+        return manager
+
+    lock_bytes = measure_memory(locks, count)
+    waiting_bytes = measure_memory(waiting_locks, count)
+    resource_bytes = measure_memory(resources, count)
+    res = {"name": "memory", "count": count, "bytes_per_lock": lock_bytes,
+           "bytes_per_waiting_lock": waiting_bytes,
+           "bytes_per_resource_with_lock": resource_bytes}
+    if resource_bytes is not None:
+        res["bytes_per_resource"] = resource_bytes - lock_bytes
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--operations", type=int, default=100000,
+                        help="number of Lock.__init__ and Lock.to_dict calls")
+    parser.add_argument("--resources", type=int, default=1000000,
+                        help="number of cold resources")
+    parser.add_argument("--waiters", type=int, default=100000,
+                        help="number of waiters on a single resource")
+    parser.add_argument("--memory-objects", type=int, default=100000,
+                        help="number of objects for memory measurements")
+    args = parser.parse_args()
+    res = [bench_lock_init(args.operations), bench_lock_to_dict(args.operations),
+           bench_add_lock_cold(args.resources)]
+    res.extend(bench_waiters(args.waiters))
+    res.append(bench_memory(args.memory_objects))
+    print(json.dumps(res, indent=4, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,406 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of restful-distributed-lock-manager released under the MIT license.
+# See the LICENSE file for more information.
+
+"""
+Load generator and benchmark of the HTTP API
+
+The daemon is started locally (or an already running daemon is used with
+--url) and driven by many concurrent clients. Each client uses its own
+keep-alive HTTP/1.1 connection (asyncio, one process).
+
+Scenarios:
+- hot: all clients acquire and release locks on a single resource
+- cold: each client acquires and releases locks on its own resources
+- deep_queue: a deep wait queue on a single resource is drained
+- mass_expiry: many locks expire at the same time while clients acquire
+  and release locks on other resources
+- admin_listing: GET /resources in a loop while clients acquire and
+  release locks on many resources
+
+Results (ops/s and p50/p99/p999 latencies in milliseconds) are printed
+as JSON, so that results of different releases can be compared.
+
+Note: this script needs python >= 3.7 (the daemon itself can be run by
+another python interpreter, see --python).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.parse
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+class HTTPError(Exception):
+    pass
+
+
+class Connection(object):
+    '''
+    Minimal keep-alive HTTP/1.1 client connection (one request at a time)
+    '''
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, body=None):
+        '''
+        @summary: sends a request and reads the response
+        @result: tuple (status code, headers dict with lower case names, body bytes)
+        '''
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = b"" if body is None else body.encode("utf-8")
+        head = "%s %s HTTP/1.1\r\nHost: %s:%i\r\nContent-Length: %i\r\n\r\n" % (
+            method, path, self.host, self.port, len(payload))
+        self.writer.write(head.encode("ascii") + payload)
+        status_line = await self.reader.readline()
+        if not status_line:
+            self.close()
+            raise HTTPError("connection closed by the server")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, value = line.decode("latin-1").split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            # (streamed responses, GET /resources for example)
+            data = await self.read_chunks()
+        else:
+            length = int(headers.get("content-length", "0"))
+            data = await self.reader.readexactly(length) if length else b""
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, headers, data
+
+    async def read_chunks(self):
+        '''
+        @summary: reads a body with the chunked transfer encoding
+        @result: body bytes
+        '''
+        chunks = []
+        while True:
+            size_line = await self.reader.readline()
+            if not size_line:
+                self.close()
+                raise HTTPError("connection closed by the server")
+            size = int(size_line.split(b";", 1)[0].strip(), 16)
+            if size == 0:
+                break
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readline()
+        # (trailers)
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+        return b"".join(chunks)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = None
+        self.writer = None
+
+
+class Client(object):
+    '''
+    HTTP client with one keep-alive connection per (host, port)
+
+    307 redirects (sharded mode) are followed
+    '''
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.connections = {}
+
+    async def request(self, method, url, body=None):
+        for i in range(0, 3):
+            parsed = urllib.parse.urlsplit(urllib.parse.urljoin(self.base_url, url))
+            key = (parsed.hostname, parsed.port or 80)
+            connection = self.connections.get(key)
+            if connection is None:
+                connection = Connection(*key)
+                self.connections[key] = connection
+            path = parsed.path + ("?" + parsed.query if parsed.query else "")
+            status, headers, data = await connection.request(method, path, body)
+            if status != 307:
+                return status, headers, data
+            url = headers["location"]
+        raise HTTPError("too many redirects")
+
+    def close(self):
+        for connection in self.connections.values():
+            connection.close()
+
+
+class Recorder(object):
+    '''
+    Latency recorder of a scenario
+    '''
+
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = {}
+
+    def record(self, name, latency, status=None):
+        self.latencies.setdefault(name, []).append(latency)
+        if status is not None:
+            key = "%s_%i" % (name, status)
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    @staticmethod
+    def percentile(values, ratio):
+        index = min(len(values) - 1, int(len(values) * ratio))
+        return values[index] * 1000.0
+
+    def summary(self, elapsed):
+        res = {"elapsed_s": elapsed, "statuses": self.statuses}
+        for name, values in self.latencies.items():
+            values.sort()
+            res[name] = {"count": len(values),
+                         "ops_per_s": len(values) / elapsed,
+                         "p50_ms": self.percentile(values, 0.5),
+                         "p99_ms": self.percentile(values, 0.99),
+                         "p999_ms": self.percentile(values, 0.999)}
+        return res
+
+
+async def acquire(client, recorder, resource, wait=60, lifetime=300, name="acquire"):
+    body = json.dumps({"title": "http_load", "wait": wait, "lifetime": lifetime})
+    before = time.time()
+    status, headers, data = await client.request("POST", "/locks/%s" % resource, body)
+    recorder.record(name, time.time() - before, status)
+    if status != 201:
+        return None
+    return headers["location"]
+
+
+async def release(client, recorder, location):
+    before = time.time()
+    status, headers, data = await client.request("DELETE", location)
+    recorder.record("release", time.time() - before, status)
+
+
+async def run_clients(base_url, clients, coroutine_function):
+    http_clients = [Client(base_url) for i in range(0, clients)]
+    try:
+        await asyncio.gather(*[coroutine_function(i, http_clients[i])
+                               for i in range(0, clients)])
+    finally:
+        for client in http_clients:
+            client.close()
+
+
+async def scenario_hot(args, recorder):
+    state = {"last_release": None}
+
+    async def loop(index, client):
+        for i in range(0, args.operations // args.clients):
+            asked = time.time()
+            location = await acquire(client, recorder, "hot")
+            if location is None:
+                continue
+            last_release = state["last_release"]
+            if last_release is not None and last_release > asked:
+                # (the lock was handed off by another client)
+                recorder.record("handoff", time.time() - last_release)
+            await release(client, recorder, location)
+            state["last_release"] = time.time()
+
+    await run_clients(args.url, args.clients, loop)
+
+
+async def scenario_cold(args, recorder):
+    async def loop(index, client):
+        for i in range(0, args.operations // args.clients):
+            location = await acquire(client, recorder, "cold%ix%i" % (index, i % 10))
+            if location is not None:
+                await release(client, recorder, location)
+
+    await run_clients(args.url, args.clients, loop)
+
+
+async def scenario_deep_queue(args, recorder):
+    holder = Client(args.url)
+    location = await acquire(holder, recorder, "deep", name="holder")
+    queued = asyncio.Event()
+    state = {"waiters": 0, "last_release": None}
+
+    async def waiter(index, client):
+        state["waiters"] += 1
+        if state["waiters"] == args.clients:
+            queued.set()
+        location = await acquire(client, recorder, "deep", wait=600)
+        if location is None:
+            return
+        recorder.record("handoff", time.time() - state["last_release"])
+        await release(client, recorder, location)
+        state["last_release"] = time.time()
+
+    async def drain():
+        await queued.wait()
+        # (let the last waiters reach the server)
+        await asyncio.sleep(1)
+        state["last_release"] = time.time()
+        await release(holder, recorder, location)
+
+    await asyncio.gather(run_clients(args.url, args.clients, waiter), drain())
+    holder.close()
+
+
+async def scenario_mass_expiry(args, recorder):
+    async def expiring(index, client):
+        for i in range(0, args.operations // args.clients):
+            await acquire(client, recorder, "expiry%ix%i" % (index, i), lifetime=2,
+                          name="setup")
+
+    await run_clients(args.url, args.clients, expiring)
+    deadline = time.time() + 2
+
+    async def loop(index, client):
+        while time.time() < deadline + 2:
+            location = await acquire(client, recorder, "other%i" % index)
+            if location is not None:
+                await release(client, recorder, location)
+
+    await run_clients(args.url, args.clients, loop)
+
+
+async def scenario_admin_listing(args, recorder):
+    state = {"running": True}
+
+    async def lister():
+        client = Client(args.url)
+        while state["running"]:
+            before = time.time()
+            status, headers, data = await client.request("GET", "/resources")
+            recorder.record("listing", time.time() - before, status)
+        client.close()
+
+    async def loop(index, client):
+        held = [await acquire(client, recorder, "held%ix%i" % (index, i)) for i in range(0, 10)]
+        for i in range(0, args.operations // args.clients):
+            location = await acquire(client, recorder, "admin%i" % index)
+            if location is not None:
+                await release(client, recorder, location)
+        for location in held:
+            if location is not None:
+                await release(client, recorder, location)
+
+    async def workload():
+        await run_clients(args.url, args.clients, loop)
+        state["running"] = False
+
+    await asyncio.gather(lister(), workload())
+
+
+SCENARIOS = {
+    "hot": scenario_hot,
+    "cold": scenario_cold,
+    "deep_queue": scenario_deep_queue,
+    "mass_expiry": scenario_mass_expiry,
+    "admin_listing": scenario_admin_listing,
+}
+
+
+async def clean(args):
+    client = Client(args.url)
+    try:
+        await client.request("DELETE", "/resources")
+    finally:
+        client.close()
+
+
+async def wait_for_daemon(url, timeout=20):
+    before = time.time()
+    while True:
+        client = Client(url)
+        try:
+            status, headers, data = await client.request("GET", "/")
+            if status == 200:
+                return
+        except OSError:
+            if time.time() - before > timeout:
+                raise
+        finally:
+            client.close()
+        await asyncio.sleep(0.1)
+
+
+async def run(args):
+    await wait_for_daemon(args.url)
+    results = []
+    for name in args.scenarios:
+        await clean(args)
+        recorder = Recorder()
+        before = time.time()
+        await SCENARIOS[name](args, recorder)
+        res = recorder.summary(time.time() - before)
+        res["scenario"] = name
+        res["clients"] = args.clients
+        results.append(res)
+    await clean(args)
+    return results
+
+
+def start_daemon(args):
+    command = [args.python, os.path.join(ROOT, "rdlm-daemon.py"), "--port=%i" % args.port,
+               "--logging=warning"] + args.daemon_arg
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([ROOT, env.get("PYTHONPATH", "")])
+    return subprocess.Popen(command, env=env)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None,
+                        help="url of an already running daemon (else a daemon is started)")
+    parser.add_argument("--port", type=int, default=8889, help="port of the started daemon")
+    parser.add_argument("--python", default=sys.executable,
+                        help="python interpreter of the started daemon")
+    parser.add_argument("--daemon-arg", action="append", default=[],
+                        help="extra argument of the started daemon (--workers=4 for example)")
+    parser.add_argument("--clients", type=int, default=100, help="number of clients")
+    parser.add_argument("--operations", type=int, default=10000,
+                        help="number of acquired locks (for each scenario)")
+    parser.add_argument("--scenario", dest="scenarios", action="append",
+                        choices=sorted(SCENARIOS.keys()),
+                        help="scenario to run (can be repeated, default: all)")
+    args = parser.parse_args()
+    if not args.scenarios:
+        args.scenarios = ["hot", "cold", "deep_queue", "mass_expiry", "admin_listing"]
+    daemon = None
+    if args.url is None:
+        args.url = "http://127.0.0.1:%i" % args.port
+        daemon = start_daemon(args)
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        if daemon is not None:
+            daemon.send_signal(signal.SIGTERM)
+            try:
+                daemon.wait(10)
+            except subprocess.TimeoutExpired:
+                daemon.kill()
+    print(json.dumps(results, indent=4, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
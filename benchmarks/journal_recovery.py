@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of restful-distributed-lock-manager released under the MIT license.
+# See the LICENSE file for more information.
+
+"""
+Benchmark of the journal (persistence of active locks)
+
+- overhead of the journal on lock acquire/release
+- recovery time of a journal with many active locks
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from rdlm.lock import LockManager, Lock  # noqa
+from rdlm.journal import Journal  # noqa
+
+
+def bench_overhead(directory, operations, batch):
+    '''
+    @summary: measures acquire + release cost with and without journal
+    @result: python dict (microseconds per acquire + release)
+    '''
+    res = {}
+    for with_journal in (False, True):
+        manager = LockManager()
+        journal = None
+        if with_journal:
+            journal = Journal(directory)
+            manager.add_listener(journal.on_event)
+        before = time.time()
+        for i in range(0, operations):
+            lock = Lock("resource%i" % i, "bench", 5, 300)
+            manager.add_lock(lock.resource_name, lock)
+            manager.delete_lock(lock.resource_name, lock.uid)
+            if journal and i % batch == 0:
+                journal.flush()
+        if journal:
+            journal.close()
+        key = "with_journal_us" if with_journal else "without_journal_us"
+        res[key] = (time.time() - before) * 1000000.0 / operations
+    return res
+
+
+def bench_recovery(directory, locks):
+    '''
+    @summary: measures the recovery time of a journal with the given number of active locks
+    @result: python dict
+    '''
+    manager = LockManager()
+    journal = Journal(directory)
+    manager.add_listener(journal.on_event)
+    for i in range(0, locks):
+        manager.add_lock("resource%i" % i, Lock("resource%i" % i, "bench", 5, 3600))
+    journal.close()
+    size = os.path.getsize(os.path.join(directory, "journal.log"))
+    manager = LockManager()
+    journal = Journal(directory)
+    before = time.time()
+    count = journal.recover(manager)
+    recovery = time.time() - before
+    before = time.time()
+    journal.snapshot(manager)
+    snapshot = time.time() - before
+    journal.close()
+    return {"locks": count, "journal_bytes": size, "recovery_s": recovery,
+            "snapshot_s": snapshot}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--locks", type=int, default=1000000,
+                        help="number of active locks in the recovered journal")
+    parser.add_argument("--operations", type=int, default=100000,
+                        help="number of acquire + release for the overhead benchmark")
+    parser.add_argument("--batch", type=int, default=1000,
+                        help="number of acquire + release between two journal flushes")
+    args = parser.parse_args()
+    directory = tempfile.mkdtemp()
+    try:
+        res = {"overhead": bench_overhead(os.path.join(directory, "overhead"),
+                                          args.operations, args.batch),
+               "recovery": bench_recovery(os.path.join(directory, "recovery"), args.locks)}
+    finally:
+        shutil.rmtree(directory)
+    print(json.dumps(res, indent=4, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
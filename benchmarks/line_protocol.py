@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of restful-distributed-lock-manager released under the MIT license.
+# See the LICENSE file for more information.
+
+"""
+Benchmark of the line-oriented TCP protocol compared to the HTTP API
+
+The daemon is started locally (with --line_port) and many concurrent
+clients acquire and release locks on their own resources (as in the
+"cold" scenario of http_load.py):
+
+- http: one keep-alive HTTP/1.1 connection per client
+- line: one line protocol connection per client (one request at a time)
+- line_pipelined: one line protocol connection per client, with
+  --pipeline ACQUIRE (then RELEASE) requests sent at once
+
+Results (ops/s and p50/p99/p999 latencies in milliseconds) are printed
+as JSON.
+
+Note: this script needs python >= 3.7 (the daemon itself can be run by
+another python interpreter, see --python).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from http_load import Client, Recorder, acquire, release, wait_for_daemon, ROOT  # noqa
+
+
+class LineClient(object):
+    '''
+    Minimal client of the line protocol (replies are matched by tag)
+    '''
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+        self.counter = 0
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    def send(self, command):
+        '''
+        @summary: sends a request (without waiting for the reply)
+        @result: tag of the request
+        '''
+        self.counter = self.counter + 1
+        tag = str(self.counter)
+        self.writer.write(("%s %s\n" % (tag, command)).encode("utf-8"))
+        return tag
+
+    async def read_replies(self, count):
+        '''
+        @summary: reads some replies
+        @result: python dict (tag => list of reply tokens)
+        '''
+        replies = {}
+        for i in range(0, count):
+            tokens = (await self.reader.readline()).decode("utf-8").split()
+            if not tokens:
+                raise IOError("connection closed by the server")
+            replies[tokens[0]] = tokens[1:]
+        return replies
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def run_http(args, recorder):
+    async def loop(index):
+        client = Client(args.url)
+        try:
+            for i in range(0, args.operations // args.clients):
+                location = await acquire(client, recorder, "http%ix%i" % (index, i % 10))
+                if location is not None:
+                    await release(client, recorder, location)
+        finally:
+            client.close()
+
+    await asyncio.gather(*[loop(i) for i in range(0, args.clients)])
+
+
+async def run_line(args, recorder, pipeline):
+    async def loop(index):
+        client = LineClient("127.0.0.1", args.line_port)
+        await client.connect()
+        try:
+            for i in range(0, args.operations // (args.clients * pipeline)):
+                names = ["line%ix%i" % (index, j) for j in range(0, pipeline)]
+                before = time.time()
+                tags = [(client.send("ACQUIRE %s 60 300" % name), name) for name in names]
+                replies = await client.read_replies(pipeline)
+                elapsed = time.time() - before
+                uids = []
+                for tag, name in tags:
+                    recorder.record("acquire", elapsed, 201 if replies[tag][0] == "OK" else 0)
+                    if replies[tag][0] == "OK":
+                        uids.append((name, replies[tag][1]))
+                before = time.time()
+                for name, uid in uids:
+                    client.send("RELEASE %s %s" % (name, uid))
+                await client.read_replies(len(uids))
+                elapsed = time.time() - before
+                for name, uid in uids:
+                    recorder.record("release", elapsed, 204)
+        finally:
+            client.close()
+
+    await asyncio.gather(*[loop(i) for i in range(0, args.clients)])
+
+
+async def run(args):
+    await wait_for_daemon(args.url)
+    results = []
+    for name in ("http", "line", "line_pipelined"):
+        recorder = Recorder()
+        before = time.time()
+        if name == "http":
+            await run_http(args, recorder)
+        else:
+            await run_line(args, recorder, args.pipeline if name == "line_pipelined" else 1)
+        res = recorder.summary(time.time() - before)
+        res["scenario"] = name
+        res["clients"] = args.clients
+        results.append(res)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8889, help="HTTP port of the started daemon")
+    parser.add_argument("--line-port", type=int, default=8890,
+                        help="line protocol port of the started daemon")
+    parser.add_argument("--python", default=sys.executable,
+                        help="python interpreter of the started daemon")
+    parser.add_argument("--clients", type=int, default=100, help="number of clients")
+    parser.add_argument("--operations", type=int, default=10000,
+                        help="number of acquired locks (for each scenario)")
+    parser.add_argument("--pipeline", type=int, default=10,
+                        help="number of pipelined requests (line_pipelined scenario)")
+    args = parser.parse_args()
+    args.url = "http://127.0.0.1:%i" % args.port
+    command = [args.python, os.path.join(ROOT, "rdlm-daemon.py"), "--port=%i" % args.port,
+               "--line_port=%i" % args.line_port, "--logging=warning"]
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([ROOT, env.get("PYTHONPATH", "")])
+    daemon = subprocess.Popen(command, env=env)
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        daemon.send_signal(signal.SIGTERM)
+        try:
+            daemon.wait(10)
+        except subprocess.TimeoutExpired:
+            daemon.kill()
+    print(json.dumps(results, indent=4, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
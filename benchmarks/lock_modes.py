@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of restful-distributed-lock-manager released under the MIT license.
+# See the LICENSE file for more information.
+
+"""
+Benchmark of the hand-off throughput on a single resource with a mixed
+workload of shared and exclusive locks
+
+A fixed number of clients always have one lock (active or waiting) on the
+resource. Each time, the oldest active lock is released and its client
+immediately asks for a new lock (shared with the given probability).
+"""
+
+import argparse
+import collections
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from rdlm.lock import LockManager, Lock, MODE_SHARED, MODE_EXCLUSIVE  # noqa
+
+
+def bench(clients, operations, shared_ratio):
+    '''
+    @summary: runs the benchmark for the given shared lock ratio
+    @result: python dict
+    '''
+    manager = LockManager()
+    granted = collections.deque()
+    rand = random.Random(0)
+
+    def new_lock():
+        mode = MODE_SHARED if rand.random() < shared_ratio else MODE_EXCLUSIVE
+        lock = Lock("resource", "bench", 3600, 3600, mode=mode)
+        lock.set_callbacks(lambda: granted.append(lock), lambda timeout: None)
+        manager.add_lock("resource", lock)
+
+    for i in range(0, clients):
+        new_lock()
+    concurrency = 0
+    before = time.time()
+    for i in range(0, operations):
+        concurrency = concurrency + len(granted)
+        lock = granted.popleft()
+        manager.delete_lock("resource", lock.uid)
+        new_lock()
+    elapsed = time.time() - before
+    return {"shared_ratio": shared_ratio, "handoffs_per_s": operations / elapsed,
+            "mean_active_locks": float(concurrency) / operations}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=1000, help="number of clients")
+    parser.add_argument("--operations", type=int, default=100000,
+                        help="number of released (and acquired) locks")
+    args = parser.parse_args()
+    res = [bench(args.clients, args.operations, ratio) for ratio in (0.0, 0.5, 0.9, 0.99)]
+    print(json.dumps(res, indent=4, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
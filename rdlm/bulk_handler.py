@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of restful-distributed-lock-manager released under the MIT license.
+# See the LICENSE file for more information.
+
+from rdlm.request_handler import RequestHandler
+from rdlm.lock import LOCK_MANAGER_INSTANCE
+from rdlm.sharding import SHARDING_INSTANCE
+import json
+import re
+try:
+    from urlparse import urlsplit
+except ImportError:
+    # Compatibility with Python3
+    from urllib.parse import urlsplit
+
+try:
+    STRING_TYPES = basestring
+except NameError:
+    # Compatibility with Python3
+    STRING_TYPES = str
+
+LOCK_PATH_REGEX = re.compile(r"^(?:.*/)?locks/([a-zA-Z0-9]+)/([a-zA-Z0-9]+)/?$")
+NAME_REGEX = re.compile(r"^[a-zA-Z0-9]+$")
+MAX_BULK_ITEMS = 10000
+
+
+def parse_item(item):
+    '''
+    @summary: returns the (resource name, uid) tuple of an item of a bulk request
+    @param item: lock url (absolute or relative) or {"resource": ..., "uid": ...} dict
+    @result: (resource name, uid) tuple (or None if the item is invalid)
+    '''
+    if isinstance(item, STRING_TYPES):
+        match = LOCK_PATH_REGEX.match(urlsplit(item).path)
+        if match is None:
+            return None
+        return (match.group(1), match.group(2))
+    if isinstance(item, dict):
+        name = item.get('resource')
+        uid = item.get('uid')
+        if isinstance(name, STRING_TYPES) and isinstance(uid, STRING_TYPES) and \
+                NAME_REGEX.match(name) and NAME_REGEX.match(uid):
+            return (name, uid)
+    return None
+
+
+class BulkHandler(RequestHandler):
+    """Base class for the /bulk/* URLs (one operation on several locks)
+
+    Subclasses only set the class attributes describing the operation
+    """
+
+    SUPPORTED_METHODS = ['POST']
+
+    # (name of the LockManager method applied on the list of (resource name, uid)
+    # tuples, it returns a result per item: a false value => status 404)
+    manager_method = None
+    # (status of the items with a true result)
+    found_status = 200
+    # (key of the lock dict in the items with a true result, None => no lock dict)
+    lock_key = None
+
+    def __get_results(self, items):
+        res = []
+        values = getattr(LOCK_MANAGER_INSTANCE, self.manager_method)(items)
+        for ((name, uid), value) in zip(items, values):
+            if not value:
+                res.append({"resource": name, "uid": uid, "status": 404})
+                continue
+            result = {"resource": name, "uid": uid, "status": self.found_status}
+            if self.lock_key is not None:
+                result[self.lock_key] = value.to_dict()
+            res.append(result)
+        return res
+
+    def post(self):
+        '''
+        @summary: deals with POST request
+
+        The body is a json object with a "locks" key: a list of lock urls
+        or {"resource": ..., "uid": ...} objects. The reply (HTTP/200) is a
+        json object with a "results" key: a list of per-item results (in the
+        same order) with "resource", "uid" and "status" keys (an HTTP status
+        code for the item)
+        '''
+        try:
+            tmp = json.loads(self.request.body.decode('utf-8'))
+            locks = tmp['locks']
+        except (KeyError, TypeError, ValueError):
+            self.send_error(status_code=400, message="invalid json body")
+            return
+        if not isinstance(locks, list) or len(locks) > MAX_BULK_ITEMS:
+            self.send_error(status_code=400, message="invalid json body")
+            return
+        results = [None] * len(locks)
+        items = []
+        positions = []
+        for (position, item) in enumerate(locks):
+            parsed = parse_item(item)
+            if parsed is None:
+                results[position] = {"status": 400, "message": "invalid lock"}
+                continue
+            port = SHARDING_INSTANCE.get_owner_port(parsed[0])
+            if port is not None:
+                # (the lock is owned by another worker)
+                url = "%s%s" % (self.get_worker_base_url(self.request, port),
+                                self.reverse_url("lock", parsed[0], parsed[1]))
+                results[position] = {"resource": parsed[0], "uid": parsed[1], "status": 307,
+                                     "location": url}
+                continue
+            items.append(parsed)
+            positions.append(position)
+        for (position, result) in zip(positions, self.__get_results(items)):
+            results[position] = result
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps({"results": results}))
+
+
+class BulkReleaseHandler(BulkHandler):
+    """Class which handles the /bulk/release URL (status 204 or 404 per lock)"""
+
+    manager_method = "delete_locks"
+    found_status = 204
+
+
+class BulkStatusHandler(BulkHandler):
+    """Class which handles the /bulk/status URL (status 200 with a "lock" key or 404)"""
+
+    manager_method = "get_locks"
+    lock_key = "lock"
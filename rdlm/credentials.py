@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of restful-distributed-lock-manager released under the MIT license.
+# See the LICENSE file for more information.
+
+import base64
+import binascii
+import hashlib
+import hmac
+import logging
+import os
+
+MAX_VERIFIED_HEADERS = 1000
+
+
+def constant_time_compare(value1, value2):
+    '''
+    @summary: compares two strings in a time which doesn't depend on their content
+    @param value1: first string (bytes)
+    @param value2: second string (bytes)
+    @result: True if strings are equal, False else
+    '''
+    if hasattr(hmac, 'compare_digest'):
+        return hmac.compare_digest(value1, value2)
+    # Compatibility with Python < 2.7.7
+    if len(value1) != len(value2):
+        return False
+    res = 0
+    for (x, y) in zip(bytearray(value1), bytearray(value2)):
+        res |= x ^ y
+    return res == 0
+
+
+class Credentials(object):
+    '''
+    Class which stores the admin credentials of the userpass file in memory
+
+    Designed to be used as a singleton
+
+    The userpass file is loaded once (on the first admin request or by
+    the daemon at startup) and reloaded by reload_if_changed (called
+    periodically by the daemon, when the mtime or the size of the file
+    changes) or by reload (SIGHUP). So there is no file I/O on the
+    request path.
+
+    Authorization headers which have been successfully verified are
+    cached (by their sha256 digest) until the next reload.
+    '''
+
+    __path = None
+    __stat = None
+    __users = None
+    __error = None
+    __verified = None
+
+    def __init__(self):
+        '''
+        @summary: constructor
+        '''
+        self.__users = {}
+        self.__verified = {}
+
+    def __load(self, path):
+        users = {}
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            for line in f.readlines():
+                line = line.strip()
+                if not line:
+                    continue
+                username, password = line.split(b":", 1)
+                users[username] = password
+        return (users, (stat.st_mtime, stat.st_size))
+
+    def reload(self, path=None):
+        '''
+        @summary: (re)loads the userpass file
+        @param path: full path of the userpass file (None => the current one)
+
+        If the file can't be loaded, admin requests get an HTTP/500 (or, if
+        credentials were already loaded from the same path, these credentials
+        are kept)
+        '''
+        if path is None:
+            path = self.__path
+        if path is None:
+            return
+        try:
+            (users, stat) = self.__load(path)
+        except (IOError, OSError, ValueError):
+            logging.warning("can't load the admin userpass file: %s" % path)
+            if path != self.__path:
+                self.__path = path
+                self.__stat = None
+                self.__users = {}
+                self.__error = True
+                self.__verified = {}
+            return
+        self.__path = path
+        self.__stat = stat
+        self.__users = users
+        self.__error = False
+        self.__verified = {}
+
+    def reload_if_changed(self):
+        '''
+        @summary: reloads the userpass file if its mtime or its size has changed
+        '''
+        if self.__path is None:
+            return
+        try:
+            stat = os.stat(self.__path)
+        except OSError:
+            return
+        if (stat.st_mtime, stat.st_size) != self.__stat:
+            self.reload()
+
+    def check(self, path, auth_header):
+        '''
+        @summary: checks an HTTP Basic Authorization header
+        @param path: full path of the userpass file
+        @param auth_header: value of the Authorization header (or None)
+        @result: True if the credentials are valid, False else
+        @raise IOError: if the userpass file can't be loaded
+        '''
+        if path != self.__path:
+            self.reload(path)
+        if self.__error:
+            raise IOError("bad admin userpass file")
+        if auth_header is None or not auth_header.startswith('Basic '):
+            return False
+        digest = hashlib.sha256(auth_header.encode('utf-8')).digest()
+        if digest in self.__verified:
+            return True
+        try:
+            auth_decoded = base64.b64decode(auth_header[6:].encode('ascii'))
+            username, password = auth_decoded.split(b':', 1)
+        except (binascii.Error, TypeError, ValueError, UnicodeError):
+            return False
+        expected = self.__users.get(username)
+        if expected is None or not constant_time_compare(password, expected):
+            return False
+        if len(self.__verified) >= MAX_VERIFIED_HEADERS:
+            self.__verified = {}
+        self.__verified[digest] = True
+        return True
+
+
+CREDENTIALS_INSTANCE = Credentials()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of restful-distributed-lock-manager released under the MIT license.
+# See the LICENSE file for more information.
+
+import collections
+import itertools
+
+from rdlm.lock import LOCK_MANAGER_INSTANCE, EVENT_RELEASED, EVENT_EXPIRED
+
+MAX_ENTRIES = 100000
+
+
+class IdempotencyIndex(object):
+    '''
+    Class which stores lock requests by (resource name, idempotency key)
+
+    Designed to be used as a singleton
+
+    A lock request retried with the same idempotency key (for example
+    after a client side timeout) is reattached to the lock of the first
+    request (waiting or active) instead of queueing a new lock.
+
+    When the client of a keyed waiting request disconnects, the request can
+    be detached from its lock: the lock is kept waiting for a grace period,
+    so that a retry can still be reattached to it, and then deleted (see
+    expire_detached) if no retry came.
+
+    An entry is forgotten when its lock is released or expired (lock
+    events, see LockManager.add_listener). The index is bounded: when
+    there are more than max_entries entries, the oldest ones are evicted
+    (and the lock of an evicted detached entry is deleted, as nobody could
+    reattach to it anymore).
+    '''
+
+    __lock_manager = None
+    __entries = None
+    __uids = None
+    __order = None
+    __attachments = None
+    __max_entries = 0
+
+    def __init__(self, lock_manager, max_entries=MAX_ENTRIES):
+        '''
+        @summary: constructor
+        @param lock_manager: LockManager object
+        @param max_entries: max number of entries
+        '''
+        self.__lock_manager = lock_manager
+        self.__max_entries = max_entries
+        # (ids of attachments of a lock to a request)
+        self.__attachments = itertools.count()
+        self.clear()
+        lock_manager.add_listener(self.on_event)
+
+    def clear(self):
+        '''
+        @summary: forget all entries
+        '''
+        # ((resource name, key) => [lock, detach callback, attachment id, detached])
+        self.__entries = {}
+        # (lock uid => (resource name, key))
+        self.__uids = {}
+        # ((resource name, key) in insertion order, with already removed entries)
+        self.__order = collections.deque()
+
+    def get(self, resource_name, key):
+        '''
+        @summary: returns the lock of a previous request with the same key
+        @param resource_name: name of the resource
+        @param key: idempotency key
+        @result: lock object (waiting or active) or None
+        '''
+        entry = self.__entries.get((resource_name, key))
+        if entry is None or entry[0].is_deleted():
+            return None
+        return entry[0]
+
+    def add(self, resource_name, key, lock, detach_callback=None):
+        '''
+        @summary: stores a new lock request
+        @param resource_name: name of the resource
+        @param key: idempotency key
+        @param lock: lock object
+        @param detach_callback: callback invoked (without argument) when the lock
+                                is reattached to another request
+        '''
+        self.remove(resource_name, key)
+        self.__entries[(resource_name, key)] = [lock, detach_callback,
+                                                next(self.__attachments), False]
+        self.__uids[lock.uid] = (resource_name, key)
+        self.__order.append((resource_name, key))
+        while len(self.__entries) > self.__max_entries:
+            self.__evict(*self.__order.popleft())
+        if len(self.__order) > 2 * len(self.__entries) + 1024:
+            self.__order = collections.deque([x for x in self.__order if x in self.__entries])
+
+    def reattach(self, resource_name, key, detach_callback=None):
+        '''
+        @summary: reattaches a lock request to a new request with the same key
+        @param resource_name: name of the resource
+        @param key: idempotency key
+        @param detach_callback: see add
+        @result: lock object (or None if there is no lock for this key)
+
+        The detach callback of the previous request is invoked if the lock is
+        waiting (an active lock has been or is about to be reported to it)
+        '''
+        lock = self.get(resource_name, key)
+        if lock is None:
+            return None
+        entry = self.__entries[(resource_name, key)]
+        previous_callback = entry[1]
+        entry[1] = detach_callback
+        entry[2] = next(self.__attachments)
+        entry[3] = False
+        if previous_callback and not(lock.is_active()):
+            previous_callback()
+        return lock
+
+    def detach(self, resource_name, key, lock):
+        '''
+        @summary: detaches the lock from its request (the client has disconnected)
+        @param resource_name: name of the resource
+        @param key: idempotency key
+        @param lock: lock object of the request
+        @result: token to give to expire_detached (or None if the lock isn't
+                 the one of the key anymore)
+
+        The lock is kept: a retry with the same key can still be reattached
+        to it (an active lock isn't detached: nobody would hold it)
+        '''
+        entry = self.__entries.get((resource_name, key))
+        if entry is None or entry[0] is not lock or lock.is_deleted() or lock.is_active():
+            return None
+        entry[1] = None
+        entry[3] = True
+        return entry[2]
+
+    def expire_detached(self, resource_name, key, token):
+        '''
+        @summary: deletes the lock of a detached request (end of the grace period)
+        @param resource_name: name of the resource
+        @param key: idempotency key
+        @param token: token returned by detach
+        @result: True if the lock has been deleted, False if it has been reattached
+                 to a retry since (or if it's already released)
+
+        The lock is also deleted by this method when it becomes active during
+        the grace period (nobody would hold it)
+        '''
+        entry = self.__entries.get((resource_name, key))
+        if entry is None or entry[2] != token:
+            return False
+        return self.__lock_manager.delete_lock(resource_name, entry[0].uid)
+
+    def __evict(self, resource_name, key):
+        entry = self.__entries.get((resource_name, key))
+        if entry is None:
+            return
+        self.remove(resource_name, key)
+        if entry[3]:
+            self.__lock_manager.delete_lock(resource_name, entry[0].uid)
+
+    def remove(self, resource_name, key):
+        '''
+        @summary: forget the entry of the given key
+        @param resource_name: name of the resource
+        @param key: idempotency key
+        '''
+        entry = self.__entries.pop((resource_name, key), None)
+        if entry is not None:
+            self.__uids.pop(entry[0].uid, None)
+
+    def on_event(self, event, lock):
+        '''
+        @summary: lock event listener (see LockManager.add_listener)
+        @param event: lock event (EVENT_* constants)
+        @param lock: lock object
+        '''
+        if event != EVENT_RELEASED and event != EVENT_EXPIRED:
+            return
+        entry_key = self.__uids.get(lock.uid)
+        if entry_key is not None:
+            self.remove(*entry_key)
+
+    def __len__(self):
+        return len(self.__entries)
+
+
+IDEMPOTENCY_INDEX = IdempotencyIndex(LOCK_MANAGER_INSTANCE)
@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of restful-distributed-lock-manager released under the MIT license.
+# See the LICENSE file for more information.
+
+import gc
+import json
+import logging
+import os
+import threading
+import time
+try:
+    import Queue as queue
+except ImportError:
+    # Compatibility with Python3
+    import queue
+
+from rdlm.lock import Lock, MODE_EXCLUSIVE
+from rdlm.lock import EVENT_ACTIVE, EVENT_RELEASED, EVENT_EXPIRED, EVENT_RENEWED
+
+RECORD_ACTIVE = "a"
+RECORD_RELEASED = "r"
+RECORD_EXPIRED = "x"
+
+
+class Journal(object):
+    '''
+    Class which persists active locks on disk (write-ahead log and snapshots)
+
+    The journal is an append-only file of JSON lines (one record for each
+    activated, renewed, released or expired lock). Records are buffered in memory
+    and handed in batches by the flush() method to a writer thread, which writes
+    them (with a fsync) so that the IOLoop never waits for the disk.
+
+    The snapshot is a compact file (with the same format) of all active
+    locks. Each snapshot truncates the journal.
+
+    Waiting locks are not persisted: their clients can't be answered
+    after a restart. Multilocks are not persisted either: their locks are
+    restored as independent locks.
+    '''
+
+    __directory = None
+    __journal_path = None
+    __snapshot_path = None
+    __journal_file = None
+    __buffer = None
+    __queue = None
+    __thread = None
+
+    def __init__(self, directory):
+        '''
+        @summary: constructor
+        @param directory: directory of the journal and snapshot files
+                          (created if necessary)
+        @result: Journal object
+        '''
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.__directory = directory
+        self.__journal_path = os.path.join(directory, "journal.log")
+        self.__snapshot_path = os.path.join(directory, "snapshot.log")
+        self.__buffer = []
+
+    @staticmethod
+    def lock_to_record(lock):
+        '''
+        @summary: returns the journal record of an active lock
+        @param lock: lock object (active)
+        @result: python dict (with the wall clock expiration timestamp)
+        '''
+        return {"e": RECORD_ACTIVE, "r": lock.resource_name, "u": lock.uid,
+                "t": lock.title, "w": lock.wait, "l": lock.lifetime, "m": lock.mode,
+                "c": lock.capacity,
+                "x": time.time() + lock.get_remaining_seconds()}
+
+    def on_event(self, event, lock):
+        '''
+        @summary: lock event listener (see LockManager.add_listener)
+        @param event: lock event (EVENT_* constants)
+        @param lock: lock object
+        '''
+        if event == EVENT_ACTIVE or event == EVENT_RENEWED:
+            # (a renewed lock is recorded again with its new expiration)
+            self.__buffer.append(json.dumps(self.lock_to_record(lock)))
+        elif not(lock.is_active()):
+            return
+        elif event == EVENT_RELEASED:
+            # (uids are hexadecimal strings, no need to escape them)
+            self.__buffer.append('{"e": "%s", "u": "%s"}' % (RECORD_RELEASED, lock.uid))
+        elif event == EVENT_EXPIRED:
+            self.__buffer.append('{"e": "%s", "u": "%s"}' % (RECORD_EXPIRED, lock.uid))
+
+    def flush(self):
+        '''
+        @summary: hands buffered records to the writer thread (which writes them
+                  to the journal file with a fsync)
+        '''
+        if not self.__buffer:
+            return
+        data = "\n".join(self.__buffer) + "\n"
+        self.__buffer = []
+        self.__put(self.__write_records, data)
+
+    def join(self):
+        '''
+        @summary: waits until the writer thread has written all handed records
+                  and snapshots
+        '''
+        if self.__queue is not None:
+            self.__queue.join()
+
+    def close(self):
+        '''
+        @summary: flushes buffered records, stops the writer thread and closes
+                  the journal file
+        '''
+        self.flush()
+        if self.__thread is not None:
+            self.__queue.put(None)
+            self.__thread.join()
+            self.__thread = None
+            self.__queue = None
+        if self.__journal_file is not None:
+            self.__journal_file.close()
+            self.__journal_file = None
+
+    def snapshot(self, lock_manager):
+        '''
+        @summary: writes a snapshot of all active locks and truncates the journal
+        @param lock_manager: LockManager object
+        @result: number of locks in the snapshot
+
+        Records are built by the caller (locks can't be read by another
+        thread), so the IOLoop is paused for about 1.5 seconds per million of
+        active locks. They are encoded and written (with a fsync) by the
+        writer thread.
+        '''
+        self.flush()
+        records = [self.lock_to_record(lock) for lock in lock_manager.get_active_locks()]
+        self.__put(self.__write_snapshot, records)
+        return len(records)
+
+    def __put(self, func, *args):
+        if self.__thread is None:
+            self.__queue = queue.Queue()
+            self.__thread = threading.Thread(target=self.__run)
+            self.__thread.daemon = True
+            self.__thread.start()
+        self.__queue.put((func, args))
+
+    def __run(self):
+        # (writer thread: tasks are done in order, so records handed after a
+        #  snapshot are written in the truncated journal)
+        while True:
+            task = self.__queue.get()
+            try:
+                if task is None:
+                    return
+                try:
+                    task[0](*task[1])
+                except (IOError, OSError):
+                    logging.exception("Can't write the journal in %s" % self.__directory)
+            finally:
+                self.__queue.task_done()
+
+    def __write_records(self, data):
+        if self.__journal_file is None:
+            self.__journal_file = open(self.__journal_path, "a")
+        self.__journal_file.write(data)
+        self.__journal_file.flush()
+        os.fsync(self.__journal_file.fileno())
+
+    def __write_snapshot(self, records):
+        tmp_path = self.__snapshot_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            for i in range(0, len(records), 10000):
+                lines = [json.dumps(record) for record in records[i:i + 10000]]
+                f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(tmp_path, self.__snapshot_path)
+        self.__fsync_directory()
+        # (the journal is only truncated when the snapshot is safely on disk)
+        if self.__journal_file is not None:
+            self.__journal_file.close()
+        self.__journal_file = open(self.__journal_path, "w")
+
+    def __fsync_directory(self):
+        # (so that the rename of the snapshot survives a power failure)
+        if os.name != "posix":
+            return
+        fd = os.open(self.__directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def __read_records(self, path, records):
+        if not os.path.exists(path):
+            return
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    event = record["e"]
+                    uid = record["u"]
+                except (KeyError, ValueError):
+                    # a crash can leave a truncated last line
+                    logging.warning("Invalid journal record in %s => ignoring it" % path)
+                    continue
+                if event == RECORD_ACTIVE:
+                    records[uid] = record
+                else:
+                    records.pop(uid, None)
+
+    def recover(self, lock_manager):
+        '''
+        @summary: rebuilds active locks (with their remaining lifetimes) from
+                  the snapshot and the journal
+        @param lock_manager: LockManager object
+        @result: number of restored locks
+
+        This method must be called before attaching the journal to
+        the lock manager (as a listener)
+        '''
+        # (the cyclic garbage collector is useless and very slow when
+        #  millions of objects are allocated at once)
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            records = {}
+            self.__read_records(self.__snapshot_path, records)
+            self.__read_records(self.__journal_path, records)
+            now = time.time()
+            count = 0
+            for uid, record in records.items():
+                remaining = record["x"] - now
+                if remaining <= 0:
+                    continue
+                lock = Lock.restore(record["r"], uid, record["t"], record["w"],
+                                    record["l"], remaining,
+                                    mode=record.get("m", MODE_EXCLUSIVE),
+                                    capacity=record.get("c", 1))
+                if lock_manager.restore_lock(lock):
+                    count = count + 1
+        finally:
+            if gc_enabled:
+                gc.enable()
+        return count
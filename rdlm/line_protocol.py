@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of restful-distributed-lock-manager released under the MIT license.
+# See the LICENSE file for more information.
+
+"""
+Compact line-oriented TCP protocol (an alternative to the HTTP API)
+
+Each request is a line: "<tag> <COMMAND> <arguments...>\\n". The tag is
+chosen by the client (a short string without space) and is repeated at
+the beginning of the reply line, so that requests can be pipelined
+(replies to ACQUIRE commands are sent when the lock is acquired, so
+they can be sent out of order).
+
+Commands:
+- <tag> ACQUIRE <resource> <wait> <lifetime> [<mode> [<title>]]
+  => <tag> OK <uid> | <tag> TIMEOUT | <tag> DELETED | <tag> BUSY (wait is 0)
+- <tag> RELEASE <resource> <uid>
+  => <tag> OK | <tag> NOTFOUND
+- <tag> RENEW <resource> <uid> [<lifetime>]
+  => <tag> OK | <tag> NOTFOUND | <tag> NOTACTIVE
+
+Durations are in seconds (integer or float). Invalid requests get a
+"<tag> ERROR <message>" reply.
+
+All locks (active or waiting) of a connection are released when the
+connection is closed.
+"""
+
+import functools
+import logging
+import re
+import socket
+
+import tornado.ioloop
+from tornado.netutil import TCPServer
+
+from rdlm.lock import Lock, LOCK_MANAGER_INSTANCE, LOCK_MODES, MODE_EXCLUSIVE, to_seconds
+
+RESOURCE_NAME_REGEX = re.compile(r"^[a-zA-Z0-9]+$")
+MAX_LINE_LENGTH = 4096
+
+
+class LineProtocolConnection(object):
+    '''
+    Class which handles a client connection of the line protocol
+    '''
+
+    COMMANDS = {"ACQUIRE": "on_acquire", "RELEASE": "on_release", "RENEW": "on_renew"}
+
+    __stream = None
+    __address = None
+    __locks = None
+    __prune_size = 0
+
+    def __init__(self, stream, address):
+        '''
+        @summary: constructor
+        @param stream: tornado IOStream object
+        @param address: address of the client
+        '''
+        self.__stream = stream
+        self.__address = address
+        # (uid => lock object) of all locks requested by this connection
+        self.__locks = {}
+        self.__prune_size = 1024
+        if stream.socket.family in (socket.AF_INET, socket.AF_INET6):
+            # (pipelined replies are small writes: don't wait for the ack of the previous one)
+            stream.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.__stream.set_close_callback(self.on_close)
+        self.__read_next_line()
+
+    def __read_next_line(self):
+        if not self.__stream.closed():
+            self.__stream.read_until(b"\n", self.on_line)
+
+    def __reply(self, tag, *args):
+        if self.__stream.closed():
+            return
+        line = " ".join((tag,) + args) + "\n"
+        self.__stream.write(line.encode('utf-8'))
+
+    def __track(self, lock):
+        self.__locks[lock.uid] = lock
+        if len(self.__locks) > self.__prune_size:
+            # (released and expired locks are forgotten from time to time)
+            for uid in [x.uid for x in self.__locks.values() if x.is_deleted()]:
+                del(self.__locks[uid])
+            self.__prune_size = max(1024, len(self.__locks) * 2)
+
+    def on_line(self, data):
+        '''
+        @summary: method called by tornado for each received line
+        @param data: line (bytes)
+        '''
+        try:
+            line = data.decode('utf-8').strip()
+        except UnicodeDecodeError:
+            line = None
+        if line is None or len(line) > MAX_LINE_LENGTH:
+            self.__reply("*", "ERROR", "invalid line")
+        elif line:
+            # (the title of an ACQUIRE command can contain spaces)
+            tokens = line.split(None, 6)
+            if len(tokens) < 2:
+                self.__reply(tokens[0], "ERROR", "missing command")
+            else:
+                method_name = self.COMMANDS.get(tokens[1].upper())
+                if method_name is None:
+                    self.__reply(tokens[0], "ERROR", "unknown command")
+                else:
+                    try:
+                        getattr(self, method_name)(tokens[0], *tokens[2:])
+                    except (TypeError, ValueError):
+                        self.__reply(tokens[0], "ERROR", "invalid arguments")
+        self.__read_next_line()
+
+    def on_acquire(self, tag, name, wait, lifetime, mode=MODE_EXCLUSIVE, title="line protocol"):
+        '''
+        @summary: deals with an ACQUIRE command
+        '''
+        if not(RESOURCE_NAME_REGEX.match(name)) or mode not in LOCK_MODES:
+            raise ValueError("invalid resource name or mode")
+        lock = Lock(name, title, to_seconds(wait), to_seconds(lifetime), mode=mode)
+        if lock.wait <= 0:
+            res = LOCK_MANAGER_INSTANCE.try_lock(name, lock)
+            if res:
+                self.__track(lock)
+                self.__reply(tag, "OK", lock.uid)
+            elif res is None:
+                self.__reply(tag, "ERROR", "the resource has another capacity")
+            else:
+                self.__reply(tag, "BUSY")
+            return
+        loop = tornado.ioloop.IOLoop.instance()
+        lock.set_callbacks(
+            lambda: loop.add_callback(functools.partial(self.__reply, tag, "OK", lock.uid)),
+            lambda timeout=True: loop.add_callback(functools.partial(
+                self.__reply, tag, "TIMEOUT" if timeout else "DELETED")))
+        if not(LOCK_MANAGER_INSTANCE.add_lock(name, lock)):
+            lock.reset_callbacks()
+            self.__reply(tag, "ERROR", "the resource has another capacity")
+            return
+        self.__track(lock)
+
+    def on_release(self, tag, name, uid):
+        '''
+        @summary: deals with a RELEASE command
+        '''
+        self.__locks.pop(uid, None)
+        if LOCK_MANAGER_INSTANCE.delete_lock(name, uid):
+            self.__reply(tag, "OK")
+        else:
+            self.__reply(tag, "NOTFOUND")
+
+    def on_renew(self, tag, name, uid, lifetime=None):
+        '''
+        @summary: deals with a RENEW command
+        '''
+        if lifetime is not None:
+            lifetime = to_seconds(lifetime)
+        if LOCK_MANAGER_INSTANCE.get_lock(name, uid) is None:
+            self.__reply(tag, "NOTFOUND")
+        elif LOCK_MANAGER_INSTANCE.renew_lock(name, uid, lifetime):
+            self.__reply(tag, "OK")
+        else:
+            self.__reply(tag, "NOTACTIVE")
+
+    def on_close(self):
+        '''
+        @summary: method called by tornado when the connection is closed
+
+        All locks of the connection (active or waiting) are released
+        '''
+        locks = list(self.__locks.values())
+        self.__locks = {}
+        for lock in locks:
+            if not(lock.is_deleted()):
+                lock.reset_callbacks()
+                LOCK_MANAGER_INSTANCE.delete_lock(lock.resource_name, lock.uid)
+        if locks:
+            logging.debug("Connection of %s closed => %i lock(s) released" % (
+                          self.__address, len(locks)))
+
+
+class LineProtocolServer(TCPServer):
+    '''
+    Class which defines the TCP server of the line protocol
+    '''
+
+    def handle_stream(self, stream, address):
+        '''
+        @summary: method called by tornado for each new connection
+        @param stream: tornado IOStream object
+        @param address: address of the client
+        '''
+        LineProtocolConnection(stream, address)
@@ -6,9 +6,79 @@
 
 import uuid
 import datetime
-import collections
+import heapq
+import itertools
 import json
 import logging
+import math
+import time
+
+from rdlm.name_index import NameIndex
+
+MODE_EXCLUSIVE = "exclusive"
+MODE_SHARED = "shared"
+LOCK_MODES = (MODE_EXCLUSIVE, MODE_SHARED)
+
+EVENT_WAITING = "waiting"
+EVENT_ACTIVE = "active"
+EVENT_RELEASED = "released"
+EVENT_EXPIRED = "expired"
+EVENT_RENEWED = "renewed"
+EVENT_BUSY = "busy"
+EVENT_RESTORED = "restored"
+
+
+try:
+    monotonic = time.monotonic
+except AttributeError:
+    # Compatibility with Python < 3.3
+    monotonic = time.time
+
+
+def monotonic_to_isoformat(timestamp, offset=None):
+    '''
+    @summary: converts a monotonic timestamp to an ISO 8601 local date
+    @param timestamp: monotonic timestamp (see monotonic())
+    @param offset: difference between the wall clock and the monotonic clock
+                   (None => computed now)
+    @result: ISO 8601 string
+    '''
+    if offset is None:
+        offset = time.time() - monotonic()
+    return datetime.datetime.fromtimestamp(offset + timestamp).isoformat()
+
+
+def to_seconds(value):
+    '''
+    @summary: converts a duration (number or string) to seconds
+    @param value: duration in seconds (integer, float or string)
+    @result: duration in seconds (int if possible, float else)
+
+    ValueError or TypeError is raised if the duration is invalid
+    '''
+    value = float(value)
+    if math.isnan(value) or math.isinf(value):
+        raise ValueError("invalid duration")
+    if value == int(value):
+        return int(value)
+    return value
+
+
+def parse_seconds(tmp, key):
+    '''
+    @summary: reads a duration from a decoded json body
+    @param tmp: python dict (decoded json body)
+    @param key: name of the duration in seconds (integer or float), the
+                duration can also be given in milliseconds with the
+                key + "_ms" name
+    @result: duration in seconds (int if possible, float else)
+
+    KeyError is raised if the duration is missing, ValueError or TypeError
+    if it's invalid
+    '''
+    if (key + '_ms') in tmp:
+        return to_seconds(float(tmp[key + '_ms']) / 1000.0)
+    return to_seconds(tmp[key])
 
 
 class Lock(object):
@@ -18,48 +88,94 @@ class Lock(object):
     The lock object has a status :
     - active (the lock is acquired)
     - not active (the lock is not acquired)
+
+    The lock object has a mode :
+    - exclusive (the default)
+    - shared (compatible with other shared locks)
+
+    Timestamps are monotonic floats (see monotonic()), they are
+    converted to ISO 8601 dates only in to_dict(). There can be millions
+    of lock objects, so they have no __dict__.
+
+    The expiry_indexed attribute is maintained by ExpiryIndex (True if the
+    current deadline of the lock has a live entry in the index).
     '''
 
-    __active = False
-    uid = None
-    title = None
-    resource_name = None
-    lifetime = 0
-    wait = 0
-    wait_since = None
-    wait_expires = None
-    active_since = None
-    active_expires = None
-    __active_callback = None
-    __delete_callback = None
-
-    def __init__(self, resource_name, title, wait, lifetime):
+    __slots__ = ('uid', 'title', 'mode', 'capacity', 'resource_name', 'lifetime', 'wait',
+                 'wait_since', 'active_since', 'expiry_indexed', '__expires', '__active',
+                 '__deleted', '__active_callback', '__delete_callback')
+
+    def __init__(self, resource_name, title, wait, lifetime, uid=None, mode=MODE_EXCLUSIVE,
+                 capacity=None):
         '''
         @summary: lock constructor
         @param resource_name: name of the resource to lock
         @param title: title of the lock
         @param wait: wait max duration (in seconds)
         @param lifetime: timeout of the lock (in seconds)
+        @param uid: uid of the lock (None => a new uid is generated)
+        @param mode: mode of the lock (MODE_EXCLUSIVE or MODE_SHARED)
+        @param capacity: expected capacity of the resource (max number of active
+                         exclusive locks), None => the capacity of the resource
+                         (1 for a new resource)
         @result: lock object (not active)
         '''
         self.resource_name = resource_name
-        self.lifetime = lifetime
+        self.mode = mode
+        self.capacity = capacity
         self.title = title
-        self.uid = str(uuid.uuid4()).replace('-', '')
+        if uid is None:
+            self.uid = uuid.uuid4().hex
+        else:
+            self.uid = uid
         self.wait = wait
         self.lifetime = lifetime
-        self.wait_since = datetime.datetime.now()
-        self.wait_expires = self.wait_since + datetime.timedelta(seconds=wait)
+        self.wait_since = monotonic()
+        self.active_since = None
+        self.expiry_indexed = False
+        self.__expires = self.wait_since + wait
+        self.__active = False
+        self.__deleted = False
+        self.__active_callback = None
+        self.__delete_callback = None
+
+    @property
+    def wait_expires(self):
+        '''
+        @summary: wait deadline of the lock (monotonic timestamp, None if the
+                  lock is active)
+        '''
+        if self.__active:
+            return None
+        return self.__expires
+
+    @property
+    def active_expires(self):
+        '''
+        @summary: lifetime deadline of the lock (monotonic timestamp, None if the
+                  lock is not active)
+        '''
+        if self.__active:
+            return self.__expires
+        return None
 
     def delete(self, timeout=True):
         '''
         @summary: explicit destructor
         @param timeout: if True, the delete is made by a timeout
         '''
+        self.__deleted = True
         if self.__delete_callback:
             (self.__delete_callback)(timeout=timeout)
         self.reset_callbacks()
 
+    def is_deleted(self):
+        '''
+        @summary: returns True if the lock has been deleted
+        @result: True (the lock is deleted) or False
+        '''
+        return self.__deleted
+
     @classmethod
     def from_json(cls, resource_name, json_string):
         '''
@@ -71,11 +187,40 @@ class Lock(object):
         try:
             tmp = json.loads(json_string)
             title = tmp['title']
-            wait = int(tmp['wait'])
-            lifetime = int(tmp['lifetime'])
-        except (KeyError, ValueError):
+            wait = parse_seconds(tmp, 'wait')
+            lifetime = parse_seconds(tmp, 'lifetime')
+            mode = tmp.get('mode', MODE_EXCLUSIVE)
+            capacity = tmp.get('capacity', None)
+            if capacity is not None:
+                capacity = int(capacity)
+        except (KeyError, TypeError, ValueError):
+            return None
+        if mode not in LOCK_MODES:
+            return None
+        if capacity is not None and capacity < 1:
             return None
-        return Lock(resource_name, title, wait, lifetime)
+        return Lock(resource_name, title, wait, lifetime, mode=mode, capacity=capacity)
+
+    @classmethod
+    def restore(cls, resource_name, uid, title, wait, lifetime, remaining, mode=MODE_EXCLUSIVE,
+                capacity=None):
+        '''
+        @summary: class method which rebuilds an active lock (after a restart)
+        @param resource_name: name of the resource
+        @param uid: uid of the lock
+        @param title: title of the lock
+        @param wait: wait max duration (in seconds)
+        @param lifetime: timeout of the lock (in seconds)
+        @param remaining: remaining lifetime of the lock (in seconds)
+        @param mode: mode of the lock (MODE_EXCLUSIVE or MODE_SHARED)
+        @param capacity: capacity of the resource
+        @result: lock object (active)
+        '''
+        lock = cls(resource_name, title, wait, lifetime, uid=uid, mode=mode, capacity=capacity)
+        lock.set_active()
+        lock.__expires = monotonic() + remaining
+        lock.active_since = lock.__expires - lifetime
+        return lock
 
     def to_dict(self):
         '''
@@ -86,13 +231,16 @@ class Lock(object):
                "title": self.title,
                "wait": self.wait,
                "lifetime": self.lifetime,
+               "mode": self.mode,
+               "capacity": self.capacity,
                "active": self.__active}
+        offset = time.time() - monotonic()
         if self.__active:
-            tmp['active_since'] = self.active_since.isoformat()
-            tmp['active_expires'] = self.active_expires.isoformat()
+            tmp['active_since'] = monotonic_to_isoformat(self.active_since, offset)
+            tmp['active_expires'] = monotonic_to_isoformat(self.__expires, offset)
         else:
-            tmp['wait_since'] = self.wait_since.isoformat()
-            tmp['wait_expires'] = self.wait_expires.isoformat()
+            tmp['wait_since'] = monotonic_to_isoformat(self.wait_since, offset)
+            tmp['wait_expires'] = monotonic_to_isoformat(self.__expires, offset)
         return tmp
 
     def to_json(self):
@@ -106,16 +254,26 @@ class Lock(object):
     def set_active(self):
         '''
         @summary: change the status of the lock to active (corresponding callback is invoked)
+
+        (wait_since is kept to know how long the lock has been waiting)
         '''
-        self.wait_since = None
-        self.wait_expires = None
         self.__active = True
-        self.active_since = datetime.datetime.now()
-        self.active_expires = self.active_since + datetime.timedelta(seconds=self.lifetime)
+        self.active_since = monotonic()
+        self.__expires = self.active_since + self.lifetime
         if self.__active_callback:
             (self.__active_callback)()
         self.reset_callbacks()
 
+    def renew(self, lifetime=None):
+        '''
+        @summary: push back the lifetime timeout of an active lock
+        @param lifetime: new lifetime of the lock from now (in seconds), None => same
+                         lifetime as before
+        '''
+        if lifetime is not None:
+            self.lifetime = lifetime
+        self.__expires = monotonic() + self.lifetime
+
     def set_callbacks(self, active_callback, delete_callback):
         '''
         @summary: setter for callbacks
@@ -132,33 +290,337 @@ class Lock(object):
         self.__active_callback = None
         self.__delete_callback = None
 
+    def is_active(self):
+        '''
+        @summary: returns True if the lock is active (acquired)
+        @result: True (the lock is active) or False
+        '''
+        return self.__active
+
+    def get_remaining_seconds(self):
+        '''
+        @summary: returns the number of seconds before the current deadline of the lock
+        @result: number of seconds (float, negative if the lock is expired)
+        '''
+        return self.__expires - monotonic()
+
+    def expires(self):
+        '''
+        @summary: returns the current deadline of the lock (wait timeout or lifetime
+                  timeout depending on the status)
+        @result: monotonic timestamp
+        '''
+        return self.__expires
+
     def is_expired(self):
         '''
         @summary: returns True is the lock is expired (wait timeout or lifetime timeout
                   depending on the status)
         @result: True (the lock is expired) or False
         '''
-        if self.__active:
-            return (datetime.datetime.now() > self.active_expires)
-        else:
-            return (datetime.datetime.now() > self.wait_expires)
+        return (monotonic() > self.__expires)
+
+
+class ExpiryIndex(object):
+    '''
+    Class which indexes locks by deadline (min-heap)
+
+    Entries are invalidated lazily: an entry is only valid if its lock
+    is not deleted and if its deadline is still the current deadline
+    of the lock. Invalid entries are skipped when they reach the top of
+    the heap (or dropped when the heap is compacted).
+    '''
+
+    COMPACT_MIN_STALE = 1024
+
+    __heap = None
+    __counter = None
+    __stale = 0
+    __new_deadline_callback = None
+
+    def __init__(self):
+        '''
+        @summary: constructor
+        @result: ExpiryIndex object
+        '''
+        self.__heap = []
+        self.__counter = itertools.count()
+        self.__stale = 0
+
+    def __len__(self):
+        return len(self.__heap)
+
+    def set_new_deadline_callback(self, callback):
+        '''
+        @summary: setter for the callback invoked (with the deadline as argument)
+                  when a pushed deadline becomes the nearest one
+        @param callback: callback (or None)
+        '''
+        self.__new_deadline_callback = callback
+
+    def push(self, lock):
+        '''
+        @summary: index the current deadline of the given lock
+        @param lock: lock object
+        '''
+        deadline = lock.expires()
+        is_nearest = (len(self.__heap) == 0) or (deadline < self.__heap[0][0])
+        heapq.heappush(self.__heap, (deadline, next(self.__counter), lock))
+        lock.expiry_indexed = True
+        if is_nearest and self.__new_deadline_callback:
+            (self.__new_deadline_callback)(deadline)
+
+    def discard(self, lock):
+        '''
+        @summary: notify the index that the indexed deadline of the given lock
+                  is not valid anymore (lock deleted or deadline changed)
+        @param lock: lock object
+
+        Only a live entry becomes stale (the entry of a lock returned by
+        pop_expired is already out of the heap)
+        '''
+        if not(lock.expiry_indexed):
+            return
+        lock.expiry_indexed = False
+        self.__stale = self.__stale + 1
+        if self.__stale > self.COMPACT_MIN_STALE and self.__stale * 2 > len(self.__heap):
+            self.compact()
+
+    def compact(self):
+        '''
+        @summary: drop all invalid entries from the heap
+        '''
+        self.__heap = [x for x in self.__heap if self.__is_valid(x)]
+        heapq.heapify(self.__heap)
+        self.__stale = 0
+
+    def clear(self):
+        '''
+        @summary: drop all entries
+        '''
+        for entry in self.__heap:
+            entry[2].expiry_indexed = False
+        self.__heap = []
+        self.__stale = 0
+
+    def get_stale_count(self):
+        '''
+        @summary: returns the number of invalid entries still in the heap
+        @result: integer
+        '''
+        return self.__stale
+
+    def __is_valid(self, entry):
+        lock = entry[2]
+        return not(lock.is_deleted()) and lock.expires() == entry[0]
+
+    def __drop_invalid_entries(self):
+        while self.__heap and not(self.__is_valid(self.__heap[0])):
+            heapq.heappop(self.__heap)
+            if self.__stale > 0:
+                self.__stale = self.__stale - 1
+
+    def next_deadline(self):
+        '''
+        @summary: returns the nearest valid deadline
+        @result: monotonic timestamp (or None if there is no indexed lock)
+        '''
+        self.__drop_invalid_entries()
+        if self.__heap:
+            return self.__heap[0][0]
+        return None
+
+    def pop_expired(self, now):
+        '''
+        @summary: remove and return the next lock whose deadline is due
+        @param now: current monotonic timestamp
+        @result: lock object (or None if no lock is due)
+        '''
+        self.__drop_invalid_entries()
+        if self.__heap and self.__heap[0][0] <= now:
+            lock = heapq.heappop(self.__heap)[2]
+            lock.expiry_indexed = False
+            return lock
+        return None
+
+
+class LockQueue(object):
+    '''
+    Class which defines a FIFO queue of locks
+
+    The queue is a doubly linked list of [previous, next, lock] nodes
+    indexed by lock uid, so lookups and removals (even in the middle
+    of the queue) are O(1)
+    '''
+
+    __slots__ = ('__root', '__nodes')
+
+    def __init__(self):
+        '''
+        @summary: constructor
+        @result: empty LockQueue object
+        '''
+        self.__root = []
+        self.__root[:] = [self.__root, self.__root, None]
+        self.__nodes = {}
+
+    def __len__(self):
+        return len(self.__nodes)
+
+    def __iter__(self):
+        node = self.__root[1]
+        while node is not self.__root:
+            yield node[2]
+            node = node[1]
+
+    def append(self, lock):
+        '''
+        @summary: add a lock at the end of the queue
+        @param lock: lock object
+        '''
+        last = self.__root[0]
+        node = [last, self.__root, lock]
+        last[1] = node
+        self.__root[0] = node
+        self.__nodes[lock.uid] = node
+
+    def get(self, uid):
+        '''
+        @summary: return the queued lock with the given uid
+        @param uid: uid of the lock
+        @result: lock object (or None)
+        '''
+        node = self.__nodes.get(uid)
+        if node is None:
+            return None
+        return node[2]
+
+    def remove(self, uid):
+        '''
+        @summary: remove the queued lock with the given uid
+        @param uid: uid of the lock
+        @result: removed lock object (or None)
+        '''
+        node = self.__nodes.pop(uid, None)
+        if node is None:
+            return None
+        previous_node, next_node, lock = node
+        previous_node[1] = next_node
+        next_node[0] = previous_node
+        return lock
+
+    def first(self):
+        '''
+        @summary: return the first lock of the queue (without removing it)
+        @result: lock object (or None if the queue is empty)
+        '''
+        return self.__root[1][2]
+
+    def popleft(self):
+        '''
+        @summary: remove and return the first lock of the queue
+        @result: lock object (IndexError is raised if the queue is empty)
+        '''
+        node = self.__root[1]
+        if node is self.__root:
+            raise IndexError("pop from an empty queue")
+        return self.remove(node[2].uid)
 
 
 class Resource(object):
-    """Class which defines a Resource object"""
+    '''
+    Class which defines a Resource object
+
+    A resource can be held by:
+    - many shared locks at the same time
+    - or one exclusive lock (or up to "capacity" exclusive locks if the
+      resource has been declared with a capacity, as a counting semaphore)
+
+    Waiting locks are granted in FIFO order: a waiting exclusive lock
+    blocks the shared locks queued after it (so writers can't starve)
+    and, when it's possible, consecutive waiting shared locks are
+    granted all at once
+    '''
 
-    name = None
-    active_lock = None
-    __waiting_locks = None
+    __slots__ = ('name', 'version', '__active_locks', '__exclusive_count', '__capacity',
+                 '__waiting_locks', '__expiry_index', '__listener')
 
-    def __init__(self, name):
+    def __init__(self, name, expiry_index=None, listener=None, capacity=None, version=0):
         '''
         @summary: constructor
         @param name: name of the resource
+        @param capacity: max number of active exclusive locks (None => 1)
+        @param expiry_index: ExpiryIndex object to register lock deadlines in (or None)
+        @param listener: callable invoked with (event, lock) arguments on each lock
+                         event (EVENT_* constants) or None
+        @param version: initial value of the version counter (incremented on
+                        each change of the resource or of its locks)
         '''
         self.name = name
-        self.active_lock = None
-        self.__waiting_locks = collections.deque()
+        self.version = version
+        self.__active_locks = {}
+        self.__exclusive_count = 0
+        self.__capacity = capacity or 1
+        self.__waiting_locks = LockQueue()
+        self.__expiry_index = expiry_index
+        self.__listener = listener
+
+    def __delete_lock(self, lock, timeout):
+        self.version = self.version + 1
+        lock.delete(timeout=timeout)
+        if self.__expiry_index is not None:
+            self.__expiry_index.discard(lock)
+        if self.__listener is not None:
+            (self.__listener)(EVENT_EXPIRED if timeout else EVENT_RELEASED, lock)
+
+    def __set_active(self, lock, was_waiting):
+        self.version = self.version + 1
+        lock.set_active()
+        self.__add_active_lock(lock)
+        if self.__expiry_index is not None:
+            if was_waiting:
+                self.__expiry_index.discard(lock)
+            self.__expiry_index.push(lock)
+        if self.__listener is not None:
+            (self.__listener)(EVENT_ACTIVE, lock)
+
+    def __add_active_lock(self, lock):
+        self.__active_locks[lock.uid] = lock
+        if lock.mode == MODE_EXCLUSIVE:
+            self.__exclusive_count = self.__exclusive_count + 1
+
+    def __remove_active_lock(self, lock, timeout):
+        del(self.__active_locks[lock.uid])
+        if lock.mode == MODE_EXCLUSIVE:
+            self.__exclusive_count = self.__exclusive_count - 1
+        self.__delete_lock(lock, timeout=timeout)
+
+    def __is_compatible(self, lock):
+        if lock.mode == MODE_SHARED:
+            return self.__exclusive_count == 0
+        return (self.__exclusive_count == len(self.__active_locks) and
+                self.__exclusive_count < self.__capacity)
+
+    def __grant_waiting_locks(self, timeout=True):
+        while True:
+            lock = self.__waiting_locks.first()
+            if lock is None:
+                break
+            if lock.is_expired():
+                self.__waiting_locks.popleft()
+                self.__delete_lock(lock, timeout=timeout)
+                continue
+            if not(self.__is_compatible(lock)):
+                break
+            self.__waiting_locks.popleft()
+            self.__set_active(lock, was_waiting=True)
+
+    def is_empty(self):
+        '''
+        @summary: returns True if the resource has no lock (active or waiting)
+        @result: True (no lock) or False
+        '''
+        return len(self.__active_locks) == 0 and len(self.__waiting_locks) == 0
 
     def to_dict(self):
         '''
@@ -167,9 +629,10 @@ class Resource(object):
         '''
         tmp = {}
         tmp["name"] = self.name
+        tmp["capacity"] = self.__capacity
         tmp["locks"] = []
-        if self.active_lock:
-            tmp["locks"].append(self.active_lock.to_dict())
+        for active_lock in self.__active_locks.values():
+            tmp["locks"].append(active_lock.to_dict())
         for waiting_lock in self.__waiting_locks:
             tmp["locks"].append(waiting_lock.to_dict())
         return tmp
@@ -188,24 +651,23 @@ class Resource(object):
         @param uid: uid of the lock to delete (or None to delete all)
         @result: True if there was at least a lock, False else
         '''
-        tmp_queue = collections.deque()
+        if uid:
+            lock = self.__waiting_locks.remove(uid)
+            if lock is not None:
+                self.__delete_lock(lock, timeout=False)
+                # (the deleted lock was maybe blocking some other waiting locks)
+                self.__grant_waiting_locks()
+                return True
+            return self.remove_active_lock(timeout=False, uid=uid)
         res = False
         while True:
             try:
                 lock = self.__waiting_locks.popleft()
-                if not(uid):
-                    lock.delete(timeout=False)
-                    res = True
-                else:
-                    if lock.uid == uid:
-                        lock.delete(timeout=False)
-                        res = True
-                    else:
-                        tmp_queue.append(lock)
             except IndexError:
                 break
-        self.__waiting_locks = tmp_queue
-        res = res or self.remove_active_lock(timeout=False, uid=uid)
+            self.__delete_lock(lock, timeout=False)
+            res = True
+        res = self.remove_active_lock(timeout=False) or res
         return res
 
     def get(self, uid):
@@ -214,80 +676,154 @@ class Resource(object):
         @param uid: uid of the lock to get
         @result: lock object (or None)
         '''
-        for lock in self.__waiting_locks:
-            if lock.uid == uid and not(lock.is_expired()):
-                return lock
-        if self.active_lock and not(self.active_lock.is_expired()):
-            if self.active_lock.uid == uid:
-                return self.active_lock
+        lock = self.__waiting_locks.get(uid)
+        if lock is None:
+            lock = self.__active_locks.get(uid)
+        if lock is not None and not(lock.is_expired()):
+            return lock
+        return None
 
     def remove_active_lock(self, timeout=True, uid=None):
         '''
-        @summary: remove the active lock of the resource (if any)
+        @summary: remove an active lock of the resource (if any)
         @param timeout: if True, the delete is made by a timeout
         @param uid: uid of the lock to delete (or None to delete
-                    the active lock without specific test)
+                    all active locks without specific test)
         @result: True if there was an active lock, False else
 
         Of course, if there is some non expired waiting locks,
-        the first one is promoted as the active lock of the resource
-        '''
-        if self.active_lock:
-            if not(uid) or self.active_lock.uid == uid:
-                self.active_lock.delete(timeout=timeout)
-                self.active_lock = None
-                while True:
-                    try:
-                        lock = self.__waiting_locks.popleft()
-                        if lock.is_expired():
-                            lock.delete(timeout=timeout)
-                            continue
-                        lock.set_active()
-                        self.active_lock = lock
-                        break
-                    except IndexError:
-                        break
-                return True
-        return False
+        the first ones are promoted as active locks of the resource
+        '''
+        if uid:
+            lock = self.__active_locks.get(uid)
+            if lock is None:
+                return False
+            self.__remove_active_lock(lock, timeout=timeout)
+        else:
+            if len(self.__active_locks) == 0:
+                return False
+            for lock in list(self.__active_locks.values()):
+                self.__remove_active_lock(lock, timeout=timeout)
+        self.__grant_waiting_locks(timeout=timeout)
+        return True
 
     def add_lock(self, lock):
         '''
         @summary: add a lock to the resource
         @param lock: lock object
+        @result: True if the lock has been added, False if the lock expects
+                 another capacity for the resource
 
-        If there is no active lock, the lock is promoted as the active
-        lock for the resource
+        If there is no waiting lock and if the lock is compatible with
+        active locks, the lock is promoted as an active lock for the
+        resource
 
-        If there is alreay an active lock, the lock is added to the
-        waiting list
+        Else, the lock is added to the waiting list
         '''
-        if not(self.active_lock):
-            lock.set_active()
-            self.active_lock = lock
+        if lock.capacity is None:
+            lock.capacity = self.__capacity
+        elif lock.capacity != self.__capacity:
+            return False
+        if len(self.__waiting_locks) == 0 and self.__is_compatible(lock):
+            self.__set_active(lock, was_waiting=False)
         else:
+            self.version = self.version + 1
             self.__waiting_locks.append(lock)
+            if self.__expiry_index is not None:
+                self.__expiry_index.push(lock)
+            if self.__listener is not None:
+                (self.__listener)(EVENT_WAITING, lock)
+        return True
 
-    def clean_expired_locks(self):
+    def try_lock(self, lock):
         '''
-        @summary: clean expired lock of the resource (active and waiting)
+        @summary: activate the lock only if it can be done immediately
+        @param lock: lock object
+        @result: True if the lock is active, False if the resource is busy, None
+                 if the lock expects another capacity for the resource (the lock
+                 is never queued)
+
+        The resource is busy if there are waiting locks or if the lock is not
+        compatible with active locks
         '''
-        tmp_queue = collections.deque()
-        while True:
-            try:
-                lock = self.__waiting_locks.popleft()
-                if lock.is_expired():
-                    logging.warning("Expired waiting lock [%s] on [%s] => removing it" % (
-                                    lock.title, self.name))
-                    lock.delete()
-                    continue
-                tmp_queue.append(lock)
-            except IndexError:
-                break
-        self.__waiting_locks = tmp_queue
-        if self.active_lock and self.active_lock.is_expired():
+        if lock.capacity is None:
+            lock.capacity = self.__capacity
+        elif lock.capacity != self.__capacity:
+            return None
+        if len(self.__waiting_locks) == 0 and self.__is_compatible(lock):
+            self.__set_active(lock, was_waiting=False)
+            return True
+        if self.__listener is not None:
+            (self.__listener)(EVENT_BUSY, lock)
+        return False
+
+    def renew_lock(self, uid, lifetime=None):
+        '''
+        @summary: push back the lifetime timeout of the active lock with the given uid
+        @param uid: uid of the lock to renew
+        @param lifetime: new lifetime of the lock from now (in seconds), None => same
+                         lifetime as before
+        @result: True if the lock has been renewed, False else (no active lock
+                 with this uid)
+        '''
+        lock = self.__active_locks.get(uid)
+        if lock is None or lock.is_expired():
+            return False
+        self.version = self.version + 1
+        lock.renew(lifetime)
+        if self.__expiry_index is not None:
+            self.__expiry_index.discard(lock)
+            self.__expiry_index.push(lock)
+        if self.__listener is not None:
+            (self.__listener)(EVENT_RENEWED, lock)
+        return True
+
+    def restore_lock(self, lock):
+        '''
+        @summary: add an already active lock to the resource (after a restart)
+        @param lock: lock object (active)
+        @result: True if the lock has been restored, False if it's not compatible
+                 with already active locks
+        '''
+        if lock.capacity != self.__capacity or not(self.__is_compatible(lock)):
+            return False
+        self.version = self.version + 1
+        self.__add_active_lock(lock)
+        if self.__expiry_index is not None:
+            self.__expiry_index.push(lock)
+        return True
+
+    def get_active_locks(self):
+        '''
+        @summary: returns the active locks of the resource
+        @result: python list of lock objects
+        '''
+        return list(self.__active_locks.values())
+
+    def get_locks_count(self):
+        '''
+        @summary: returns the number of active and waiting locks
+        @result: tuple (number of active locks, number of waiting locks)
+        '''
+        return (len(self.__active_locks), len(self.__waiting_locks))
+
+    def expire_lock(self, lock):
+        '''
+        @summary: expire the given lock of the resource (active or waiting)
+        @param lock: lock object (with a due deadline)
+        '''
+        if self.__active_locks.get(lock.uid) is lock:
             logging.warning("Expired active lock [%s] on [%s] => releasing it" % (
-                            self.active_lock.title, self.name))
-            self.remove_active_lock()
+                            lock.title, self.name))
+            self.remove_active_lock(uid=lock.uid)
+            return
+        if self.__waiting_locks.get(lock.uid) is not lock:
+            return
+        self.__waiting_locks.remove(lock.uid)
+        logging.warning("Expired waiting lock [%s] on [%s] => removing it" % (
+                        lock.title, self.name))
+        self.__delete_lock(lock, timeout=True)
+        self.__grant_waiting_locks()
 
 
 class LockManager(object):
@@ -298,6 +834,11 @@ class LockManager(object):
     '''
 
     __resources_dict = None
+    __name_index = None
+    __expiry_index = None
+    __reclaimed_resources = 0
+    __listeners = None
+    __version = 0
 
     def __init__(self):
         '''
@@ -305,6 +846,107 @@ class LockManager(object):
         @result: ResourceManager object
         '''
         self.__resources_dict = {}
+        # (sorted names of resources, for paginated listings)
+        self.__name_index = NameIndex()
+        self.__expiry_index = ExpiryIndex()
+        self.__reclaimed_resources = 0
+        self.__listeners = []
+        self.__version = 0
+
+    def __notify(self, event, lock):
+        if event != EVENT_BUSY:
+            self.__version = self.__version + 1
+        for listener in self.__listeners:
+            listener(event, lock)
+
+    def __get_or_create_resource(self, resource_name, capacity=None):
+        resource = self.__resources_dict.get(resource_name)
+        if resource is None:
+            # (a new resource starts at the global version, so a version is never
+            # reused by successive resources with the same name)
+            resource = Resource(resource_name, self.__expiry_index, self.__notify, capacity,
+                                version=self.__version)
+            self.__resources_dict[resource_name] = resource
+            self.__name_index.add(resource_name)
+        return resource
+
+    def add_listener(self, listener):
+        '''
+        @summary: add a listener of lock events
+        @param listener: callable invoked with (event, lock) arguments on each lock
+                         event (EVENT_* constants)
+        '''
+        self.__listeners.append(listener)
+
+    def remove_listener(self, listener):
+        '''
+        @summary: remove a listener of lock events
+        @param listener: callable previously given to add_listener
+        '''
+        self.__listeners.remove(listener)
+
+    def __reclaim_if_empty(self, resource):
+        if resource.is_empty() and self.__resources_dict.get(resource.name) is resource:
+            del(self.__resources_dict[resource.name])
+            self.__name_index.remove(resource.name)
+            self.__reclaimed_resources = self.__reclaimed_resources + 1
+
+    def get_counters(self):
+        '''
+        @summary: returns some counters about resources
+        @result: python dict (live resources and resources automatically
+                 reclaimed since the start)
+        '''
+        return {"resources": len(self.__resources_dict),
+                "reclaimed_resources": self.__reclaimed_resources}
+
+    def get_version(self):
+        '''
+        @summary: returns the global version counter
+        @result: integer (incremented on each change of any resource)
+        '''
+        return self.__version
+
+    def get_resource_version(self, resource_name):
+        '''
+        @summary: returns the version counter of the given resource
+        @param resource_name: name of the resource
+        @result: integer (or None if the resource has no lock)
+        '''
+        resource = self.__resources_dict.get(resource_name)
+        if resource is None:
+            return None
+        return resource.version
+
+    def get_locks_count(self):
+        '''
+        @summary: returns the number of active and waiting locks of all resources
+        @result: tuple (number of active locks, number of waiting locks)
+
+        This method visits all resources (it's not designed for a hot path)
+        '''
+        active = 0
+        waiting = 0
+        for resource in self.__resources_dict.values():
+            (resource_active, resource_waiting) = resource.get_locks_count()
+            active = active + resource_active
+            waiting = waiting + resource_waiting
+        return (active, waiting)
+
+    def set_expiry_callback(self, callback):
+        '''
+        @summary: setter for the callback invoked (with the deadline as argument)
+                  when a lock deadline becomes the nearest one
+        @param callback: callback (or None)
+        '''
+        self.__expiry_index.set_new_deadline_callback(callback)
+
+    def get_next_expiry(self):
+        '''
+        @summary: returns the nearest lock deadline
+        @result: monotonic timestamp (or None if there is no lock)
+        '''
+        return self.__expiry_index.next_deadline()
 
     def remove_all_resources(self):
         '''
@@ -314,14 +956,34 @@ class LockManager(object):
         for name in resource_names:
             self.remove_resource(name)
         self.__resources_dict = {}
+        self.__name_index.clear()
+        self.__expiry_index.clear()
 
-    def get_resources_names(self):
+    def get_resources_names(self, prefix=None):
         '''
         @summary: returns a python list with resource names
-        @result: python list of strings
+        @param prefix: only names beginning with this prefix (None => all names)
+        @result: python list of strings (sorted if prefix is given)
+
+        With a prefix, the cost is proportional to the number of matched names
         '''
+        if prefix:
+            return list(self.__name_index.iter_from(prefix=prefix))
         return list(self.__resources_dict.keys())
 
+    def get_resources_page(self, after=None, prefix=None, limit=1000):
+        '''
+        @summary: returns a page of resource names (in sorted order)
+        @param after: only names after this one (cursor), None => from the first name
+        @param prefix: only names beginning with this prefix, None => all names
+        @param limit: max number of names (None => no limit)
+        @result: python list of strings
+
+        The cost is proportional to the size of the page (not to the number
+        of resources)
+        '''
+        return list(itertools.islice(self.__name_index.iter_from(after, prefix), limit))
+
     def get_resource_as_dict(self, resource_name):
         '''
         @summary: returns the given resource as a python dict
@@ -341,25 +1003,79 @@ class LockManager(object):
         if resource_name in self.__resources_dict:
             res = self.__resources_dict[resource_name].delete()
             del(self.__resources_dict[resource_name])
+            self.__name_index.remove(resource_name)
             return res
         return False
 
+    def remove_resources(self, prefix):
+        '''
+        @summary: remove all resources (and their locks) whose name begins with prefix
+        @param prefix: prefix of resource names
+        @result: number of removed resources
+        '''
+        res = 0
+        for resource_name in self.get_resources_names(prefix):
+            if self.remove_resource(resource_name):
+                res = res + 1
+        return res
+
     def add_lock(self, resource_name, lock):
         '''
         @summary: add a lock to the resource
         @param resource_name: name of the resource
         @param lock: lock object
+        @result: True if the lock has been added, False if the lock expects
+                 another capacity for the resource
 
-        If there is no active lock, the lock is promoted as the active
-        lock for the resource
+        If the lock is compatible with active locks (and if there is no
+        waiting lock), the lock is promoted as an active lock for the
+        resource
 
-        If there is alreay an active lock, the lock is added to the
-        waiting list
+        Else, the lock is added to the waiting list
+
+        Resources are created on demand here (with the capacity expected
+        by the lock) and reclaimed automatically when their last lock is
+        released or expired
         '''
-        if resource_name not in self.__resources_dict:
-            self.__resources_dict[resource_name] = Resource(resource_name)
-        resource = self.__resources_dict[resource_name]
-        resource.add_lock(lock)
+        resource = self.__get_or_create_resource(resource_name, lock.capacity)
+        return resource.add_lock(lock)
+
+    def try_lock(self, resource_name, lock):
+        '''
+        @summary: acquire a lock on the resource only if it can be done immediately
+        @param resource_name: name of the resource
+        @param lock: lock object
+        @result: True if the lock is active, False if the resource is busy, None
+                 if the lock expects another capacity for the resource (the lock
+                 is never queued)
+        '''
+        resource = self.__get_or_create_resource(resource_name, lock.capacity)
+        res = resource.try_lock(lock)
+        self.__reclaim_if_empty(resource)
+        return res
+
+    def restore_lock(self, lock):
+        '''
+        @summary: add an already active lock to its resource (after a restart)
+        @param lock: lock object (active)
+        @result: True if the lock has been restored, False if it's not
+                 compatible with already active locks of the resource
+        '''
+        resource = self.__get_or_create_resource(lock.resource_name, lock.capacity)
+        if not(resource.restore_lock(lock)):
+            self.__reclaim_if_empty(resource)
+            return False
+        self.__notify(EVENT_RESTORED, lock)
+        return True
+
+    def get_active_locks(self):
+        '''
+        @summary: iterates over the active locks of all resources
+        @result: generator of lock objects
+        '''
+        for resource in list(self.__resources_dict.values()):
+            for lock in resource.get_active_locks():
+                yield lock
 
     def delete_lock(self, resource_name, uid):
         '''
@@ -368,10 +1084,49 @@ class LockManager(object):
         @param uid: uid of the lock to delete
         @param lock: True if something has been deleted (False else)
         '''
-        if resource_name not in self.__resources_dict:
-            self.__resources_dict[resource_name] = Resource(resource_name)
-        resource = self.__resources_dict[resource_name]
-        return resource.delete(uid)
+        resource = self.__resources_dict.get(resource_name)
+        if resource is None:
+            return False
+        res = resource.delete(uid)
+        self.__reclaim_if_empty(resource)
+        return res
+
+    def delete_locks(self, items):
+        '''
+        @summary: delete several locks in a single pass
+        @param items: iterable of (resource name, uid) tuples
+        @result: python list of booleans (True if the corresponding lock has been
+                 deleted, False else), in the same order as items
+
+        Emptied resources are reclaimed once, after all deletions
+        '''
+        res = []
+        touched = {}
+        for (resource_name, uid) in items:
+            resource = self.__resources_dict.get(resource_name)
+            if resource is None:
+                res.append(False)
+                continue
+            res.append(resource.delete(uid))
+            touched[resource_name] = resource
+        for resource in touched.values():
+            self.__reclaim_if_empty(resource)
+        return res
+
+    def renew_lock(self, resource_name, uid, lifetime=None):
+        '''
+        @summary: push back the lifetime timeout of a specific active lock
+        @param resource_name: name of the resource
+        @param uid: uid of the lock to renew
+        @param lifetime: new lifetime of the lock from now (in seconds), None => same
+                         lifetime as before
+        @result: True if the lock has been renewed, False else (no active lock
+                 with this uid)
+        '''
+        resource = self.__resources_dict.get(resource_name)
+        if resource is None:
+            return False
+        return resource.renew_lock(uid, lifetime)
 
     def get_lock(self, resource_name, uid):
         '''
@@ -380,18 +1135,40 @@ class LockManager(object):
         @param uid: uid of the lock to get
         @param lock: lock object (or None if not found)
         '''
-        if resource_name not in self.__resources_dict:
-            self.__resources_dict[resource_name] = Resource(resource_name)
-        resource = self.__resources_dict[resource_name]
+        resource = self.__resources_dict.get(resource_name)
+        if resource is None:
+            return None
         return resource.get(uid)
 
+    def get_locks(self, items):
+        '''
+        @summary: get several locks in a single pass
+        @param items: iterable of (resource name, uid) tuples
+        @result: python list of lock objects (or None if not found), in the same
+                 order as items
+        '''
+        resources = self.__resources_dict
+        res = []
+        for (resource_name, uid) in items:
+            resource = resources.get(resource_name)
+            res.append(None if resource is None else resource.get(uid))
+        return res
+
     def clean_expired_locks(self):
         '''
         @summary: clean expired lock of all resources (active and waiting)
+
+        Only the locks with a due deadline are visited (thanks to the expiry index)
         '''
-        names = self.get_resources_names()
-        for name in names:
-            self.__resources_dict[name].clean_expired_locks()
+        now = monotonic()
+        while True:
+            lock = self.__expiry_index.pop_expired(now)
+            if lock is None:
+                break
+            resource = self.__resources_dict.get(lock.resource_name)
+            if resource is not None:
+                resource.expire_lock(lock)
+                self.__reclaim_if_empty(resource)
 
 
 LOCK_MANAGER_INSTANCE = LockManager()
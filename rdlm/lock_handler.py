@@ -5,14 +5,15 @@
 # See the LICENSE file for more information.
 
 from rdlm.request_handler import RequestHandler
-from rdlm.lock import LOCK_MANAGER_INSTANCE
+from rdlm.lock import LOCK_MANAGER_INSTANCE, parse_seconds
 from rdlm.hal import Resource, Link
+import json
 
 
 class LockHandler(RequestHandler):
     """Class which handles the /locks/[resource]/[uid] URL"""
 
-    SUPPORTED_METHODS = ['GET', 'DELETE']
+    SUPPORTED_METHODS = ['GET', 'DELETE', 'PUT']
 
     def get(self, name, uid):
         '''
@@ -20,8 +21,12 @@ class LockHandler(RequestHandler):
         @param name: name of the resource
         @param uid: uid of the lock
         '''
+        if self.redirect_to_owner(name):
+            return
         lock = LOCK_MANAGER_INSTANCE.get_lock(name, uid)
         if lock:
+            if self.check_etag(LOCK_MANAGER_INSTANCE.get_resource_version(name)):
+                return
             self.set_header('Content-Type', 'application/hal+json')
             hal_lock = Resource(href=self.reverse_url("lock", name, lock.uid),
                                 properties=lock.to_dict())
@@ -38,9 +43,42 @@ class LockHandler(RequestHandler):
         @param name: name of the resource
         @param uid: uid of the lock
         '''
+        if self.redirect_to_owner(name):
+            return
         res = LOCK_MANAGER_INSTANCE.delete_lock(name, uid)
         if res:
             self.send_status(204)
         else:
             self.send_error(status_code=404, message="lock not found")
             return
+
+    def put(self, name, uid):
+        '''
+        @summary: deals with PUT request (renewing an active lock)
+        @param name: name of the resource
+        @param uid: uid of the lock
+
+        The body is optional: {"lifetime": 300} (new lifetime from now in
+        seconds, or {"lifetime_ms": 300000}, the previous lifetime is used
+        if not given)
+        '''
+        if self.redirect_to_owner(name):
+            return
+        lifetime = None
+        raw_body = self.request.body.decode('utf-8')
+        if len(raw_body) > 0:
+            try:
+                tmp = json.loads(raw_body)
+                if 'lifetime' in tmp or 'lifetime_ms' in tmp:
+                    lifetime = parse_seconds(tmp, 'lifetime')
+            except (TypeError, ValueError):
+                self.send_error(status_code=400, message="invalid json body")
+                return
+        lock = LOCK_MANAGER_INSTANCE.get_lock(name, uid)
+        if not(lock):
+            self.send_error(status_code=404, message="lock not found")
+            return
+        if not(LOCK_MANAGER_INSTANCE.renew_lock(name, uid, lifetime)):
+            self.send_error(status_code=409, message="lock not active")
+            return
+        self.send_status(204)
@@ -10,12 +10,85 @@ import tornado.web
 import tornado.gen
 import tornado.ioloop
 from rdlm.lock import LOCK_MANAGER_INSTANCE
+from rdlm.idempotency import IDEMPOTENCY_INDEX
+from rdlm.options import Options
 import functools
+import time
 
 
 class LocksHandler(RequestHandler):
     """Class which handles the /locks/[resource] URL"""
 
+    __name = None
+    __lock = None
+    __key = None
+    __closed = False
+
+    def is_closed(self):
+        '''
+        @summary: returns True if the client connection is closed
+        @result: True (the connection is closed) or False
+        '''
+        return self.__closed or self.request.connection.stream.closed()
+
+    def on_connection_close(self):
+        '''
+        @summary: method called by tornado when the client closes the connection
+                  (before the end of the request)
+
+        The waiting lock is removed from the resource. If the lock has
+        already been acquired (but the reply not sent yet), it's released.
+
+        With an Idempotency-Key header, a waiting lock is kept during a
+        grace period (so a retry with the same key can be reattached to it).
+        It's deleted as soon as it becomes active if no retry came (an active
+        lock is never held by nobody).
+        '''
+        self.__closed = True
+        if self.__lock is None:
+            return
+        self.__lock.reset_callbacks()
+        if self.__key is not None:
+            token = IDEMPOTENCY_INDEX.detach(self.__name, self.__key, self.__lock)
+            if token is not None:
+                f = functools.partial(IDEMPOTENCY_INDEX.expire_detached, self.__name,
+                                      self.__key, token)
+                ioloop = tornado.ioloop.IOLoop.instance()
+                self.__lock.set_callbacks(functools.partial(ioloop.add_callback, f), None)
+                ioloop.add_timeout(time.time() + Options.idempotency_grace_period(), f)
+                return
+        LOCK_MANAGER_INSTANCE.delete_lock(self.__name, self.__lock.uid)
+
+    def on_detach(self):
+        '''
+        @summary: method called when the waiting lock is reattached to another
+                  request (retried with the same idempotency key)
+
+        The method returns an HTTP/409 in this case
+        '''
+        self.__lock = None
+        if self.is_closed():
+            return
+        self.send_error(status_code=409, message="lock request retried")
+
+    def __reattach(self, name, key):
+        lock = IDEMPOTENCY_INDEX.get(name, key)
+        if lock is None:
+            return False
+        if lock.is_active():
+            # (the previous request is already answered or about to be, or its
+            # client has disconnected)
+            IDEMPOTENCY_INDEX.reattach(name, key)
+            self.send_lock_acquired(name, lock)
+        else:
+            IDEMPOTENCY_INDEX.reattach(name, key, self.on_detach)
+            lock.set_callbacks(functools.partial(self.on_active_wrapper, name, lock),
+                               self.on_delete_wrapper)
+            self.__name = name
+            self.__lock = lock
+            self.__key = key
+        return True
+
     def on_active_wrapper(self, name, lock):
         '''
         @summary: wrapper method to invoke on_active method through tornado ioloop
@@ -41,6 +114,19 @@ class LocksHandler(RequestHandler):
 
         The method returns an HTTP/201 in this case with
         the corresponding Location header
+
+        If the client connection is closed, the lock is released
+        (see on_connection_close)
+        '''
+        if self.is_closed():
+            return
+        self.send_lock_acquired(name, lock)
+
+    def send_lock_acquired(self, name, lock):
+        '''
+        @summary: returns an HTTP/201 with the Location header of the given lock
+        @param name: name of the resource
+        @param lock: lock object
         '''
         url = "%s%s" % (self.get_base_url(self.request), self.reverse_url("lock", name, lock.uid))
         self.send_status(201, message="lock acquired at %s" % url, headers={"Location": url})
@@ -53,6 +139,8 @@ class LocksHandler(RequestHandler):
         The method returns an HTTP/408 or an HTTP/409 in this case
         (depending if the delete is made by a timeout or an admin request)
         '''
+        if self.is_closed():
+            return
         if not(timeout):
             self.send_error(status_code=409, message="lock request deleted")
         else:
@@ -64,6 +152,8 @@ class LocksHandler(RequestHandler):
         @summary: deals with POST request (acquiring locks on resource)
         @param name: name of the resource
         '''
+        if self.redirect_to_owner(name):
+            return
         raw_body = self.request.body.decode('utf-8')
         if len(raw_body) == 0:
             self.send_error(status_code=400, message="empty body")
@@ -72,6 +162,29 @@ class LocksHandler(RequestHandler):
         if not(lock):
             self.send_error(status_code=400, message="invalid json body")
             return
+        key = self.request.headers.get('Idempotency-Key')
+        if key and self.__reattach(name, key):
+            return
+        if lock.wait <= 0:
+            # try-lock: the request is answered right now (the lock is never queued)
+            res = LOCK_MANAGER_INSTANCE.try_lock(name, lock)
+            if res:
+                if key:
+                    IDEMPOTENCY_INDEX.add(name, key, lock)
+                self.send_lock_acquired(name, lock)
+            elif res is None:
+                self.send_error(status_code=409, message="the resource has another capacity")
+            else:
+                self.send_error(status_code=409, message="resource busy")
+            return
         lock.set_callbacks(functools.partial(self.on_active_wrapper, name, lock),
                            self.on_delete_wrapper)
-        LOCK_MANAGER_INSTANCE.add_lock(name, lock)
+        if not(LOCK_MANAGER_INSTANCE.add_lock(name, lock)):
+            lock.reset_callbacks()
+            self.send_error(status_code=409, message="the resource has another capacity")
+            return
+        if key:
+            IDEMPOTENCY_INDEX.add(name, key, lock, self.on_detach)
+            self.__key = key
+        self.__name = name
+        self.__lock = lock
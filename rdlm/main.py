@@ -6,10 +6,15 @@
 
 import tornado.ioloop
 import tornado.web
+import tornado.process
 from tornado.httpserver import HTTPServer
+import tornado.netutil
+from tornado.netutil import bind_sockets
 
+import datetime
 import functools
 import logging
+import os
 import signal
 import time
 
@@ -19,16 +24,70 @@ from rdlm.locks_handler import LocksHandler
 from rdlm.lock_handler import LockHandler
 from rdlm.resource_handler import ResourceHandler
 from rdlm.resources_handler import ResourcesHandler
-from rdlm.lock import LOCK_MANAGER_INSTANCE
+from rdlm.multilocks_handler import MultiLocksHandler
+from rdlm.multilock_handler import MultiLockHandler
+from rdlm.stats_handler import StatsHandler
+from rdlm.bulk_handler import BulkReleaseHandler, BulkStatusHandler
+from rdlm.watch_handler import WatchHandler
+from rdlm.lock import LOCK_MANAGER_INSTANCE, monotonic
+from rdlm.multilock import MULTILOCK_MANAGER_INSTANCE
+from rdlm.stats import STATS_INSTANCE
+from rdlm.sharding import SHARDING_INSTANCE
+from rdlm.journal import Journal
+from rdlm.credentials import CREDENTIALS_INSTANCE
+from rdlm.line_protocol import LineProtocolServer
 
 
-def on_every_second():
+class ExpiryTimer(object):
     '''
-    @summary: function called by tornado/ioloop every second
+    Class which schedules the cleaning of expired locks on the tornado ioloop
 
-    It's used to clear expired locks
+    There is only one pending timeout at a given time: the one of the
+    nearest lock deadline
     '''
-    LOCK_MANAGER_INSTANCE.clean_expired_locks()
+
+    __loop = None
+    __lock_manager = None
+    __timeout = None
+    __deadline = None
+
+    def __init__(self, loop, lock_manager):
+        '''
+        @summary: constructor
+        @param loop: tornado ioloop
+        @param lock_manager: LockManager object
+        '''
+        self.__loop = loop
+        self.__lock_manager = lock_manager
+
+    def schedule(self, deadline):
+        '''
+        @summary: schedule the cleaning of expired locks at the given deadline
+                  (if there is no nearer scheduled cleaning)
+        @param deadline: monotonic timestamp (see rdlm.lock.monotonic)
+        '''
+        if self.__deadline is not None and self.__deadline <= deadline:
+            return
+        if self.__timeout is not None:
+            self.__loop.remove_timeout(self.__timeout)
+        self.__deadline = deadline
+        delay = datetime.timedelta(seconds=max(deadline - monotonic(), 0))
+        self.__timeout = self.__loop.add_timeout(delay, self.on_timeout)
+
+    def on_timeout(self):
+        '''
+        @summary: method called by tornado/ioloop at the nearest lock deadline
+
+        It's used to clear expired locks
+        '''
+        self.__timeout = None
+        self.__deadline = None
+        before = time.time()
+        self.__lock_manager.clean_expired_locks()
+        STATS_INSTANCE.observe_sweep(time.time() - before)
+        deadline = self.__lock_manager.get_next_expiry()
+        if deadline is not None:
+            self.schedule(deadline)
 
 
 def get_app():
@@ -42,7 +101,14 @@ def get_app():
         tornado.web.URLSpec(r"/resources/([a-zA-Z0-9]+)", ResourceHandler, name="resource"),
         tornado.web.URLSpec(r"/resources", ResourcesHandler, name="resources"),
         tornado.web.URLSpec(r"/locks/([a-zA-Z0-9]+)", LocksHandler, name="locks"),
-        tornado.web.URLSpec(r"/locks/([a-zA-Z0-9]+)/([a-zA-Z0-9]+)", LockHandler, name="lock")
+        tornado.web.URLSpec(r"/locks/([a-zA-Z0-9]+)/([a-zA-Z0-9]+)", LockHandler, name="lock"),
+        tornado.web.URLSpec(r"/multilocks", MultiLocksHandler, name="multilocks"),
+        tornado.web.URLSpec(r"/multilocks/([a-zA-Z0-9]+)", MultiLockHandler, name="multilock"),
+        tornado.web.URLSpec(r"/bulk/release", BulkReleaseHandler, name="bulk_release"),
+        tornado.web.URLSpec(r"/bulk/status", BulkStatusHandler, name="bulk_status"),
+        tornado.web.URLSpec(r"/watch", WatchHandler, name="watch_prefix"),
+        tornado.web.URLSpec(r"/watch/([a-zA-Z0-9]+)", WatchHandler, name="watch"),
+        tornado.web.URLSpec(r"/stats", StatsHandler, name="stats")
     ]
     application = tornado.web.Application(url_list)
     return application
@@ -53,10 +119,36 @@ def get_ioloop():
     @summary: returns a configured tornado ioloop
     '''
     iol = tornado.ioloop.IOLoop.instance()
-    tornado.ioloop.PeriodicCallback(on_every_second, 1000, iol).start()
+    timer = ExpiryTimer(iol, LOCK_MANAGER_INSTANCE)
+    LOCK_MANAGER_INSTANCE.set_expiry_callback(timer.schedule)
+    MULTILOCK_MANAGER_INSTANCE.set_defer_callback(iol.add_callback)
+    deadline = LOCK_MANAGER_INSTANCE.get_next_expiry()
+    if deadline is not None:
+        timer.schedule(deadline)
     return iol
 
 
+def get_journal(worker_id=None):
+    '''
+    @summary: returns a journal (with recovered locks) attached to the lock manager
+    @param worker_id: id of the current worker (sharded mode) or None
+    @result: Journal object (or None if the persistence is disabled)
+    '''
+    directory = Options.journal_dir()
+    if not directory:
+        return None
+    if worker_id is not None:
+        directory = os.path.join(directory, "worker%i" % worker_id)
+    journal = Journal(directory)
+    before = time.time()
+    count = journal.recover(LOCK_MANAGER_INSTANCE)
+    logging.info("%i active lock(s) recovered from %s in %.3f seconds" % (
+                 count, directory, time.time() - before))
+    journal.snapshot(LOCK_MANAGER_INSTANCE)
+    LOCK_MANAGER_INSTANCE.add_listener(journal.on_event)
+    return journal
+
+
 def log_is_ready():
     '''
     @summary: simple callback just to log that the daemon is ready
@@ -69,6 +161,11 @@ def sigterm_handler(server, loop, signum, frame):
     loop.add_callback(functools.partial(stop_server, server, loop))
 
 
+def sighup_handler(loop, signum, frame):
+    logging.info("SIGHUP signal catched => scheduling admin userpass file reload...")
+    loop.add_callback(CREDENTIALS_INSTANCE.reload)
+
+
 def stop_server(server, loop):
     logging.info("Stopping webserver...")
     server.stop()
@@ -79,6 +176,19 @@ def stop_server(server, loop):
         logging.info("Webserver stopped !")
 
 
+def check_parent(server, loop, parent_pid):
+    '''
+    @summary: function called every second in worker processes to stop
+              the worker when the parent process is gone
+    '''
+    if os.getppid() != parent_pid:
+        logging.info("Parent process is gone => stopping webserver...")
+        stop_server(server, loop)
+    else:
+        loop.add_timeout(time.time() + 1, functools.partial(check_parent, server,
+                                                            loop, parent_pid))
+
+
 def stop_loop(loop):
     logging.info("Stopping main loop...")
     loop.stop()
@@ -91,15 +201,58 @@ def main():
     '''
     application = get_app()
     tornado.options.parse_command_line()
+    workers = Options.workers()
+    worker_id = None
     server = HTTPServer(application)
-    server.listen(Options.port())
+    if workers > 1:
+        sockets = bind_sockets(Options.port())
+        parent_pid = os.getpid()
+        worker_id = tornado.process.fork_processes(workers)
+        SHARDING_INSTANCE.configure(workers, Options.port(), worker_id)
+        server.add_sockets(sockets)
+        server.add_sockets(bind_sockets(SHARDING_INSTANCE.get_worker_port()))
+        logging.info("Worker %i is listening on port %i" % (worker_id,
+                     SHARDING_INSTANCE.get_worker_port()))
+    else:
+        server.listen(Options.port())
+    if Options.unix_socket():
+        if workers > 1:
+            # (redirections to the worker owning a resource are tcp urls)
+            logging.error("The unix socket is not available with several workers")
+        else:
+            server.add_socket(tornado.netutil.bind_unix_socket(Options.unix_socket(),
+                                                               mode=Options.unix_socket_mode()))
+    if Options.line_port() > 0:
+        if workers > 1:
+            # (the line protocol has no redirection to the worker owning a resource)
+            logging.error("The line protocol is not available with several workers")
+        else:
+            LineProtocolServer().listen(Options.line_port())
+    journal = get_journal(worker_id)
     iol = get_ioloop()
     iol.add_callback(log_is_ready)
+    if journal:
+        tornado.ioloop.PeriodicCallback(journal.flush, Options.journal_fsync_interval(),
+                                        iol).start()
+        tornado.ioloop.PeriodicCallback(functools.partial(journal.snapshot,
+                                                          LOCK_MANAGER_INSTANCE),
+                                        Options.journal_snapshot_interval() * 1000,
+                                        iol).start()
+    if Options.admin_userpass_file() not in ("yes", "no"):
+        CREDENTIALS_INSTANCE.reload(Options.admin_userpass_file())
+        tornado.ioloop.PeriodicCallback(CREDENTIALS_INSTANCE.reload_if_changed, 1000,
+                                        iol).start()
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, lambda s, f: sighup_handler(iol, s, f))
+    if workers > 1:
+        iol.add_callback(functools.partial(check_parent, server, iol, parent_pid))
     signal.signal(signal.SIGTERM, lambda s, f: sigterm_handler(server, iol, s, f))
     try:
         iol.start()
     except KeyboardInterrupt:
         stop_server(server, None)
+    if journal:
+        journal.close()
     logging.info("RDLM daemon is stopped !")
 
 
@@ -0,0 +1,367 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of restful-distributed-lock-manager released under the MIT license.
+# See the LICENSE file for more information.
+
+import functools
+import json
+import re
+import uuid
+
+from rdlm.lock import Lock, LOCK_MANAGER_INSTANCE, monotonic, parse_seconds
+from rdlm.lock import EVENT_RELEASED, EVENT_EXPIRED
+
+RESOURCE_NAME_REGEX = re.compile(r"^[a-zA-Z0-9]+$")
+
+OUTCOME_ACQUIRED = "acquired"
+OUTCOME_TIMEOUT = "timeout"
+OUTCOME_DELETED = "deleted"
+
+try:
+    STRING_TYPES = basestring
+except NameError:
+    # Compatibility with Python3
+    STRING_TYPES = str
+
+
+class MultiLock(object):
+    '''
+    Class which defines a lock on several resources (compound lock)
+
+    The multilock is made of one (exclusive) component lock for each
+    resource. All component locks share the uid of the multilock.
+
+    Component locks are acquired one by one in the canonical (sorted)
+    order of resource names: two multilocks on overlapping sets of
+    resources can't deadlock.
+
+    The multilock is active when all its component locks are active. If
+    a component lock is lost before (released, expired or deleted), the
+    whole multilock is aborted.
+    '''
+
+    uid = None
+    title = None
+    resource_names = None
+    lifetime = 0
+    wait = 0
+    wait_expires = None
+    __locks = None
+    __lock_manager = None
+    __defer = None
+    __adding = False
+    __active = False
+    __deleted = False
+    __active_callback = None
+    __delete_callback = None
+
+    def __init__(self, lock_manager, resource_names, title, wait, lifetime, defer=None):
+        '''
+        @summary: constructor
+        @param lock_manager: LockManager object
+        @param resource_names: list of resource names
+        @param title: title of the lock
+        @param wait: max wait (in seconds) to acquire all component locks
+        @param lifetime: timeout of the multilock (in seconds)
+        @param defer: callable used to run a function later (outside of the
+                      lock manager call stack), None => immediate call
+        @result: MultiLock object (not active)
+        '''
+        self.uid = str(uuid.uuid4()).replace('-', '')
+        self.resource_names = sorted(set(resource_names))
+        self.title = title
+        self.wait = wait
+        self.lifetime = lifetime
+        self.wait_expires = monotonic() + wait
+        self.__locks = []
+        self.__lock_manager = lock_manager
+        self.__defer = defer
+
+    @classmethod
+    def from_json(cls, lock_manager, json_string, defer=None):
+        '''
+        @summary: class method which returns a multilock object from a json string
+        @param lock_manager: LockManager object
+        @param json_string: json string (with "resources", "title", "wait" and
+                            "lifetime" keys)
+        @param defer: see constructor
+        @result: MultiLock object (or None if the json string is invalid)
+        '''
+        try:
+            tmp = json.loads(json_string)
+            title = tmp['title']
+            wait = parse_seconds(tmp, 'wait')
+            lifetime = parse_seconds(tmp, 'lifetime')
+            resource_names = tmp['resources']
+        except (KeyError, TypeError, ValueError):
+            return None
+        if not isinstance(resource_names, list) or len(resource_names) == 0:
+            return None
+        for name in resource_names:
+            if not(isinstance(name, STRING_TYPES)) or not(RESOURCE_NAME_REGEX.match(name)):
+                return None
+        return MultiLock(lock_manager, resource_names, title, wait, lifetime, defer=defer)
+
+    def __call(self, function, *args, **kwargs):
+        if self.__defer is None:
+            function(*args, **kwargs)
+        else:
+            (self.__defer)(functools.partial(function, *args, **kwargs))
+
+    def acquire(self, active_callback=None, delete_callback=None):
+        '''
+        @summary: starts to acquire component locks
+        @param active_callback: callback invoked (without argument) when the
+                                multilock becomes active
+        @param delete_callback: callback invoked (with a timeout argument) when
+                                the multilock can't be acquired
+        '''
+        self.__active_callback = active_callback
+        self.__delete_callback = delete_callback
+        self.__acquire_next()
+
+    def __acquire_next(self):
+        while not(self.__deleted) and len(self.__locks) < len(self.resource_names):
+            name = self.resource_names[len(self.__locks)]
+            wait = max(0, self.wait_expires - monotonic())
+            lock = Lock(name, self.title, wait, self.lifetime, uid=self.uid)
+            lock.set_callbacks(self.__on_lock_active, self.__on_lock_delete)
+            self.__locks.append(lock)
+            self.__adding = True
+            try:
+                self.__lock_manager.add_lock(name, lock)
+            finally:
+                self.__adding = False
+            if not(lock.is_active()):
+                # (we will be called again when the lock becomes active)
+                return
+        if not(self.__deleted):
+            self.__set_active()
+
+    def __on_lock_active(self):
+        if self.__adding:
+            # (synchronous activation, see __acquire_next)
+            return
+        self.__call(self.__acquire_next)
+
+    def __on_lock_delete(self, timeout=True):
+        self.__call(self.abort, timeout=timeout)
+
+    def __set_active(self):
+        # (all component locks get the same deadline)
+        for lock in self.__locks:
+            if not(self.__lock_manager.renew_lock(lock.resource_name, lock.uid,
+                                                  self.lifetime)):
+                # (the component lock is not held anymore: expired or deleted)
+                self.abort(timeout=lock.is_expired())
+                return
+        self.__active = True
+        if self.__active_callback:
+            (self.__active_callback)()
+        self.__reset_callbacks()
+
+    def abort(self, timeout=True):
+        '''
+        @summary: aborts the acquisition of a waiting multilock (all component locks
+                  are released or deleted and the delete callback is invoked)
+        @param timeout: if True, the abort is caused by a timeout
+        '''
+        if not(self.__deleted) and not(self.__active):
+            self.__release(timeout=timeout)
+
+    def __reset_callbacks(self):
+        self.__active_callback = None
+        self.__delete_callback = None
+
+    def __release(self, timeout):
+        was_waiting = not(self.__active) and not(self.__deleted)
+        self.__deleted = True
+        res = False
+        for lock in self.__locks:
+            lock.reset_callbacks()
+            res = self.__lock_manager.delete_lock(lock.resource_name, lock.uid) or res
+        if was_waiting and self.__delete_callback:
+            (self.__delete_callback)(timeout=timeout)
+        self.__reset_callbacks()
+        return res
+
+    def release(self):
+        '''
+        @summary: releases (or deletes if they are waiting) all component locks
+        @result: True if at least one component lock has been released
+
+        If the multilock is not active yet, the delete callback is invoked
+        (as for a deleted waiting lock)
+        '''
+        return self.__release(timeout=False)
+
+    def is_active(self):
+        '''
+        @summary: returns True if the multilock is active (all locks acquired)
+        @result: True (the multilock is active) or False
+        '''
+        return self.__active and not(self.__deleted)
+
+    def is_deleted(self):
+        '''
+        @summary: returns True if the multilock has been released or deleted
+        @result: True (the multilock is deleted) or False
+        '''
+        return self.__deleted
+
+    def get_locks(self):
+        '''
+        @summary: returns the component locks already added to resources
+        @result: python list of lock objects (in the acquisition order)
+        '''
+        return list(self.__locks)
+
+    def to_dict(self):
+        '''
+        @summary: method which dumps the multilock as a python dict
+        @result: python dict
+        '''
+        return {"uid": self.uid,
+                "title": self.title,
+                "wait": self.wait,
+                "lifetime": self.lifetime,
+                "resources": self.resource_names,
+                "active": self.is_active()}
+
+
+class MultiLockManager(object):
+    '''
+    Class which stores multilocks by uid
+
+    Designed to be used as a singleton
+
+    When a component lock of an active multilock is released or expired,
+    the whole multilock is released. When an already acquired component
+    lock of a waiting multilock is released or expired, the multilock is
+    aborted.
+
+    Multilock requests are counted by outcome (a multilock is counted
+    once, whatever the number of its component locks)
+    '''
+
+    __lock_manager = None
+    __multilocks = None
+    __defer = None
+    __outcomes = None
+
+    def __init__(self, lock_manager):
+        '''
+        @summary: constructor
+        @param lock_manager: LockManager object
+        '''
+        self.__lock_manager = lock_manager
+        self.__multilocks = {}
+        self.__outcomes = {OUTCOME_ACQUIRED: 0, OUTCOME_TIMEOUT: 0, OUTCOME_DELETED: 0}
+        lock_manager.add_listener(self.on_event)
+
+    def set_defer_callback(self, defer):
+        '''
+        @summary: setter for the callable used to run a function later (outside
+                  of the lock manager call stack)
+        @param defer: callable (with a function as argument) or None (immediate call)
+        '''
+        self.__defer = defer
+
+    def new_multilock(self, json_string):
+        '''
+        @summary: builds a multilock object from a json string
+        @param json_string: json string (see MultiLock.from_json)
+        @result: MultiLock object (or None if the json string is invalid)
+        '''
+        return MultiLock.from_json(self.__lock_manager, json_string, defer=self.__defer)
+
+    def acquire(self, multilock, active_callback=None, delete_callback=None):
+        '''
+        @summary: stores the given multilock and starts to acquire it
+        @param multilock: MultiLock object
+        @param active_callback: see MultiLock.acquire
+        @param delete_callback: see MultiLock.acquire
+        '''
+        self.__multilocks[multilock.uid] = multilock
+
+        def on_active():
+            self.__outcomes[OUTCOME_ACQUIRED] += 1
+            if active_callback:
+                active_callback()
+
+        def on_delete(timeout=True):
+            self.__outcomes[OUTCOME_TIMEOUT if timeout else OUTCOME_DELETED] += 1
+            self.__multilocks.pop(multilock.uid, None)
+            if delete_callback:
+                delete_callback(timeout=timeout)
+
+        multilock.acquire(on_active, on_delete)
+
+    def get(self, uid):
+        '''
+        @summary: returns the multilock with the given uid
+        @param uid: uid of the multilock
+        @result: MultiLock object (or None)
+        '''
+        return self.__multilocks.get(uid)
+
+    def is_component(self, lock):
+        '''
+        @summary: returns True if the given lock is a component lock of a stored multilock
+        @param lock: lock object
+        @result: True or False
+        '''
+        return lock.uid in self.__multilocks
+
+    def get_outcomes(self):
+        '''
+        @summary: returns the counters of multilock requests by outcome
+        @result: python dict (outcome => counter)
+        '''
+        return dict(self.__outcomes)
+
+    def release(self, uid):
+        '''
+        @summary: releases the multilock with the given uid
+        @param uid: uid of the multilock
+        @result: True if the multilock has been released, False if not found
+        '''
+        multilock = self.__multilocks.get(uid)
+        if multilock is None:
+            return False
+        # (the multilock is still stored while its component locks are released,
+        # so their events can be recognized, see is_component)
+        multilock.release()
+        self.__multilocks.pop(uid, None)
+        return True
+
+    def on_event(self, event, lock):
+        '''
+        @summary: lock event listener (see LockManager.add_listener)
+        @param event: lock event (EVENT_* constants)
+        @param lock: lock object
+        '''
+        if event != EVENT_RELEASED and event != EVENT_EXPIRED:
+            return
+        multilock = self.__multilocks.get(lock.uid)
+        if multilock is None or multilock.is_deleted():
+            return
+        if multilock.is_active():
+            function = functools.partial(self.release, lock.uid)
+        elif lock.is_active():
+            # (a component lock acquired before the activation of the multilock:
+            # waiting component locks are handled by the multilock itself)
+            function = functools.partial(multilock.abort, timeout=(event == EVENT_EXPIRED))
+        else:
+            return
+        if self.__defer is None:
+            function()
+        else:
+            (self.__defer)(function)
+
+    def __len__(self):
+        return len(self.__multilocks)
+
+
+MULTILOCK_MANAGER_INSTANCE = MultiLockManager(LOCK_MANAGER_INSTANCE)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of restful-distributed-lock-manager released under the MIT license.
+# See the LICENSE file for more information.
+
+from rdlm.request_handler import RequestHandler
+from rdlm.multilock import MULTILOCK_MANAGER_INSTANCE
+from rdlm.hal import Resource, Link
+
+
+class MultiLockHandler(RequestHandler):
+    """Class which handles the /multilocks/[uid] URL"""
+
+    SUPPORTED_METHODS = ['GET', 'DELETE']
+
+    def get(self, uid):
+        '''
+        @summary: deals with GET request
+        @param uid: uid of the multilock
+        '''
+        multilock = MULTILOCK_MANAGER_INSTANCE.get(uid)
+        if multilock:
+            self.set_header('Content-Type', 'application/hal+json')
+            hal_multilock = Resource(href=self.reverse_url("multilock", uid),
+                                     properties=multilock.to_dict())
+            for lock in multilock.get_locks():
+                hal_lock_link = Link(href=self.reverse_url("lock", lock.resource_name, lock.uid))
+                hal_multilock.add_link(rel="locks", link=hal_lock_link, multiple=True)
+            self.write(hal_multilock.to_json())
+        else:
+            self.send_error(status_code=404, message="multilock not found")
+            return
+
+    def delete(self, uid):
+        '''
+        @summary: deals with DELETE request (releasing all locks of the multilock)
+        @param uid: uid of the multilock
+        '''
+        res = MULTILOCK_MANAGER_INSTANCE.release(uid)
+        if res:
+            self.send_status(204)
+        else:
+            self.send_error(status_code=404, message="multilock not found")
+            return
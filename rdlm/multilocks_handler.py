@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of restful-distributed-lock-manager released under the MIT license.
+# See the LICENSE file for more information.
+
+from rdlm.request_handler import RequestHandler
+import tornado.web
+import tornado.ioloop
+from rdlm.multilock import MULTILOCK_MANAGER_INSTANCE
+from rdlm.sharding import SHARDING_INSTANCE
+import functools
+
+
+class MultiLocksHandler(RequestHandler):
+    """Class which handles the /multilocks URL"""
+
+    __multilock = None
+    __closed = False
+
+    def is_closed(self):
+        '''
+        @summary: returns True if the client connection is closed
+        @result: True (the connection is closed) or False
+        '''
+        return self.__closed or self.request.connection.stream.closed()
+
+    def on_connection_close(self):
+        '''
+        @summary: method called by tornado when the client closes the connection
+                  (before the end of the request)
+
+        All locks of the multilock (waiting or already acquired) are released
+        '''
+        self.__closed = True
+        if self.__multilock is not None:
+            MULTILOCK_MANAGER_INSTANCE.release(self.__multilock.uid)
+
+    def on_active_wrapper(self, multilock):
+        '''
+        @summary: wrapper method to invoke on_active method through tornado ioloop
+        @param multilock: multilock object
+        '''
+        tornado.ioloop.IOLoop.instance().add_callback(functools.partial(self.on_active,
+                                                                        multilock))
+
+    def on_delete_wrapper(self, timeout=True):
+        '''
+        @summary: wrapper method to invoke on_delete method through tornado ioloop
+        @param timeout: if True, the delete is made by a timeout
+        '''
+        f = functools.partial(self.on_delete, timeout=timeout)
+        tornado.ioloop.IOLoop.instance().add_callback(f)
+
+    def on_active(self, multilock):
+        '''
+        @summary: method called when all the locks of the multilock are acquired
+        @param multilock: multilock object
+
+        The method returns an HTTP/201 in this case with
+        the corresponding Location header
+        '''
+        if self.is_closed():
+            return
+        url = "%s%s" % (self.get_base_url(self.request),
+                        self.reverse_url("multilock", multilock.uid))
+        self.send_status(201, message="locks acquired at %s" % url, headers={"Location": url})
+
+    def on_delete(self, timeout=True):
+        '''
+        @summary: method called when the wait for the locks is over
+        @param timeout: if True, the delete is made by a timeout
+
+        The method returns an HTTP/408 or an HTTP/409 in this case
+        (depending if the delete is made by a timeout or an admin request)
+        '''
+        if self.is_closed():
+            return
+        if not(timeout):
+            self.send_error(status_code=409, message="multilock request deleted")
+        else:
+            self.send_error(status_code=408, message="multilock request (wait) timeout")
+
+    def __redirect_to_owner(self, multilock):
+        owners = set([SHARDING_INSTANCE.get_owner_port(x) for x in multilock.resource_names])
+        if len(owners) > 1:
+            self.send_error(status_code=400,
+                            message="resources are owned by different workers")
+            return True
+        return self.redirect_to_owner(multilock.resource_names[0])
+
+    @tornado.web.asynchronous
+    def post(self):
+        '''
+        @summary: deals with POST request (acquiring locks on several resources)
+        '''
+        raw_body = self.request.body.decode('utf-8')
+        if len(raw_body) == 0:
+            self.send_error(status_code=400, message="empty body")
+            return
+        multilock = MULTILOCK_MANAGER_INSTANCE.new_multilock(raw_body)
+        if not(multilock):
+            self.send_error(status_code=400, message="invalid json body")
+            return
+        if self.__redirect_to_owner(multilock):
+            return
+        self.__multilock = multilock
+        MULTILOCK_MANAGER_INSTANCE.acquire(multilock,
+                                           functools.partial(self.on_active_wrapper, multilock),
+                                           self.on_delete_wrapper)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of restful-distributed-lock-manager released under the MIT license.
+# See the LICENSE file for more information.
+
+import bisect
+
+CHUNK_SIZE = 512
+
+
+class NameIndex(object):
+    '''
+    Class which defines a sorted set of (resource) names
+
+    Names are stored in a list of sorted chunks (of at most 2 * CHUNK_SIZE
+    names), so an insertion or a removal costs O(log n + CHUNK_SIZE) and
+    iterating from a given name doesn't visit the previous names.
+    '''
+
+    __slots__ = ('__chunks', '__maxes', '__len')
+
+    def __init__(self):
+        '''
+        @summary: constructor
+        @result: empty NameIndex object
+        '''
+        self.clear()
+
+    def clear(self):
+        '''
+        @summary: remove all names
+        '''
+        # (sorted lists of names)
+        self.__chunks = []
+        # (last name of each chunk)
+        self.__maxes = []
+        self.__len = 0
+
+    def add(self, name):
+        '''
+        @summary: adds a name (if not already in the index)
+        @param name: name to add
+        '''
+        if not self.__chunks:
+            self.__chunks.append([name])
+            self.__maxes.append(name)
+            self.__len = 1
+            return
+        position = bisect.bisect_left(self.__maxes, name)
+        if position == len(self.__maxes):
+            # (greater than all names: appended to the last chunk)
+            position = position - 1
+        chunk = self.__chunks[position]
+        index = bisect.bisect_left(chunk, name)
+        if index < len(chunk) and chunk[index] == name:
+            return
+        chunk.insert(index, name)
+        self.__maxes[position] = chunk[-1]
+        self.__len = self.__len + 1
+        if len(chunk) > 2 * CHUNK_SIZE:
+            self.__chunks.insert(position + 1, chunk[CHUNK_SIZE:])
+            del(chunk[CHUNK_SIZE:])
+            self.__maxes.insert(position, chunk[-1])
+
+    def remove(self, name):
+        '''
+        @summary: removes a name (if in the index)
+        @param name: name to remove
+        '''
+        position = bisect.bisect_left(self.__maxes, name)
+        if position == len(self.__maxes):
+            return
+        chunk = self.__chunks[position]
+        index = bisect.bisect_left(chunk, name)
+        if index == len(chunk) or chunk[index] != name:
+            return
+        del(chunk[index])
+        self.__len = self.__len - 1
+        if not chunk:
+            del(self.__chunks[position])
+            del(self.__maxes[position])
+        else:
+            self.__maxes[position] = chunk[-1]
+
+    def iter_from(self, start=None, prefix=None):
+        '''
+        @summary: iterates over names in sorted order
+        @param start: only names strictly greater than start (None => all names)
+        @param prefix: only names beginning with prefix (None => all names)
+        @result: generator of names
+
+        The index must not be modified during the iteration
+        '''
+        if prefix and (start is None or start < prefix):
+            # (names beginning with prefix are >= prefix)
+            start = prefix
+            position = bisect.bisect_left(self.__maxes, start)
+            index_function = bisect.bisect_left
+        elif start is not None:
+            position = bisect.bisect_right(self.__maxes, start)
+            index_function = bisect.bisect_right
+        else:
+            position = 0
+            index_function = None
+        chunks = self.__chunks
+        for position in range(position, len(chunks)):
+            chunk = chunks[position]
+            index = 0 if index_function is None else index_function(chunk, start)
+            index_function = None
+            for name in chunk[index:] if index else chunk:
+                if prefix and not name.startswith(prefix):
+                    return
+                yield name
+
+    def __contains__(self, name):
+        position = bisect.bisect_left(self.__maxes, name)
+        if position == len(self.__maxes):
+            return False
+        chunk = self.__chunks[position]
+        index = bisect.bisect_left(chunk, name)
+        return index < len(chunk) and chunk[index] == name
+
+    def __len__(self):
+        return self.__len
@@ -9,6 +9,27 @@ from tornado.options import options as tornado_options
 
 define("port", default=8888, type=int, metavar="PORT",
        help="main port (of the lock manager)", group="rdlm")
+define("workers", default=1, type=int, metavar="WORKERS",
+       help="number of worker processes (if > 1, resources are partitioned between \
+             workers and each worker also listens on PORT + 1 + worker id)", group="rdlm")
+define("journal_dir", default="", type=str, metavar="JOURNAL_DIR",
+       help="the full path of a directory to persist active locks in (journal and \
+             snapshots), empty => no persistence", group="rdlm")
+define("journal_fsync_interval", default=100, type=int, metavar="MILLISECONDS",
+       help="interval between two batched writes (with fsync) of the journal", group="rdlm")
+define("journal_snapshot_interval", default=300, type=int, metavar="SECONDS",
+       help="interval between two snapshots (which truncate the journal)", group="rdlm")
+define("line_port", default=0, type=int, metavar="LINE_PORT",
+       help="port of the line-oriented TCP protocol (see rdlm/line_protocol.py), \
+             0 => disabled (not available if WORKERS > 1)", group="rdlm")
+define("unix_socket", default="", type=str, metavar="UNIX_SOCKET",
+       help="the full path of a unix socket to also listen on (for clients on the same \
+             host), empty => no unix socket (not available if WORKERS > 1)", group="rdlm")
+define("unix_socket_mode", default="600", type=str, metavar="MODE",
+       help="permissions of the unix socket (octal)", group="rdlm")
+define("idempotency_grace_period", default=10.0, type=float, metavar="SECONDS",
+       help="how long the lock of a request with an Idempotency-Key header is kept after \
+             the client disconnects (waiting for a retry with the same key)", group="rdlm")
 define("admin_userpass_file", default="yes", type=str, metavar="ADMIN_USERPASS_FILE",
        help="the full path of an admin userpass file (special values : no => no admin requests, \
              yes => no auth for admin requests)", group="rdlm")
@@ -25,6 +46,70 @@ class Options(object):
         '''
         return tornado_options.port
 
+    @classmethod
+    def workers(cls):
+        '''
+        @summary: returns the number of worker processes
+        @result: the number of worker processes (as an integer)
+        '''
+        return tornado_options.workers
+
+    @classmethod
+    def journal_dir(cls):
+        '''
+        @summary: returns the journal directory
+        @result: the full path of the journal directory (empty => no persistence)
+        '''
+        return tornado_options.journal_dir
+
+    @classmethod
+    def journal_fsync_interval(cls):
+        '''
+        @summary: returns the interval between two batched writes of the journal
+        @result: the interval (in milliseconds)
+        '''
+        return tornado_options.journal_fsync_interval
+
+    @classmethod
+    def journal_snapshot_interval(cls):
+        '''
+        @summary: returns the interval between two snapshots
+        @result: the interval (in seconds)
+        '''
+        return tornado_options.journal_snapshot_interval
+
+    @classmethod
+    def line_port(cls):
+        '''
+        @summary: returns the port of the line-oriented TCP protocol
+        @result: the port (as an integer), 0 => disabled
+        '''
+        return tornado_options.line_port
+
+    @classmethod
+    def unix_socket(cls):
+        '''
+        @summary: returns the path of the unix socket
+        @result: the full path of the unix socket (empty => no unix socket)
+        '''
+        return tornado_options.unix_socket
+
+    @classmethod
+    def unix_socket_mode(cls):
+        '''
+        @summary: returns the permissions of the unix socket
+        @result: the permissions (as an integer)
+        '''
+        return int(tornado_options.unix_socket_mode, 8)
+
+    @classmethod
+    def idempotency_grace_period(cls):
+        '''
+        @summary: returns how long a lock is kept for a retry after a disconnection
+        @result: the grace period (in seconds, as a float)
+        '''
+        return tornado_options.idempotency_grace_period
+
     @classmethod
     def admin_userpass_file(cls):
         '''
@@ -12,7 +12,15 @@ except ImportError:
     # Compatibility with Python3
     from http.client import responses
 from rdlm.options import Options
-import base64
+from rdlm.sharding import SHARDING_INSTANCE
+from rdlm.credentials import CREDENTIALS_INSTANCE
+import socket
+import uuid
+
+AF_UNIX = getattr(socket, 'AF_UNIX', None)
+# (part of etags, so that etags of a previous run of the daemon never match,
+# shared by all workers in sharded mode: see check_etag)
+BOOT_ID = uuid.uuid4().hex[0:8]
 
 
 def admin_authenticated(func):
@@ -24,20 +32,12 @@ def admin_authenticated(func):
             handler.send_error(403)
             return False
         auth_header = handler.request.headers.get('Authorization')
-        if auth_header is not None and auth_header.startswith('Basic '):
-            tmp = auth_header.encode('ascii')
-            auth_decoded = base64.decodestring(tmp[6:])
-            basicauth_user, basicauth_pass = auth_decoded.decode('utf-8').split(':', 2)
-            try:
-                with open(admin_userpass_file, "r") as f:
-                    lines = f.readlines()
-                    for line in lines:
-                        username, password = line.strip().split(":", 1)
-                        if (basicauth_user == username) and (basicauth_pass == password):
-                            return func(handler, *args, **kwargs)
-            except:
-                handler.send_error(500, message="bad admin userpass file")
-                return False
+        try:
+            if CREDENTIALS_INSTANCE.check(admin_userpass_file, auth_header):
+                return func(handler, *args, **kwargs)
+        except IOError:
+            handler.send_error(500, message="bad admin userpass file")
+            return False
         handler.set_status(401)
         handler.set_header('WWW-Authenticate', 'Basic realm=Restricted')
         handler.finish()
@@ -58,9 +58,91 @@ class RequestHandler(tornado.web.RequestHandler):
         to get the correct hostname and port as choosen by the
         client (in order to avoid some problems with proxy
         configurations)
+
+        In sharded mode, the port is replaced by the own port of the
+        current worker (so that lock urls point directly to the worker
+        which owns the resource)
+
+        For a request received on the unix socket, an empty string is
+        returned (so that urls are relative and can be used on the same
+        socket by the client)
         '''
+        if self.is_unix_socket_request(request):
+            return ""
+        if SHARDING_INSTANCE.is_enabled():
+            return self.get_worker_base_url(request, SHARDING_INSTANCE.get_worker_port())
         return "%s://%s" % (request.protocol, request.host)
 
+    def is_unix_socket_request(self, request):
+        '''
+        @summary: returns True if the given request has been received on a unix socket
+        @param request: incoming HttpRequest object (from tornado)
+        @result: True or False
+        '''
+        stream = getattr(request.connection, 'stream', None)
+        family = getattr(getattr(stream, 'socket', None), 'family', None)
+        return AF_UNIX is not None and family == AF_UNIX
+
+    def get_worker_base_url(self, request, port):
+        '''
+        @summary: returns the http://hostname:port part of an url for the given port
+        @param request: incoming HttpRequest object (from tornado)
+        @param port: port of the worker
+        @result: the http://hostname:port part of an url
+        '''
+        host = request.host
+        if host.startswith('['):
+            # IPv6 address
+            hostname = host[0:host.index(']') + 1]
+        else:
+            hostname = host.split(':')[0]
+        return "%s://%s:%i" % (request.protocol, hostname, port)
+
+    def redirect_to_owner(self, name):
+        '''
+        @summary: redirects the request to the worker which owns the given resource
+        @param name: name of the resource
+        @result: True if the request has been redirected (the resource is owned
+                 by another worker), False else
+
+        A 307 (Temporary Redirect) is used so that the method and the body
+        of the request are kept by the client
+        '''
+        port = SHARDING_INSTANCE.get_owner_port(name)
+        if port is None:
+            return False
+        url = "%s%s" % (self.get_worker_base_url(self.request, port), self.request.uri)
+        self.redirect(url, status=307)
+        return True
+
+    def check_etag(self, version):
+        '''
+        @summary: sets the ETag header from a version counter and answers
+                  an HTTP/304 if the client already has this version
+        @param version: version counter (integer)
+        @result: True if an HTTP/304 has been sent (nothing else to do),
+                 False else
+
+        Etags are weak ones: they change with the state of locks (and not
+        with the exact bytes of the representation)
+
+        In sharded mode, each worker has its own version counters, so the
+        worker id is part of the etag (a request on the main port can be
+        served by any worker)
+        '''
+        worker_id = SHARDING_INSTANCE.get_worker_id()
+        if worker_id is None:
+            etag = 'W/"%s-%x"' % (BOOT_ID, version)
+        else:
+            etag = 'W/"%s-%i-%x"' % (BOOT_ID, worker_id, version)
+        self.set_header("Etag", etag)
+        inm = self.request.headers.get("If-None-Match")
+        if inm and (inm.strip() == "*" or etag in [x.strip() for x in inm.split(",")]):
+            self.set_status(304)
+            self.finish()
+            return True
+        return False
+
     def send_status(self, status_code, message=None, headers=None):
         self.set_status(status_code)
         if headers:
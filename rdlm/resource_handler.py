@@ -20,6 +20,8 @@ class ResourceHandler(RequestHandler):
         @summary: deals with DELETE request (deleting the given resource)
         @param name: name of the resource
         '''
+        if self.redirect_to_owner(name):
+            return
         res = LOCK_MANAGER_INSTANCE.remove_resource(name)
         if res:
             self.send_status(204)
@@ -32,6 +34,11 @@ class ResourceHandler(RequestHandler):
         @summary: deals with GET request (getting a JSON HAL of the resource)
         @param name: name of the resource
         '''
+        if self.redirect_to_owner(name):
+            return
+        version = LOCK_MANAGER_INSTANCE.get_resource_version(name)
+        if version is not None and self.check_etag(version):
+            return
         tmp = LOCK_MANAGER_INSTANCE.get_resource_as_dict(name)
         resource = Resource(self.reverse_url("resource", name), {"name": name})
         if tmp:
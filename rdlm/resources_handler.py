@@ -6,7 +6,22 @@
 
 from rdlm.request_handler import RequestHandler, admin_authenticated
 from rdlm.lock import LOCK_MANAGER_INSTANCE
-from rdlm.hal import Resource
+import functools
+import json
+import re
+import tornado.ioloop
+import tornado.web
+try:
+    from urllib import urlencode
+except ImportError:
+    # Compatibility with Python3
+    from urllib.parse import urlencode
+
+NAME_REGEX = re.compile(r"^[a-zA-Z0-9]+$")
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+# (number of resources serialized between two flushes)
+STREAM_CHUNK_SIZE = 500
 
 
 class ResourcesHandler(RequestHandler):
@@ -17,21 +32,98 @@ class ResourcesHandler(RequestHandler):
     @admin_authenticated
     def delete(self):
         '''
-        @summary: deals with DELETE request (deleting all resources)
+        @summary: deals with DELETE request (deleting all resources or, with a
+                  "prefix" argument, all resources whose name begins with prefix)
         '''
-        LOCK_MANAGER_INSTANCE.remove_all_resources()
+        prefix = self.get_argument("prefix", None)
+        if prefix is None:
+            LOCK_MANAGER_INSTANCE.remove_all_resources()
+        elif not NAME_REGEX.match(prefix):
+            self.send_error(status_code=400, message="invalid prefix")
+            return
+        else:
+            LOCK_MANAGER_INSTANCE.remove_resources(prefix)
         self.send_status(204)
 
+    def __get_page_arguments(self):
+        after = self.get_argument("after", None)
+        prefix = self.get_argument("prefix", None)
+        for value in (after, prefix):
+            if value is not None and not NAME_REGEX.match(value):
+                return None
+        limit = self.get_argument("limit", None)
+        if limit is None and after is None:
+            # (no pagination, as before the "limit" and "after" arguments)
+            return (None, prefix, None)
+        try:
+            limit = int(limit or DEFAULT_PAGE_SIZE)
+        except ValueError:
+            return None
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            return None
+        return (after, prefix, limit)
+
+    def __page_url(self, after, prefix, limit):
+        arguments = []
+        if limit is not None:
+            arguments.append(("limit", limit))
+        if after is not None:
+            arguments.append(("after", after))
+        if prefix is not None:
+            arguments.append(("prefix", prefix))
+        if not arguments:
+            return self.reverse_url("resources")
+        return "%s?%s" % (self.reverse_url("resources"), urlencode(arguments))
+
+    @tornado.web.asynchronous
     @admin_authenticated
     def get(self):
         '''
         @summary: deals with GET request (getting a JSON HAL of resources)
+
+        The listing is in the sorted order of names, with an optional "prefix"
+        argument (filter). It's paginated if a "limit" argument (page size) or
+        an "after" argument (cursor: the last name of the previous page, see
+        the "next" link) is given, else all resources are listed.
+
+        The page is streamed in chunks (the ioloop can serve other requests
+        between two chunks)
         '''
-        resources = Resource(self.reverse_url("resources"))
-        resources_names = LOCK_MANAGER_INSTANCE.get_resources_names()
-        for resource_name in resources_names:
-            tmp = LOCK_MANAGER_INSTANCE.get_resource_as_dict(resource_name)
-            resource = Resource(self.reverse_url("resource", tmp['name']), {"name": tmp['name']})
-            resources.add_embedded_resource("resources", resource)
+        arguments = self.__get_page_arguments()
+        if arguments is None:
+            self.send_error(status_code=400, message="invalid arguments")
+            return
+        (after, prefix, limit) = arguments
+        if self.check_etag(LOCK_MANAGER_INSTANCE.get_version()):
+            return
+        if limit is None:
+            names = LOCK_MANAGER_INSTANCE.get_resources_page(None, prefix, None)
+        else:
+            names = LOCK_MANAGER_INSTANCE.get_resources_page(after, prefix, limit + 1)
+        links = {"self": {"href": self.__page_url(after, prefix, limit)}}
+        if limit is not None and len(names) > limit:
+            names = names[0:limit]
+            links["next"] = {"href": self.__page_url(names[-1], prefix, limit)}
+        head = LOCK_MANAGER_INSTANCE.get_counters()
+        head["_links"] = links
         self.set_header("Content-Type", "application/hal+json")
-        self.finish(resources.to_json())
+        self.write(json.dumps(head)[:-1] + ', "_embedded": {"resources": [')
+        self.__write_chunk(names, 0)
+
+    def __write_chunk(self, names, position):
+        if self.request.connection.stream.closed():
+            return
+        chunk = names[position:position + STREAM_CHUNK_SIZE]
+        items = [json.dumps({"name": name,
+                             "_links": {"self": {"href": self.reverse_url("resource", name)}}})
+                 for name in chunk]
+        if position > 0 and items:
+            self.write(", ")
+        self.write(", ".join(items))
+        position = position + len(chunk)
+        if position >= len(names):
+            self.finish("]}}")
+            return
+        self.flush()
+        tornado.ioloop.IOLoop.instance().add_callback(functools.partial(self.__write_chunk,
+                                                                        names, position))
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of restful-distributed-lock-manager released under the MIT license.
+# See the LICENSE file for more information.
+
+import bisect
+import hashlib
+
+
+class HashRing(object):
+    '''
+    Class which defines a consistent hashing ring
+
+    Each node is placed on the ring several times (virtual nodes) to
+    spread the keys evenly between nodes
+    '''
+
+    __keys = None
+    __nodes = None
+
+    def __init__(self, nodes, replicas=100):
+        '''
+        @summary: constructor
+        @param nodes: list of nodes (integers or strings)
+        @param replicas: number of virtual nodes for each node
+        @result: HashRing object
+        '''
+        points = []
+        for node in nodes:
+            for replica in range(0, replicas):
+                points.append((self.hash("%s-%i" % (node, replica)), node))
+        points.sort()
+        self.__keys = [x[0] for x in points]
+        self.__nodes = [x[1] for x in points]
+
+    @staticmethod
+    def hash(key):
+        '''
+        @summary: returns the position of the given key on the ring
+        @param key: string
+        @result: integer
+        '''
+        return int(hashlib.md5(key.encode('utf-8')).hexdigest()[0:8], 16)
+
+    def get_node(self, key):
+        '''
+        @summary: returns the node which owns the given key
+        @param key: string
+        @result: node (or None if the ring is empty)
+        '''
+        if not self.__keys:
+            return None
+        index = bisect.bisect(self.__keys, self.hash(key)) % len(self.__keys)
+        return self.__nodes[index]
+
+
+class Sharding(object):
+    '''
+    Class which knows which worker process owns a resource
+
+    Designed to be used as a singleton
+
+    In sharded mode, N worker processes share the main port and each
+    worker also listens on its own port (main port + 1 + worker id).
+    The resource namespace is partitioned between workers by consistent
+    hashing of the resource name.
+    '''
+
+    __ring = None
+    __worker_id = None
+    __base_port = None
+
+    def configure(self, workers, base_port, worker_id):
+        '''
+        @summary: enable (workers > 1) or disable the sharded mode
+        @param workers: number of worker processes
+        @param base_port: main port of the daemon
+        @param worker_id: id of the current worker (between 0 and workers - 1)
+        '''
+        if workers > 1:
+            self.__ring = HashRing(range(0, workers))
+        else:
+            self.__ring = None
+        self.__worker_id = worker_id
+        self.__base_port = base_port
+
+    def is_enabled(self):
+        '''
+        @summary: returns True if the sharded mode is enabled
+        @result: True or False
+        '''
+        return self.__ring is not None
+
+    def get_worker_id(self):
+        '''
+        @summary: returns the id of the current worker
+        @result: worker id (as an integer) or None if the sharded mode is disabled
+        '''
+        if self.__ring is None:
+            return None
+        return self.__worker_id
+
+    def get_worker_port(self, worker_id=None):
+        '''
+        @summary: returns the own port of a worker
+        @param worker_id: id of the worker (None => current worker)
+        @result: port (as an integer)
+        '''
+        if worker_id is None:
+            worker_id = self.__worker_id
+        return self.__base_port + 1 + worker_id
+
+    def get_owner_port(self, resource_name):
+        '''
+        @summary: returns the own port of the worker which owns the given resource
+        @param resource_name: name of the resource
+        @result: port (as an integer) or None if the resource is owned
+                 by the current worker (or if the sharded mode is disabled)
+        '''
+        if self.__ring is None:
+            return None
+        owner = self.__ring.get_node(resource_name)
+        if owner == self.__worker_id:
+            return None
+        return self.get_worker_port(owner)
+
+
+SHARDING_INSTANCE = Sharding()
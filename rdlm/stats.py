@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of restful-distributed-lock-manager released under the MIT license.
+# See the LICENSE file for more information.
+
+import bisect
+
+from rdlm.lock import LOCK_MANAGER_INSTANCE, monotonic
+from rdlm.lock import EVENT_WAITING, EVENT_ACTIVE, EVENT_RELEASED, EVENT_EXPIRED, EVENT_BUSY
+from rdlm.lock import EVENT_RESTORED
+from rdlm.multilock import MULTILOCK_MANAGER_INSTANCE
+
+OUTCOME_ACQUIRED = "acquired"
+OUTCOME_TIMEOUT = "timeout"
+OUTCOME_DELETED = "deleted"
+OUTCOME_BUSY = "busy"
+RELEASE_RELEASED = "released"
+RELEASE_EXPIRED = "expired"
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+HOLD_BUCKETS = (0.01, 0.1, 1, 5, 10, 30, 60, 300, 900, 3600)
+SWEEP_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+
+
+class Histogram(object):
+    '''
+    Class which defines a histogram with fixed buckets (prometheus style)
+    '''
+
+    __bounds = None
+    __counts = None
+    __sum = 0
+    __count = 0
+
+    def __init__(self, bounds):
+        '''
+        @summary: constructor
+        @param bounds: sorted upper bounds of buckets
+        @result: Histogram object
+        '''
+        self.__bounds = list(bounds)
+        # (the last bucket is the +Inf one)
+        self.__counts = [0] * (len(self.__bounds) + 1)
+        self.__sum = 0
+        self.__count = 0
+
+    def observe(self, value):
+        '''
+        @summary: add a value to the histogram
+        @param value: value (float)
+        '''
+        self.__counts[bisect.bisect_left(self.__bounds, value)] += 1
+        self.__sum = self.__sum + value
+        self.__count = self.__count + 1
+
+    def get_count(self):
+        '''
+        @summary: returns the number of observed values
+        @result: integer
+        '''
+        return self.__count
+
+    def to_prometheus(self, name):
+        '''
+        @summary: dumps the histogram in the prometheus text format
+        @param name: name of the metric
+        @result: list of lines
+        '''
+        lines = []
+        cumulative = 0
+        for (bound, count) in zip(self.__bounds, self.__counts):
+            cumulative = cumulative + count
+            lines.append('%s_bucket{le="%s"} %i' % (name, bound, cumulative))
+        lines.append('%s_bucket{le="+Inf"} %i' % (name, self.__count))
+        lines.append('%s_sum %f' % (name, self.__sum))
+        lines.append('%s_count %i' % (name, self.__count))
+        return lines
+
+
+class Stats(object):
+    '''
+    Class which collects metrics about locks
+
+    Designed to be used as a singleton
+
+    Counters and gauges (active and waiting locks) are updated by lock
+    events (see LockManager.add_listener), so the cost is only a few
+    additions for each event and dumping the metrics doesn't depend on
+    the number of resources.
+
+    Component locks of multilocks are counted as locks (gauges, releases)
+    but not as lock requests (multilock requests have their own counters).
+    '''
+
+    __lock_manager = None
+    __multilock_manager = None
+    __active_count = 0
+    __waiting_locks = None
+    __outcomes = None
+    __releases = None
+    __wait_histogram = None
+    __hold_histogram = None
+    __sweep_histogram = None
+
+    def __init__(self, lock_manager, multilock_manager=None):
+        '''
+        @summary: constructor
+        @param lock_manager: LockManager object (without lock)
+        @param multilock_manager: MultiLockManager object (or None)
+        '''
+        self.__lock_manager = lock_manager
+        self.__multilock_manager = multilock_manager
+        self.__active_count = 0
+        # (waiting locks, to know if an activated lock was waiting)
+        self.__waiting_locks = set()
+        self.reset()
+        lock_manager.add_listener(self.on_event)
+
+    def reset(self):
+        '''
+        @summary: reset all counters and histograms (not gauges)
+        '''
+        self.__outcomes = {OUTCOME_ACQUIRED: 0, OUTCOME_TIMEOUT: 0, OUTCOME_DELETED: 0,
+                           OUTCOME_BUSY: 0}
+        self.__releases = {RELEASE_RELEASED: 0, RELEASE_EXPIRED: 0}
+        self.__wait_histogram = Histogram(WAIT_BUCKETS)
+        self.__hold_histogram = Histogram(HOLD_BUCKETS)
+        self.__sweep_histogram = Histogram(SWEEP_BUCKETS)
+
+    def on_event(self, event, lock):
+        '''
+        @summary: lock event listener (see LockManager.add_listener)
+        @param event: lock event (EVENT_* constants)
+        @param lock: lock object
+        '''
+        if event == EVENT_ACTIVE:
+            self.__active_count = self.__active_count + 1
+            self.__waiting_locks.discard(lock)
+            if not(self.__is_component(lock)):
+                self.__outcomes[OUTCOME_ACQUIRED] += 1
+                self.__wait_histogram.observe(lock.active_since - lock.wait_since)
+        elif event == EVENT_WAITING:
+            self.__waiting_locks.add(lock)
+        elif event == EVENT_RELEASED or event == EVENT_EXPIRED:
+            if lock.is_active():
+                self.__active_count = self.__active_count - 1
+                self.__releases[event] += 1
+                self.__hold_histogram.observe(monotonic() - lock.active_since)
+                return
+            self.__waiting_locks.discard(lock)
+            if self.__is_component(lock):
+                return
+            if event == EVENT_EXPIRED:
+                self.__outcomes[OUTCOME_TIMEOUT] += 1
+            else:
+                self.__outcomes[OUTCOME_DELETED] += 1
+        elif event == EVENT_BUSY:
+            self.__outcomes[OUTCOME_BUSY] += 1
+        elif event == EVENT_RESTORED:
+            self.__active_count = self.__active_count + 1
+
+    def __is_component(self, lock):
+        return self.__multilock_manager is not None and \
+            self.__multilock_manager.is_component(lock)
+
+    def observe_sweep(self, duration):
+        '''
+        @summary: records the duration of an expiry sweep
+        @param duration: duration (in seconds)
+        '''
+        self.__sweep_histogram.observe(duration)
+
+    def get_outcomes(self):
+        '''
+        @summary: returns the counters of lock requests by outcome
+        @result: python dict (outcome => counter)
+        '''
+        return dict(self.__outcomes)
+
+    def get_locks_count(self):
+        '''
+        @summary: returns the number of active and waiting locks
+        @result: tuple (number of active locks, number of waiting locks)
+        '''
+        return (self.__active_count, len(self.__waiting_locks))
+
+    def to_prometheus(self):
+        '''
+        @summary: dumps all metrics in the prometheus text format
+        @result: string
+        '''
+        lines = []
+        lines.append("# HELP rdlm_lock_requests_total Lock requests by outcome "
+                     "(acquired => 201, timeout => 408, deleted or busy => 409)")
+        lines.append("# TYPE rdlm_lock_requests_total counter")
+        for outcome in sorted(self.__outcomes.keys()):
+            lines.append('rdlm_lock_requests_total{outcome="%s"} %i' % (
+                         outcome, self.__outcomes[outcome]))
+        if self.__multilock_manager is not None:
+            outcomes = self.__multilock_manager.get_outcomes()
+            lines.append("# HELP rdlm_multilock_requests_total Multilock requests by "
+                         "outcome (acquired => 201, timeout => 408, deleted => 409)")
+            lines.append("# TYPE rdlm_multilock_requests_total counter")
+            for outcome in sorted(outcomes.keys()):
+                lines.append('rdlm_multilock_requests_total{outcome="%s"} %i' % (
+                             outcome, outcomes[outcome]))
+        lines.append("# HELP rdlm_lock_releases_total Released or expired active locks")
+        lines.append("# TYPE rdlm_lock_releases_total counter")
+        for reason in sorted(self.__releases.keys()):
+            lines.append('rdlm_lock_releases_total{reason="%s"} %i' % (
+                         reason, self.__releases[reason]))
+        lines.append("# HELP rdlm_lock_wait_seconds Time between the lock request and "
+                     "the lock acquisition")
+        lines.append("# TYPE rdlm_lock_wait_seconds histogram")
+        lines.extend(self.__wait_histogram.to_prometheus("rdlm_lock_wait_seconds"))
+        lines.append("# HELP rdlm_lock_hold_seconds Time between the lock acquisition and "
+                     "its release (or expiration)")
+        lines.append("# TYPE rdlm_lock_hold_seconds histogram")
+        lines.extend(self.__hold_histogram.to_prometheus("rdlm_lock_hold_seconds"))
+        lines.append("# HELP rdlm_expiry_sweep_seconds Duration of expiry sweeps")
+        lines.append("# TYPE rdlm_expiry_sweep_seconds histogram")
+        lines.extend(self.__sweep_histogram.to_prometheus("rdlm_expiry_sweep_seconds"))
+        counters = self.__lock_manager.get_counters()
+        (active, waiting) = self.get_locks_count()
+        gauges = (("rdlm_resources", "Resources with locks", counters['resources']),
+                  ("rdlm_active_locks", "Active locks", active),
+                  ("rdlm_waiting_locks", "Waiting locks", waiting))
+        for (name, help, value) in gauges:
+            lines.append("# HELP %s %s" % (name, help))
+            lines.append("# TYPE %s gauge" % name)
+            lines.append("%s %i" % (name, value))
+        lines.append("# HELP rdlm_reclaimed_resources_total Automatically reclaimed resources")
+        lines.append("# TYPE rdlm_reclaimed_resources_total counter")
+        lines.append("rdlm_reclaimed_resources_total %i" % counters['reclaimed_resources'])
+        return "\n".join(lines) + "\n"
+
+
+STATS_INSTANCE = Stats(LOCK_MANAGER_INSTANCE, MULTILOCK_MANAGER_INSTANCE)
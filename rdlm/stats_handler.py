@@ -0,0 +1,19 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of restful-distributed-lock-manager released under the MIT license.
+# See the LICENSE file for more information.
+
+from rdlm.request_handler import RequestHandler
+from rdlm.stats import STATS_INSTANCE
+
+
+class StatsHandler(RequestHandler):
+    """Class which handles the /stats URL"""
+
+    def get(self):
+        '''
+        @summary: deals with GET request (getting metrics in the prometheus text format)
+        '''
+        self.set_header("Content-Type", "text/plain; version=0.0.4")
+        self.finish(STATS_INSTANCE.to_prometheus())
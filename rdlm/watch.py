@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of restful-distributed-lock-manager released under the MIT license.
+# See the LICENSE file for more information.
+
+import json
+
+from rdlm.lock import LOCK_MANAGER_INSTANCE
+from rdlm.lock import EVENT_WAITING, EVENT_ACTIVE, EVENT_RELEASED, EVENT_EXPIRED
+
+WATCH_ACQUIRED = "acquired"
+WATCH_RELEASED = "released"
+WATCH_EXPIRED = "expired"
+WATCH_WAITER_ADDED = "waiter_added"
+WATCH_WAITER_REMOVED = "waiter_removed"
+
+
+class WatchManager(object):
+    '''
+    Class which dispatches lock events to watchers of a resource or of a
+    resource name prefix
+
+    Designed to be used as a singleton
+
+    Watchers are indexed by resource name and by prefix: for each lock
+    event, the cost is one dict lookup for the name and one for each
+    prefix of the name (whatever the number of watchers). The event is
+    serialized once for all its watchers.
+    '''
+
+    __names = None
+    __prefixes = None
+    __max_prefix_length = 0
+
+    def __init__(self, lock_manager):
+        '''
+        @summary: constructor
+        @param lock_manager: LockManager object
+        '''
+        # (resource name => list of watchers)
+        self.__names = {}
+        # (prefix => list of watchers)
+        self.__prefixes = {}
+        self.__max_prefix_length = 0
+        lock_manager.add_listener(self.on_event)
+
+    def __len__(self):
+        return sum([len(x) for x in self.__names.values()]) + \
+            sum([len(x) for x in self.__prefixes.values()])
+
+    def add_watcher(self, watcher, name=None, prefix=None):
+        '''
+        @summary: adds a watcher of a resource (or of resources with a name prefix)
+        @param watcher: callable invoked with (watch event name, json string)
+                        arguments for each event (WATCH_* constants)
+        @param name: name of the watched resource
+        @param prefix: prefix of the names of watched resources (if name is None),
+                       "" => all resources
+        '''
+        if name is not None:
+            self.__names.setdefault(name, []).append(watcher)
+        else:
+            self.__prefixes.setdefault(prefix, []).append(watcher)
+            self.__max_prefix_length = max(self.__max_prefix_length, len(prefix))
+
+    def remove_watcher(self, watcher, name=None, prefix=None):
+        '''
+        @summary: removes a watcher (see add_watcher)
+        @param watcher: callable previously given to add_watcher
+        @param name: name of the watched resource
+        @param prefix: prefix of the names of watched resources (if name is None)
+        '''
+        (index, key) = (self.__names, name) if name is not None else (self.__prefixes, prefix)
+        watchers = index.get(key)
+        if watchers is None or watcher not in watchers:
+            return
+        watchers.remove(watcher)
+        if not watchers:
+            del(index[key])
+            if index is self.__prefixes:
+                self.__max_prefix_length = max([len(x) for x in self.__prefixes] or [0])
+
+    def on_event(self, event, lock):
+        '''
+        @summary: lock event listener (see LockManager.add_listener)
+        @param event: lock event (EVENT_* constants)
+        @param lock: lock object
+        '''
+        name = lock.resource_name
+        watchers = self.__names.get(name)
+        if self.__prefixes:
+            # (the empty prefix watches all resources)
+            for length in range(0, min(len(name), self.__max_prefix_length) + 1):
+                prefix_watchers = self.__prefixes.get(name[0:length])
+                if prefix_watchers:
+                    watchers = (watchers or []) + prefix_watchers
+        if not watchers:
+            return
+        if event == EVENT_ACTIVE:
+            watch_event = WATCH_ACQUIRED
+        elif event == EVENT_WAITING:
+            watch_event = WATCH_WAITER_ADDED
+        elif event == EVENT_RELEASED or event == EVENT_EXPIRED:
+            if lock.is_active():
+                watch_event = WATCH_RELEASED if event == EVENT_RELEASED else WATCH_EXPIRED
+            else:
+                watch_event = WATCH_WAITER_REMOVED
+        else:
+            return
+        data = json.dumps({"resource": name, "uid": lock.uid, "title": lock.title,
+                           "mode": lock.mode, "timeout": event == EVENT_EXPIRED})
+        for watcher in list(watchers):
+            watcher(watch_event, data)
+
+
+WATCH_MANAGER_INSTANCE = WatchManager(LOCK_MANAGER_INSTANCE)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of restful-distributed-lock-manager released under the MIT license.
+# See the LICENSE file for more information.
+
+from rdlm.request_handler import RequestHandler, admin_authenticated
+from rdlm.lock import LOCK_MANAGER_INSTANCE
+from rdlm.watch import WATCH_MANAGER_INSTANCE
+import json
+import re
+import time
+import tornado.ioloop
+import tornado.web
+
+NAME_REGEX = re.compile(r"^[a-zA-Z0-9]+$")
+KEEPALIVE_INTERVAL = 20
+
+
+class WatchHandler(RequestHandler):
+    """Class which handles the /watch and /watch/[resource] URLs (Server-Sent Events)"""
+
+    SUPPORTED_METHODS = ['GET']
+
+    __name = None
+    __prefix = None
+    __buffer = None
+    __keepalive = None
+    __closed = False
+
+    def on_watch_event(self, event, data):
+        '''
+        @summary: watcher callback (see WatchManager.add_watcher)
+        @param event: watch event name
+        @param data: json string
+
+        Events are buffered and written (with a single flush) on the next
+        ioloop iteration
+        '''
+        if not self.__buffer:
+            tornado.ioloop.IOLoop.instance().add_callback(self.__flush_events)
+        self.__buffer.append("event: %s\ndata: %s\n\n" % (event, data))
+
+    def __flush_events(self):
+        if self.__closed or not self.__buffer:
+            return
+        self.write("".join(self.__buffer))
+        self.__buffer = []
+        self.flush()
+
+    def __send_keepalive(self):
+        if self.__closed:
+            return
+        self.write(": keepalive\n\n")
+        self.flush()
+        self.__schedule_keepalive()
+
+    def __schedule_keepalive(self):
+        self.__keepalive = tornado.ioloop.IOLoop.instance().add_timeout(
+            time.time() + KEEPALIVE_INTERVAL, self.__send_keepalive)
+
+    def on_connection_close(self):
+        '''
+        @summary: method called by tornado when the client closes the connection
+        '''
+        self.__closed = True
+        WATCH_MANAGER_INSTANCE.remove_watcher(self.on_watch_event, name=self.__name,
+                                              prefix=self.__prefix)
+        if self.__keepalive is not None:
+            tornado.ioloop.IOLoop.instance().remove_timeout(self.__keepalive)
+
+    @tornado.web.asynchronous
+    @admin_authenticated
+    def get(self, name=None):
+        '''
+        @summary: deals with GET request (streaming events of a resource or of
+                  resources with a name prefix as Server-Sent Events)
+        @param name: name of the resource (None => "prefix" argument)
+        '''
+        prefix = None
+        if name is None:
+            prefix = self.get_argument("prefix", "")
+            if prefix and not NAME_REGEX.match(prefix):
+                self.send_error(status_code=400, message="invalid prefix")
+                return
+        elif self.redirect_to_owner(name):
+            return
+        self.__name = name
+        self.__prefix = prefix
+        self.__buffer = []
+        self.set_header("Content-Type", "text/event-stream")
+        self.set_header("Cache-Control", "no-cache")
+        if name is not None:
+            # (initial state of the resource)
+            resource = LOCK_MANAGER_INSTANCE.get_resource_as_dict(name)
+            locks = resource['locks'] if resource else []
+            data = {"resource": name,
+                    "active": len([x for x in locks if x['active']]),
+                    "waiting": len([x for x in locks if not x['active']])}
+            self.write("event: state\ndata: %s\n\n" % json.dumps(data))
+        else:
+            self.write(": watching\n\n")
+        self.flush()
+        WATCH_MANAGER_INSTANCE.add_watcher(self.on_watch_event, name=self.__name,
+                                           prefix=self.__prefix)
+        self.__schedule_keepalive()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import tornado.testing
+from rdlm.main import get_app as rdlm_get_app
+from rdlm.main import get_ioloop as rdlm_get_ioloop
+from rdlm.lock import LOCK_MANAGER_INSTANCE
+from rdlm.bulk_handler import parse_item
+import json
+
+
+class BulkTestCase(tornado.testing.AsyncHTTPTestCase):
+
+    def get_app(self):
+        return rdlm_get_app()
+
+    def get_new_ioloop(self):
+        return rdlm_get_ioloop()
+
+    def tearDown(self):
+        LOCK_MANAGER_INSTANCE.remove_all_resources()
+        super(BulkTestCase, self).tearDown()
+
+    def _post(self, url, body):
+        req = tornado.httpclient.HTTPRequest(self.get_url(url), method='POST', body=body)
+        self.http_client.fetch(req, self.stop)
+        return self.wait()
+
+    def _acquire(self, name, wait=5):
+        tmp = {"wait": wait, "lifetime": 60, "title": "test case"}
+        response = self._post("/locks/%s" % name, json.dumps(tmp))
+        self.assertEqual(response.code, 201)
+        return response.headers['Location']
+
+    def test_parse_item(self):
+        self.assertEqual(parse_item("http://localhost:8888/locks/foo/1234"), ("foo", "1234"))
+        self.assertEqual(parse_item("/locks/foo/1234"), ("foo", "1234"))
+        self.assertEqual(parse_item({"resource": "foo", "uid": "1234"}), ("foo", "1234"))
+        for item in ("/resources/foo", "/locks/foo", {"resource": "foo"}, 1, None,
+                     {"resource": "foo/bar", "uid": "1234"}):
+            self.assertEqual(parse_item(item), None)
+
+    def test_invalid_body(self):
+        for body in ("", "[]", '{"locks": "/locks/foo/1234"}', '{"foo": []}'):
+            self.assertEqual(self._post("/bulk/release", body).code, 400)
+
+    def test_status_and_release(self):
+        location1 = self._acquire("resource1")
+        location2 = self._acquire("resource2")
+        uid2 = location2.split("/")[-1]
+        items = [location1, {"resource": "resource2", "uid": uid2}, "/locks/resource3/1234",
+                 "foo"]
+        response = self._post("/bulk/status", json.dumps({"locks": items}))
+        self.assertEqual(response.code, 200)
+        results = json.loads(response.body.decode('utf-8'))['results']
+        self.assertEqual([x['status'] for x in results], [200, 200, 404, 400])
+        self.assertEqual(results[1]['lock']['uid'], uid2)
+        self.assertTrue(results[1]['lock']['active'])
+        response = self._post("/bulk/release", json.dumps({"locks": items + [location1]}))
+        self.assertEqual(response.code, 200)
+        results = json.loads(response.body.decode('utf-8'))['results']
+        self.assertEqual([x['status'] for x in results], [204, 204, 404, 400, 404])
+        self.assertEqual(results[1]['resource'], "resource2")
+        self.assertEqual(LOCK_MANAGER_INSTANCE.get_resources_names(), [])
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import base64
+import os
+import shutil
+import tempfile
+import unittest
+from rdlm.credentials import Credentials, constant_time_compare
+
+
+def basic(userpass):
+    return "Basic " + base64.standard_b64encode(userpass).decode('ascii')
+
+
+class CredentialsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "auth.txt")
+        self.credentials = Credentials()
+        self._write(["foo:bar", "", "foo2:bar2:baz"])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, lines):
+        with open(self.path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def test_constant_time_compare(self):
+        self.assertTrue(constant_time_compare(b"foo", b"foo"))
+        self.assertFalse(constant_time_compare(b"foo", b"fo0"))
+        self.assertFalse(constant_time_compare(b"foo", b"foo2"))
+
+    def test_check(self):
+        self.assertTrue(self.credentials.check(self.path, basic(b"foo:bar")))
+        self.assertTrue(self.credentials.check(self.path, basic(b"foo:bar")))
+        self.assertTrue(self.credentials.check(self.path, basic(b"foo2:bar2:baz")))
+        for header in (None, "foo", basic(b"foo:bar2"), basic(b"foo3:bar"), basic(b"foo"),
+                       "Basic !!!"):
+            self.assertFalse(self.credentials.check(self.path, header))
+
+    def test_reload_if_changed(self):
+        self.assertTrue(self.credentials.check(self.path, basic(b"foo:bar")))
+        self._write(["foo:barbar"])
+        self.assertTrue(self.credentials.check(self.path, basic(b"foo:bar")))
+        self.credentials.reload_if_changed()
+        self.assertFalse(self.credentials.check(self.path, basic(b"foo:bar")))
+        self.assertTrue(self.credentials.check(self.path, basic(b"foo:barbar")))
+
+    def test_bad_file(self):
+        self.assertRaises(IOError, self.credentials.check,
+                          os.path.join(self.tmpdir, "foo.txt"), basic(b"foo:bar"))
+        self._write(["foo"])
+        self.assertRaises(IOError, self.credentials.check, self.path, basic(b"foo:bar"))
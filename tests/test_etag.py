@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import unittest
+import tornado.testing
+from rdlm.main import get_app as rdlm_get_app
+from rdlm.main import get_ioloop as rdlm_get_ioloop
+from rdlm.lock import LockManager, Lock, LOCK_MANAGER_INSTANCE
+from rdlm.sharding import SHARDING_INSTANCE
+
+
+class VersionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = LockManager()
+
+    def test_versions(self):
+        self.assertEqual(self.manager.get_resource_version("resource1"), None)
+        lock1 = Lock("resource1", "test case", 5, 60)
+        self.manager.add_lock("resource1", lock1)
+        version1 = self.manager.get_resource_version("resource1")
+        self.manager.try_lock("resource1", Lock("resource1", "test case", 0, 60))
+        self.assertEqual(self.manager.get_resource_version("resource1"), version1)
+        self.manager.add_lock("resource1", Lock("resource1", "test case", 5, 60))
+        self.manager.renew_lock("resource1", lock1.uid)
+        version2 = self.manager.get_resource_version("resource1")
+        self.assertEqual(version2, version1 + 2)
+        self.assertEqual(self.manager.get_version(), version2)
+        # (a new resource with the same name never reuses a version)
+        self.manager.remove_resource("resource1")
+        self.manager.add_lock("resource1", Lock("resource1", "test case", 5, 60))
+        self.assertTrue(self.manager.get_resource_version("resource1") > version2)
+
+
+class ETagTestCase(tornado.testing.AsyncHTTPTestCase):
+
+    def get_app(self):
+        return rdlm_get_app()
+
+    def get_new_ioloop(self):
+        return rdlm_get_ioloop()
+
+    def tearDown(self):
+        LOCK_MANAGER_INSTANCE.remove_all_resources()
+        super(ETagTestCase, self).tearDown()
+
+    def _fetch(self, url, method='GET', body=None, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        req = tornado.httpclient.HTTPRequest(self.get_url(url), method=method, body=body,
+                                             headers=headers)
+        self.http_client.fetch(req, self.stop)
+        return self.wait()
+
+    def _acquire(self, name):
+        body = json.dumps({"title": "test case", "wait": 5, "lifetime": 60})
+        return self._fetch("/locks/%s" % name, method='POST', body=body).headers['Location']
+
+    def test_conditional_get(self):
+        location = self._acquire("resource1")
+        path = location[location.index("/locks/"):]
+        for url in ("/resources/resource1", path, "/resources"):
+            response = self._fetch(url)
+            self.assertEqual(response.code, 200)
+            etag = response.headers['Etag']
+            response = self._fetch(url, etag=etag)
+            self.assertEqual(response.code, 304)
+            self.assertEqual(response.body, b"")
+            self.assertEqual(self._fetch(url, etag='W/"foo", %s' % etag).code, 304)
+        self._fetch(path, method='PUT', body="")
+        for url in ("/resources/resource1", path, "/resources"):
+            response = self._fetch(url, etag=etag)
+            self.assertEqual(response.code, 200)
+            self.assertNotEqual(response.headers['Etag'], etag)
+
+    def test_etag_of_another_worker(self):
+        self._acquire("resource1")
+        SHARDING_INSTANCE.configure(2, 8888, 0)
+        try:
+            etag = self._fetch("/resources").headers['Etag']
+            self.assertEqual(self._fetch("/resources", etag=etag).code, 304)
+            # (the same version counter in another worker isn't the same listing)
+            SHARDING_INSTANCE.configure(2, 8888, 1)
+            response = self._fetch("/resources", etag=etag)
+            self.assertEqual(response.code, 200)
+            self.assertNotEqual(response.headers['Etag'], etag)
+        finally:
+            SHARDING_INSTANCE.configure(1, 8888, 0)
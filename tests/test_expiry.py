@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from rdlm.lock import LockManager, Lock, ExpiryIndex, monotonic
+
+
+class ExpiryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = LockManager()
+        self.deadlines = []
+        self.manager.set_expiry_callback(self.deadlines.append)
+
+    def test_next_expiry(self):
+        self.assertEqual(self.manager.get_next_expiry(), None)
+        lock1 = Lock("resource1", "test case", 5, 60)
+        lock2 = Lock("resource2", "test case", 5, 30)
+        self.manager.add_lock("resource1", lock1)
+        self.manager.add_lock("resource2", lock2)
+        self.assertEqual(self.manager.get_next_expiry(), lock2.active_expires)
+        self.assertEqual(self.deadlines, [lock1.active_expires, lock2.active_expires])
+        self.manager.delete_lock("resource2", lock2.uid)
+        self.assertEqual(self.manager.get_next_expiry(), lock1.active_expires)
+
+    def test_expired_active_lock(self):
+        lock1 = Lock("resource1", "test case", 5, 0)
+        lock2 = Lock("resource1", "test case", 5, 60)
+        self.manager.add_lock("resource1", lock1)
+        self.manager.add_lock("resource1", lock2)
+        self.manager.clean_expired_locks()
+        self.assertTrue(lock1.is_deleted())
+        self.assertTrue(self.manager.get_lock("resource1", lock2.uid) is lock2)
+        self.assertEqual(self.manager.get_next_expiry(), lock2.active_expires)
+
+    def test_expired_waiting_lock(self):
+        lock1 = Lock("resource1", "test case", 5, 60)
+        lock2 = Lock("resource1", "test case", 0, 60)
+        lock3 = Lock("resource1", "test case", 5, 60)
+        for lock in (lock1, lock2, lock3):
+            self.manager.add_lock("resource1", lock)
+        self.manager.clean_expired_locks()
+        self.assertTrue(lock2.is_deleted())
+        self.assertFalse(lock3.is_deleted())
+        self.manager.delete_lock("resource1", lock1.uid)
+        self.assertTrue(self.manager.get_lock("resource1", lock3.uid) is lock3)
+        self.assertEqual(self.manager.get_lock("resource1", lock2.uid), None)
+
+    def test_stale_count(self):
+        index = ExpiryIndex()
+        lock1 = Lock("resource1", "test case", 0, 60)
+        lock2 = Lock("resource1", "test case", 60, 60)
+        index.push(lock1)
+        index.push(lock2)
+        self.assertTrue(index.pop_expired(monotonic()) is lock1)
+        # (the popped entry is not in the heap anymore: it can't be stale)
+        index.discard(lock1)
+        self.assertEqual(index.get_stale_count(), 0)
+        index.discard(lock2)
+        index.discard(lock2)
+        self.assertEqual(index.get_stale_count(), 1)
+        lock2.renew()
+        index.push(lock2)
+        self.assertEqual(index.get_stale_count(), 1)
+        self.assertEqual(len(index), 2)
+        index.compact()
+        self.assertEqual(index.get_stale_count(), 0)
+        self.assertEqual(len(index), 1)
+
+    def test_expired_lock_is_not_stale(self):
+        lock1 = Lock("resource1", "test case", 5, 0)
+        self.manager.add_lock("resource1", lock1)
+        self.manager.clean_expired_locks()
+        self.assertTrue(lock1.is_deleted())
+        self.assertFalse(lock1.expiry_indexed)
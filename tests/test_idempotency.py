@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import time
+import unittest
+import tornado.options
+import tornado.testing
+from rdlm.main import get_app as rdlm_get_app
+from rdlm.main import get_ioloop as rdlm_get_ioloop
+from rdlm.lock import LockManager, Lock, LOCK_MANAGER_INSTANCE
+from rdlm.idempotency import IdempotencyIndex, IDEMPOTENCY_INDEX
+
+
+class IdempotencyIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = LockManager()
+        self.index = IdempotencyIndex(self.manager, max_entries=2)
+
+    def _add_lock(self, key):
+        lock = Lock("resource1", "test case", 5, 60)
+        self.manager.add_lock("resource1", lock)
+        self.index.add("resource1", key, lock)
+        return lock
+
+    def test_get_and_release(self):
+        lock = self._add_lock("key1")
+        self.assertEqual(self.index.get("resource1", "key1"), lock)
+        self.assertEqual(self.index.get("resource2", "key1"), None)
+        self.manager.delete_lock("resource1", lock.uid)
+        self.assertEqual(self.index.get("resource1", "key1"), None)
+        self.assertEqual(len(self.index), 0)
+
+    def test_bounded(self):
+        locks = [self._add_lock("key%i" % i) for i in range(0, 3)]
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(self.index.get("resource1", "key0"), None)
+        self.assertEqual(self.index.get("resource1", "key2"), locks[2])
+        self.assertFalse(locks[0].is_deleted())
+
+    def test_reattach(self):
+        detached = []
+        lock = Lock("resource1", "test case", 5, 60)
+        self.index.add("resource1", "key1", lock, lambda: detached.append(1))
+        self.assertEqual(self.index.reattach("resource1", "key1"), lock)
+        self.assertEqual(detached, [1])
+        self.assertEqual(self.index.reattach("resource1", "key2"), None)
+
+    def test_detach_and_expire(self):
+        self.manager.add_lock("resource1", Lock("resource1", "test case", 5, 60))
+        lock = self._add_lock("key1")
+        token = self.index.detach("resource1", "key1", lock)
+        self.assertTrue(token is not None)
+        self.assertEqual(self.index.detach("resource1", "key1", Lock("resource1", "foo", 5, 60)),
+                         None)
+        self.assertTrue(self.index.expire_detached("resource1", "key1", token))
+        self.assertTrue(lock.is_deleted())
+        self.assertEqual(len(self.index), 0)
+
+    def test_detach_active(self):
+        lock = Lock("resource1", "test case", 5, 60)
+        self.manager.try_lock("resource1", lock)
+        self.index.add("resource1", "key1", lock)
+        self.assertEqual(self.index.detach("resource1", "key1", lock), None)
+
+    def test_evict_detached(self):
+        self._add_lock("key0")
+        lock = self._add_lock("key1")
+        token = self.index.detach("resource1", "key1", lock)
+        self.assertTrue(token is not None)
+        self._add_lock("key2")
+        self._add_lock("key3")
+        # (evicted during the grace period: nobody could reattach to it anymore)
+        self.assertTrue(lock.is_deleted())
+        self.assertFalse(self.index.expire_detached("resource1", "key1", token))
+        self.assertEqual(len(self.index), 2)
+
+    def test_detach_and_reattach(self):
+        self.manager.add_lock("resource1", Lock("resource1", "test case", 5, 60))
+        lock = self._add_lock("key1")
+        token = self.index.detach("resource1", "key1", lock)
+        self.assertTrue(token is not None)
+        self.assertEqual(self.index.reattach("resource1", "key1"), lock)
+        # (the lock has been reattached to a retry during the grace period)
+        self.assertFalse(self.index.expire_detached("resource1", "key1", token))
+        self.assertFalse(lock.is_deleted())
+
+
+class IdempotentAcquireTestCase(tornado.testing.AsyncHTTPTestCase):
+
+    def get_app(self):
+        return rdlm_get_app()
+
+    def get_new_ioloop(self):
+        return rdlm_get_ioloop()
+
+    def tearDown(self):
+        LOCK_MANAGER_INSTANCE.remove_all_resources()
+        IDEMPOTENCY_INDEX.clear()
+        super(IdempotentAcquireTestCase, self).tearDown()
+
+    def _request(self, key=None, callback=None):
+        headers = {"Idempotency-Key": key} if key else {}
+        body = json.dumps({"title": "test case", "wait": 5, "lifetime": 60})
+        req = tornado.httpclient.HTTPRequest(self.get_url("/locks/resource1"), method='POST',
+                                             body=body, headers=headers)
+        self.http_client.fetch(req, callback or self.stop)
+        if callback is None:
+            return self.wait()
+
+    def test_retry_active(self):
+        response1 = self._request("key1")
+        self.assertEqual(response1.code, 201)
+        response2 = self._request("key1")
+        self.assertEqual(response2.code, 201)
+        self.assertEqual(response1.headers['Location'], response2.headers['Location'])
+
+    def test_retry_waiting(self):
+        location = self._request().headers['Location']
+        responses = []
+
+        def on_response(response):
+            responses.append(response)
+            if len(responses) == 1:
+                # (the first request is detached by the retry)
+                req = tornado.httpclient.HTTPRequest(location, method='DELETE')
+                self.http_client.fetch(req, lambda x: None)
+            else:
+                self.stop()
+
+        self._request("key1", callback=on_response)
+        self.io_loop.add_timeout(time.time() + 0.2,
+                                 lambda: self._request("key1", callback=on_response))
+        self.wait()
+        self.assertEqual([x.code for x in responses], [409, 201])
+        resource = LOCK_MANAGER_INSTANCE.get_resource_as_dict("resource1")
+        self.assertEqual(len(resource['locks']), 1)
+
+    def _disconnected_request(self, key):
+        # (the client gives up and closes its connection before the reply)
+        headers = {"Idempotency-Key": key} if key else {}
+        body = json.dumps({"title": "test case", "wait": 5, "lifetime": 60})
+        req = tornado.httpclient.HTTPRequest(self.get_url("/locks/resource1"), method='POST',
+                                             body=body, headers=headers, request_timeout=0.2)
+        self.http_client.fetch(req, self.stop)
+        self.assertEqual(self.wait().code, 599)
+        # (let the server see the disconnection)
+        self.io_loop.add_timeout(time.time() + 0.1, self.stop)
+        self.wait()
+
+    def test_retry_after_disconnect(self):
+        location = self._request().headers['Location']
+        self._disconnected_request("key1")
+        responses = []
+        # (a request without key is queued after the disconnected one)
+        self._request(callback=lambda x: responses.append(("other", x.code)))
+        self.io_loop.add_timeout(time.time() + 0.1, lambda: self._request(
+            "key1", callback=lambda x: responses.append(("retry", x.code))))
+        req = tornado.httpclient.HTTPRequest(location, method='DELETE')
+        self.io_loop.add_timeout(time.time() + 0.3,
+                                 lambda: self.http_client.fetch(req, lambda x: None))
+        self.io_loop.add_timeout(time.time() + 1, self.stop)
+        self.wait()
+        # (the retry kept the place of the disconnected request in the queue)
+        self.assertEqual(responses, [("retry", 201)])
+        resource = LOCK_MANAGER_INSTANCE.get_resource_as_dict("resource1")
+        self.assertEqual(len(resource['locks']), 2)
+
+    def test_disconnect_grace_period(self):
+        tornado.options.options.idempotency_grace_period = 0.3
+        try:
+            self._request()
+            self._disconnected_request("key1")
+            resource = LOCK_MANAGER_INSTANCE.get_resource_as_dict("resource1")
+            self.assertEqual(len(resource['locks']), 2)
+            self.io_loop.add_timeout(time.time() + 0.5, self.stop)
+            self.wait()
+            resource = LOCK_MANAGER_INSTANCE.get_resource_as_dict("resource1")
+            self.assertEqual(len(resource['locks']), 1)
+            self.assertEqual(IDEMPOTENCY_INDEX.get("resource1", "key1"), None)
+        finally:
+            tornado.options.options.idempotency_grace_period = 10.0
+
+    def test_disconnect_then_active(self):
+        location = self._request().headers['Location']
+        self._disconnected_request("key1")
+        req = tornado.httpclient.HTTPRequest(location, method='DELETE')
+        self.http_client.fetch(req, self.stop)
+        self.assertEqual(self.wait().code, 204)
+        self.io_loop.add_timeout(time.time() + 0.1, self.stop)
+        self.wait()
+        # (the detached lock became active: it's deleted without waiting for the end of
+        # the grace period)
+        self.assertEqual(LOCK_MANAGER_INSTANCE.get_resource_as_dict("resource1"), None)
+        self.assertEqual(IDEMPOTENCY_INDEX.get("resource1", "key1"), None)
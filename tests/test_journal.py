@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import tempfile
+import shutil
+from rdlm.lock import LockManager, Lock
+from rdlm.journal import Journal
+
+
+class JournalTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.manager = LockManager()
+        self.journal = Journal(self.directory)
+        self.manager.add_listener(self.journal.on_event)
+
+    def tearDown(self):
+        self.journal.close()
+        shutil.rmtree(self.directory)
+
+    def _recover(self):
+        self.journal.join()
+        manager = LockManager()
+        journal = Journal(self.directory)
+        count = journal.recover(manager)
+        journal.close()
+        return (manager, count)
+
+    def _add_locks(self):
+        lock1 = Lock("resource1", "test case", 5, 60)
+        lock2 = Lock("resource1", "test case", 5, 60)
+        lock3 = Lock("resource2", "test case", 5, 60)
+        for lock in (lock1, lock2, lock3):
+            self.manager.add_lock(lock.resource_name, lock)
+        return (lock1, lock2, lock3)
+
+    def test_journal(self):
+        (lock1, lock2, lock3) = self._add_locks()
+        self.manager.delete_lock("resource1", lock1.uid)
+        self.journal.flush()
+        (manager, count) = self._recover()
+        self.assertEqual(count, 2)
+        self.assertEqual(manager.get_lock("resource1", lock1.uid), None)
+        lock = manager.get_lock("resource1", lock2.uid)
+        self.assertTrue(lock.is_active())
+        self.assertEqual(lock.title, "test case")
+        self.assertTrue(abs(lock.get_remaining_seconds() - lock2.get_remaining_seconds()) < 1)
+        self.assertTrue(manager.get_lock("resource2", lock3.uid).is_active())
+
+    def test_not_flushed(self):
+        self._add_locks()
+        (manager, count) = self._recover()
+        self.assertEqual(count, 0)
+
+    def test_snapshot(self):
+        (lock1, lock2, lock3) = self._add_locks()
+        self.assertEqual(self.journal.snapshot(self.manager), 2)
+        self.manager.delete_lock("resource2", lock3.uid)
+        self.journal.flush()
+        (manager, count) = self._recover()
+        self.assertEqual(count, 1)
+        self.assertTrue(manager.get_lock("resource1", lock1.uid).is_active())
+
+    def test_close(self):
+        (lock1, lock2, lock3) = self._add_locks()
+        self.journal.snapshot(self.manager)
+        self.manager.delete_lock("resource1", lock1.uid)
+        # (buffered records are flushed and written by close)
+        self.journal.close()
+        (manager, count) = self._recover()
+        self.assertEqual(count, 2)
+        self.assertEqual(manager.get_lock("resource1", lock1.uid), None)
+        self.assertTrue(manager.get_lock("resource1", lock2.uid).is_active())
+
+    def test_expired(self):
+        self.manager.add_lock("resource1", Lock("resource1", "test case", 5, 0))
+        self.journal.flush()
+        (manager, count) = self._recover()
+        self.assertEqual(count, 0)
+        self.assertEqual(manager.get_resources_names(), [])
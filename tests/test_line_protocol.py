@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import socket
+import tornado.testing
+from tornado.iostream import IOStream
+from tornado.netutil import bind_sockets
+from rdlm.main import get_ioloop as rdlm_get_ioloop
+from rdlm.lock import LOCK_MANAGER_INSTANCE
+from rdlm.line_protocol import LineProtocolServer
+
+
+class LineProtocolTestCase(tornado.testing.AsyncTestCase):
+
+    def get_new_ioloop(self):
+        return rdlm_get_ioloop()
+
+    def setUp(self):
+        super(LineProtocolTestCase, self).setUp()
+        LOCK_MANAGER_INSTANCE.remove_all_resources()
+        sockets = bind_sockets(0, '127.0.0.1', family=socket.AF_INET)
+        self.port = sockets[0].getsockname()[1]
+        self.server = LineProtocolServer(io_loop=self.io_loop)
+        self.server.add_sockets(sockets)
+        self.streams = []
+
+    def tearDown(self):
+        for stream in self.streams:
+            stream.close()
+        self.server.stop()
+        LOCK_MANAGER_INSTANCE.remove_all_resources()
+        super(LineProtocolTestCase, self).tearDown()
+
+    def _connect(self):
+        stream = IOStream(socket.socket(socket.AF_INET, socket.SOCK_STREAM), io_loop=self.io_loop)
+        stream.connect(('127.0.0.1', self.port), self.stop)
+        self.wait()
+        self.streams.append(stream)
+        return stream
+
+    def _send(self, stream, *lines):
+        stream.write(("".join("%s\n" % x for x in lines)).encode('utf-8'))
+
+    def _read_line(self, stream):
+        stream.read_until(b"\n", self.stop)
+        return self.wait().decode('utf-8').strip().split(" ")
+
+    def test_pipelining(self):
+        stream = self._connect()
+        self._send(stream, "a ACQUIRE resource1 5 60", "b ACQUIRE resource2 5 60 shared",
+                   "c FOO", "d ACQUIRE resource/1 5 60", "e ACQUIRE resource1 foo 60")
+        replies = [self._read_line(stream) for i in range(0, 5)]
+        self.assertEqual([x[0:2] for x in replies], [["a", "OK"], ["b", "OK"], ["c", "ERROR"],
+                                                     ["d", "ERROR"], ["e", "ERROR"]])
+        uid1 = replies[0][2]
+        self.assertTrue(LOCK_MANAGER_INSTANCE.get_lock("resource1", uid1).is_active())
+        self._send(stream, "f RENEW resource1 %s 120" % uid1, "g RELEASE resource1 %s" % uid1,
+                   "h RELEASE resource1 %s" % uid1)
+        replies = [self._read_line(stream) for i in range(0, 3)]
+        self.assertEqual(replies, [["f", "OK"], ["g", "OK"], ["h", "NOTFOUND"]])
+
+    def test_busy_and_wait(self):
+        stream = self._connect()
+        self._send(stream, "a ACQUIRE resource1 5 60", "b ACQUIRE resource1 0 60",
+                   "c ACQUIRE resource1 5 60")
+        reply = self._read_line(stream)
+        self.assertEqual(reply[0:2], ["a", "OK"])
+        self.assertEqual(self._read_line(stream), ["b", "BUSY"])
+        uid1 = reply[2]
+        self._send(stream, "d RELEASE resource1 %s" % uid1)
+        self.assertEqual(self._read_line(stream), ["d", "OK"])
+        self.assertEqual(self._read_line(stream)[0:2], ["c", "OK"])
+
+    def test_release_on_close(self):
+        stream1 = self._connect()
+        stream2 = self._connect()
+        self._send(stream1, "a ACQUIRE resource1 5 60")
+        self.assertEqual(self._read_line(stream1)[0:2], ["a", "OK"])
+        self._send(stream2, "b ACQUIRE resource1 5 60")
+        stream1.close()
+        self.assertEqual(self._read_line(stream2)[0:2], ["b", "OK"])
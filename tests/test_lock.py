@@ -8,6 +8,7 @@ import json
 import tornado.ioloop
 import tornado.gen
 import time
+import rdlm.resources_handler
 
 TEST_MULTIPLE_WAITERS1 = 0
 TEST_MULTIPLE_WAITERS2 = 0
@@ -58,8 +59,18 @@ class LockTestCase(tornado.testing.AsyncHTTPTestCase):
         response = self.wait()
         self.assertEqual(response.code, 400)
 
-    def _acquire_lock(self, resource, wait, lifetime, title, callback=None):
+    def test_not_acquired_lock_bad_mode(self):
+        tmp = {"wait": 5, "lifetime": 10, "title": "test case", "mode": "foo"}
+        req = tornado.httpclient.HTTPRequest(self.get_url('/locks/resource1'), method='POST',
+                                             body=json.dumps(tmp))
+        self.http_client.fetch(req, self.stop)
+        response = self.wait()
+        self.assertEqual(response.code, 400)
+
+    def _acquire_lock(self, resource, wait, lifetime, title, callback=None, mode=None):
         tmp = {"wait": wait, "lifetime": lifetime, "title": title}
+        if mode:
+            tmp['mode'] = mode
         raw_body = json.dumps(tmp)
         req = tornado.httpclient.HTTPRequest(self.get_url('/locks/%s' % resource),
                                              method='POST', body=raw_body)
@@ -83,6 +94,32 @@ class LockTestCase(tornado.testing.AsyncHTTPTestCase):
     def test_acquire_lock(self):
         self._acquire_lock("resource1", 5, 60, "test case")
 
+    def test_acquire_shared_locks(self):
+        self._acquire_lock("resource1", 5, 60, "test case", mode="shared")
+        location = self._acquire_lock("resource1", 5, 60, "test case", mode="shared")
+        req = tornado.httpclient.HTTPRequest(location, method='GET')
+        self.http_client.fetch(req, self.stop)
+        response = self.wait()
+        self.assertEqual(response.code, 200)
+        tmp = json.loads(response.body.decode('utf-8'))
+        self.assertEqual(tmp['mode'], "shared")
+        self.assertTrue(tmp['active'])
+
+    def test_acquire_semaphore_locks(self):
+        body = {"wait": 5, "lifetime": 60, "title": "test case", "capacity": 2}
+        for i in range(0, 2):
+            req = tornado.httpclient.HTTPRequest(self.get_url('/locks/resource1'),
+                                                 method='POST', body=json.dumps(body))
+            self.http_client.fetch(req, self.stop)
+            response = self.wait()
+            self.assertEqual(response.code, 201)
+        body['capacity'] = 3
+        req = tornado.httpclient.HTTPRequest(self.get_url('/locks/resource1'),
+                                             method='POST', body=json.dumps(body))
+        self.http_client.fetch(req, self.stop)
+        response = self.wait()
+        self.assertEqual(response.code, 409)
+
     def test_delete_existing_lock(self):
         location = self._acquire_lock("resource1", 5, 60, "test case")
         req = tornado.httpclient.HTTPRequest(location, method='DELETE')
@@ -140,6 +177,49 @@ class LockTestCase(tornado.testing.AsyncHTTPTestCase):
         response = self.wait()
         self.assertEqual(response.code, 200)
 
+    def test_sub_second_lifetime(self):
+        tmp = {"wait": 5, "lifetime_ms": 200, "title": "test case"}
+        req = tornado.httpclient.HTTPRequest(self.get_url('/locks/resource1'), method='POST',
+                                             body=json.dumps(tmp))
+        self.http_client.fetch(req, self.stop)
+        response = self.wait()
+        self.assertEqual(response.code, 201)
+        before = time.time()
+        tmp = {"wait": 5, "lifetime": 60, "title": "test case"}
+        req = tornado.httpclient.HTTPRequest(self.get_url('/locks/resource1'), method='POST',
+                                             body=json.dumps(tmp))
+        self.http_client.fetch(req, self.stop)
+        response = self.wait()
+        self.assertEqual(response.code, 201)
+        self.assertTrue(time.time() - before < 0.9)
+
+    def test_try_lock(self):
+        tmp = {"wait": 0, "lifetime": 60, "title": "test case"}
+        req = tornado.httpclient.HTTPRequest(self.get_url('/locks/resource1'), method='POST',
+                                             body=json.dumps(tmp))
+        self.http_client.fetch(req, self.stop)
+        response = self.wait()
+        self.assertEqual(response.code, 201)
+        location = response.headers['Location']
+        before = time.time()
+        self.http_client.fetch(req, self.stop)
+        response = self.wait()
+        self.assertEqual(response.code, 409)
+        self.assertTrue(time.time() - before < 0.5)
+        self._delete_lock(location)
+        self.assertEqual(self._get_locks_count("resource1"), 0)
+
+    def test_try_lock_capacity_mismatch(self):
+        location = self._acquire_lock("resource1", 5, 60, "test case")
+        tmp = {"wait": 0, "lifetime": 60, "title": "test case", "capacity": 2}
+        req = tornado.httpclient.HTTPRequest(self.get_url('/locks/resource1'), method='POST',
+                                             body=json.dumps(tmp))
+        self.http_client.fetch(req, self.stop)
+        response = self.wait()
+        self.assertEqual(response.code, 409)
+        self.assertTrue(b"another capacity" in response.body)
+        self._delete_lock(location)
+
     def test_wait_timeout_lock(self):
         self._acquire_lock("resource1", 5, 60, "test case")
         tmp = {"wait": 1, "lifetime": 60, "title": "test case"}
@@ -150,6 +230,35 @@ class LockTestCase(tornado.testing.AsyncHTTPTestCase):
         response = self.wait()
         self.assertEqual(response.code, 408)
 
+    def _renew_lock(self, lock_url, body):
+        req = tornado.httpclient.HTTPRequest(lock_url, method='PUT', body=body)
+        self.http_client.fetch(req, self.stop)
+        return self.wait()
+
+    def test_renew_lock(self):
+        location1 = self._acquire_lock("resource1", 5, 1, "test case")
+        response = self._renew_lock(location1, json.dumps({"lifetime": 5}))
+        self.assertEqual(response.code, 204)
+        tmp = {"wait": 2, "lifetime": 60, "title": "test case"}
+        req = tornado.httpclient.HTTPRequest(self.get_url('/locks/resource1'),
+                                             method='POST', body=json.dumps(tmp))
+        self.http_client.fetch(req, self.stop)
+        response = self.wait()
+        self.assertEqual(response.code, 408)
+        req = tornado.httpclient.HTTPRequest(location1, method='GET')
+        self.http_client.fetch(req, self.stop)
+        response = self.wait()
+        self.assertEqual(response.code, 200)
+        self.assertEqual(json.loads(response.body.decode('utf-8'))['lifetime'], 5)
+
+    def test_renew_bad_lock(self):
+        location1 = self._acquire_lock("resource1", 5, 60, "test case")
+        response = self._renew_lock(location1, "foo")
+        self.assertEqual(response.code, 400)
+        self._delete_lock(location1)
+        response = self._renew_lock(location1, "")
+        self.assertEqual(response.code, 404)
+
     def _test_multiple_waiters_callback2(self, r):
         global TEST_MULTIPLE_WAITERS1  # pylint: disable-msg=W0603
         TEST_MULTIPLE_WAITERS1 = TEST_MULTIPLE_WAITERS1 + 1
@@ -244,6 +353,30 @@ class LockTestCase(tornado.testing.AsyncHTTPTestCase):
         response2 = self.wait()
         self.assertEqual(response2.code, 404)
 
+    def _get_locks_count(self, resource):
+        req = tornado.httpclient.HTTPRequest(self.get_url("/resources/%s" % resource),
+                                             method='GET')
+        self.http_client.fetch(req, self.stop)
+        r = self.wait()
+        self.assertEqual(r.code, 200)
+        tmp = json.loads(r.body.decode('utf-8'))
+        return len(tmp.get('_embedded', {}).get('locks', []))
+
+    def test_waiting_client_disconnected(self):
+        location = self._acquire_lock("resource1", 5, 60, "test case")
+        tmp = {"wait": 10, "lifetime": 60, "title": "test case"}
+        req = tornado.httpclient.HTTPRequest(self.get_url('/locks/resource1'), method='POST',
+                                             body=json.dumps(tmp), request_timeout=0.5)
+        self.http_client.fetch(req, self.stop)
+        response = self.wait()
+        self.assertEqual(response.code, 599)
+        # (let the server notice the closed connection)
+        self.io_loop.add_timeout(time.time() + 0.2, self.stop)
+        self.wait()
+        self.assertEqual(self._get_locks_count("resource1"), 1)
+        self._delete_lock(location)
+        self.assertEqual(self._get_locks_count("resource1"), 0)
+
     def test_get_resource(self):
         self._acquire_lock("resource1", 5, 60, "test case")
         req = tornado.httpclient.HTTPRequest(self.get_url("/resources/resource2"), method='GET')
@@ -262,3 +395,59 @@ class LockTestCase(tornado.testing.AsyncHTTPTestCase):
         self.http_client.fetch(req, self.stop)
         r = self.wait()
         self.assertEqual(r.code, 200)
+        tmp = json.loads(r.body.decode('utf-8'))
+        self.assertEqual(tmp['resources'], 2)
+        self.assertEqual(len(tmp['_embedded']['resources']), 2)
+
+    def test_delete_resources_prefix(self):
+        for name in ("tenant1job1", "tenant1job2", "tenant2job1"):
+            self._acquire_lock(name, 5, 60, "test case")
+        req = tornado.httpclient.HTTPRequest(self.get_url("/resources?prefix=tenant1"),
+                                             method='DELETE')
+        self.http_client.fetch(req, self.stop)
+        self.assertEqual(self.wait().code, 204)
+        self.assertEqual(self._get_locks_count("tenant1job1"), 0)
+        self.assertEqual(self._get_locks_count("tenant2job1"), 1)
+        req = tornado.httpclient.HTTPRequest(self.get_url("/resources?prefix=a/b"),
+                                             method='DELETE')
+        self.http_client.fetch(req, self.stop)
+        self.assertEqual(self.wait().code, 400)
+
+    def test_get_resources_pages(self):
+        for name in ("resource3", "resource1", "other1", "resource2"):
+            self._acquire_lock(name, 5, 60, "test case")
+        url = "/resources?limit=2&prefix=resource"
+        names = []
+        # (one flush for each resource)
+        chunk_size = rdlm.resources_handler.STREAM_CHUNK_SIZE
+        rdlm.resources_handler.STREAM_CHUNK_SIZE = 1
+        try:
+            while url is not None:
+                req = tornado.httpclient.HTTPRequest(self.get_url(url), method='GET')
+                self.http_client.fetch(req, self.stop)
+                r = self.wait()
+                self.assertEqual(r.code, 200)
+                tmp = json.loads(r.body.decode('utf-8'))
+                self.assertEqual(tmp['resources'], 4)
+                names.extend([x['name'] for x in tmp['_embedded']['resources']])
+                url = tmp['_links'].get('next', {}).get('href')
+        finally:
+            rdlm.resources_handler.STREAM_CHUNK_SIZE = chunk_size
+        self.assertEqual(names, ["resource1", "resource2", "resource3"])
+        # (without "limit" and "after" arguments, the listing isn't paginated)
+        page_size = rdlm.resources_handler.DEFAULT_PAGE_SIZE
+        rdlm.resources_handler.DEFAULT_PAGE_SIZE = 2
+        try:
+            for (url, count) in (("/resources", 4), ("/resources?prefix=resource", 3),
+                                 ("/resources?after=other1", 2)):
+                req = tornado.httpclient.HTTPRequest(self.get_url(url), method='GET')
+                self.http_client.fetch(req, self.stop)
+                tmp = json.loads(self.wait().body.decode('utf-8'))
+                self.assertEqual(len(tmp['_embedded']['resources']), count)
+                self.assertEqual('next' in tmp['_links'], url.endswith("other1"))
+        finally:
+            rdlm.resources_handler.DEFAULT_PAGE_SIZE = page_size
+        for url in ("/resources?limit=0", "/resources?limit=foo", "/resources?after=a/b"):
+            req = tornado.httpclient.HTTPRequest(self.get_url(url), method='GET')
+            self.http_client.fetch(req, self.stop)
+            self.assertEqual(self.wait().code, 400)
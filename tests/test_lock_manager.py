@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from rdlm.lock import LockManager, Lock
+
+
+class LockManagerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = LockManager()
+
+    def test_get_delete_unknown_lock(self):
+        self.assertEqual(self.manager.get_lock("resource1", "foo"), None)
+        self.assertFalse(self.manager.delete_lock("resource1", "foo"))
+        self.assertEqual(self.manager.get_resources_names(), [])
+
+    def test_reclaim_released_resource(self):
+        lock1 = Lock("resource1", "test case", 5, 60)
+        lock2 = Lock("resource1", "test case", 5, 60)
+        self.manager.add_lock("resource1", lock1)
+        self.manager.add_lock("resource1", lock2)
+        self.assertEqual(self.manager.get_counters(),
+                         {"resources": 1, "reclaimed_resources": 0})
+        self.assertTrue(self.manager.delete_lock("resource1", lock1.uid))
+        self.assertEqual(self.manager.get_resources_names(), ["resource1"])
+        self.assertTrue(self.manager.delete_lock("resource1", lock2.uid))
+        self.assertEqual(self.manager.get_resources_names(), [])
+        self.assertEqual(self.manager.get_counters(),
+                         {"resources": 0, "reclaimed_resources": 1})
+
+    def test_bulk_get_and_delete(self):
+        lock1 = Lock("resource1", "test case", 5, 60)
+        lock2 = Lock("resource1", "test case", 5, 60)
+        self.manager.add_lock("resource1", lock1)
+        self.manager.add_lock("resource1", lock2)
+        items = [("resource1", lock1.uid), ("resource2", "foo"), ("resource1", lock2.uid)]
+        self.assertEqual(self.manager.get_locks(items), [lock1, None, lock2])
+        self.assertEqual(self.manager.delete_locks(items + items[0:1]),
+                         [True, False, True, False])
+        self.assertEqual(self.manager.get_resources_names(), [])
+        self.assertEqual(self.manager.get_counters()["reclaimed_resources"], 1)
+
+    def test_prefix(self):
+        for name in ("tenant1job2", "tenant1job1", "tenant2job1", "other"):
+            self.manager.add_lock(name, Lock(name, "test case", 5, 60))
+        self.assertEqual(self.manager.get_resources_names("tenant1"),
+                         ["tenant1job1", "tenant1job2"])
+        self.assertEqual(self.manager.remove_resources("tenant1"), 2)
+        self.assertEqual(self.manager.remove_resources("tenant1"), 0)
+        self.assertEqual(sorted(self.manager.get_resources_names()), ["other", "tenant2job1"])
+        self.assertEqual(self.manager.get_resources_page(prefix="t"), ["tenant2job1"])
+
+    def test_reclaim_expired_resource(self):
+        self.manager.add_lock("resource1", Lock("resource1", "test case", 5, 0))
+        self.manager.clean_expired_locks()
+        self.assertEqual(self.manager.get_resources_names(), [])
+        self.assertEqual(self.manager.get_counters()["reclaimed_resources"], 1)
+
+    def test_renew_lock(self):
+        lock1 = Lock("resource1", "test case", 5, 10)
+        lock2 = Lock("resource1", "test case", 5, 10)
+        self.manager.add_lock("resource1", lock1)
+        self.manager.add_lock("resource1", lock2)
+        expires = lock1.active_expires
+        self.assertEqual(self.manager.get_next_expiry(), lock2.wait_expires)
+        self.assertTrue(self.manager.renew_lock("resource1", lock1.uid, 60))
+        self.assertTrue(lock1.active_expires > expires)
+        self.assertEqual(lock1.lifetime, 60)
+        self.assertFalse(self.manager.renew_lock("resource1", lock2.uid, 60))
+        self.assertFalse(self.manager.renew_lock("resource2", lock1.uid, 60))
+        self.manager.delete_lock("resource1", lock2.uid)
+        self.assertEqual(self.manager.get_next_expiry(), lock1.active_expires)
+
+    def test_compact_lock(self):
+        lock = Lock("resource1", "test case", 5, 60)
+        self.assertFalse(hasattr(lock, "__dict__"))
+        self.assertEqual(len(lock.uid), 32)
+        tmp = lock.to_dict()
+        self.assertTrue(tmp['wait_since'] < tmp['wait_expires'])
+        restored = Lock.restore("resource1", lock.uid, "test case", 5, 60, 30)
+        self.assertTrue(29 < restored.get_remaining_seconds() <= 30)
+        self.assertEqual(restored.active_expires - restored.active_since, 60)
+        self.assertEqual(restored.wait_expires, None)
+
+    def test_sub_second_durations(self):
+        lock = Lock.from_json("resource1", '{"title": "foo", "wait": 0.5, "lifetime_ms": 250}')
+        self.assertEqual(lock.wait, 0.5)
+        self.assertEqual(lock.lifetime, 0.25)
+        lock = Lock.from_json("resource1", '{"title": "foo", "wait": "5", "lifetime": 60.0}')
+        self.assertEqual(lock.lifetime, 60)
+        self.assertTrue(isinstance(lock.lifetime, int))
+        for body in ('{"title": "foo", "wait": null, "lifetime": 60}',
+                     '{"title": "foo", "wait": 5, "lifetime_ms": "foo"}'):
+            self.assertEqual(Lock.from_json("resource1", body), None)
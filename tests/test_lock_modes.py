@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from rdlm.lock import LockManager, Lock, MODE_SHARED, MODE_EXCLUSIVE
+
+
+class LockModesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = LockManager()
+
+    def _add_lock(self, mode, wait=5):
+        lock = Lock("resource1", "test case", wait, 60, mode=mode)
+        self.manager.add_lock("resource1", lock)
+        return lock
+
+    def test_from_json(self):
+        lock = Lock.from_json("resource1", '{"title": "foo", "wait": 5, "lifetime": 60}')
+        self.assertEqual(lock.mode, MODE_EXCLUSIVE)
+        lock = Lock.from_json("resource1", '{"title": "foo", "wait": 5, "lifetime": 60, '
+                                           '"mode": "shared"}')
+        self.assertEqual(lock.mode, MODE_SHARED)
+        self.assertEqual(lock.to_dict()['mode'], MODE_SHARED)
+        lock = Lock.from_json("resource1", '{"title": "foo", "wait": 5, "lifetime": 60, '
+                                           '"mode": "foo"}')
+        self.assertEqual(lock, None)
+
+    def test_shared_locks(self):
+        shared1 = self._add_lock(MODE_SHARED)
+        shared2 = self._add_lock(MODE_SHARED)
+        self.assertTrue(shared1.is_active())
+        self.assertTrue(shared2.is_active())
+        exclusive = self._add_lock(MODE_EXCLUSIVE)
+        self.assertFalse(exclusive.is_active())
+        self.manager.delete_lock("resource1", shared1.uid)
+        self.assertFalse(exclusive.is_active())
+        self.manager.delete_lock("resource1", shared2.uid)
+        self.assertTrue(exclusive.is_active())
+
+    def test_no_writer_starvation(self):
+        shared1 = self._add_lock(MODE_SHARED)
+        exclusive = self._add_lock(MODE_EXCLUSIVE)
+        shared2 = self._add_lock(MODE_SHARED)
+        self.assertFalse(shared2.is_active())
+        self.manager.delete_lock("resource1", shared1.uid)
+        self.assertTrue(exclusive.is_active())
+        self.assertFalse(shared2.is_active())
+
+    def test_batch_grant(self):
+        exclusive1 = self._add_lock(MODE_EXCLUSIVE)
+        shared = [self._add_lock(MODE_SHARED) for i in range(0, 3)]
+        exclusive2 = self._add_lock(MODE_EXCLUSIVE)
+        self.manager.delete_lock("resource1", exclusive1.uid)
+        for lock in shared:
+            self.assertTrue(lock.is_active())
+        self.assertFalse(exclusive2.is_active())
+        for lock in shared:
+            self.manager.delete_lock("resource1", lock.uid)
+        self.assertTrue(exclusive2.is_active())
+
+    def test_waiting_exclusive_removed(self):
+        shared1 = self._add_lock(MODE_SHARED)
+        exclusive = self._add_lock(MODE_EXCLUSIVE)
+        shared2 = self._add_lock(MODE_SHARED)
+        self.manager.delete_lock("resource1", exclusive.uid)
+        self.assertTrue(shared1.is_active())
+        self.assertTrue(shared2.is_active())
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from rdlm.lock import LockQueue, Lock
+
+
+class LockQueueTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = LockQueue()
+        self.locks = [Lock("resource1", "lock%i" % i, 5, 60) for i in range(0, 4)]
+        for lock in self.locks:
+            self.queue.append(lock)
+
+    def test_fifo(self):
+        self.assertEqual(len(self.queue), 4)
+        self.assertEqual(list(self.queue), self.locks)
+        self.assertTrue(self.queue.popleft() is self.locks[0])
+        self.assertEqual(list(self.queue), self.locks[1:])
+
+    def test_get(self):
+        self.assertTrue(self.queue.get(self.locks[2].uid) is self.locks[2])
+        self.assertEqual(self.queue.get("foo"), None)
+
+    def test_remove(self):
+        self.assertTrue(self.queue.remove(self.locks[1].uid) is self.locks[1])
+        self.assertEqual(self.queue.remove(self.locks[1].uid), None)
+        self.assertEqual(list(self.queue), [self.locks[0], self.locks[2], self.locks[3]])
+        self.queue.remove(self.locks[3].uid)
+        self.queue.remove(self.locks[0].uid)
+        self.assertEqual(list(self.queue), [self.locks[2]])
+        self.queue.popleft()
+        self.assertEqual(len(self.queue), 0)
+        self.assertRaises(IndexError, self.queue.popleft)
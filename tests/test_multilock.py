@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import unittest
+from rdlm.lock import LockManager, Lock
+from rdlm.multilock import MultiLockManager
+
+
+class MultiLockTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = LockManager()
+        self.multilock_manager = MultiLockManager(self.manager)
+        self.deferred = []
+        self.multilock_manager.set_defer_callback(self.deferred.append)
+        self.events = []
+
+    def _run_deferred(self):
+        while self.deferred:
+            self.deferred.pop(0)()
+
+    def _acquire(self, resources, wait=5, lifetime=60):
+        body = {"title": "test case", "wait": wait, "lifetime": lifetime,
+                "resources": resources}
+        multilock = self.multilock_manager.new_multilock(json.dumps(body))
+        self.multilock_manager.acquire(multilock, lambda: self.events.append("active"),
+                                       lambda timeout: self.events.append(timeout))
+        return multilock
+
+    def test_from_json(self):
+        multilock = self.multilock_manager.new_multilock(
+            '{"title": "foo", "wait": 5, "lifetime": 60, "resources": ["b", "a", "b"]}')
+        self.assertEqual(multilock.resource_names, ["a", "b"])
+        for resources in ('[]', '"a"', '["a/b"]', '[1]'):
+            multilock = self.multilock_manager.new_multilock(
+                '{"title": "foo", "wait": 5, "lifetime": 60, "resources": %s}' % resources)
+            self.assertEqual(multilock, None)
+
+    def test_acquire(self):
+        multilock = self._acquire(["resource2", "resource1"])
+        self.assertTrue(multilock.is_active())
+        self.assertEqual(self.events, ["active"])
+        self.assertEqual([x.resource_name for x in multilock.get_locks()],
+                         ["resource1", "resource2"])
+        self.assertTrue(self.manager.get_lock("resource2", multilock.uid).is_active())
+        self.assertTrue(self.multilock_manager.release(multilock.uid))
+        self.assertEqual(self.manager.get_resources_names(), [])
+        self.assertEqual(len(self.multilock_manager), 0)
+        self.assertFalse(self.multilock_manager.release(multilock.uid))
+
+    def test_wait(self):
+        lock = Lock("resource2", "test case", 5, 60)
+        self.manager.add_lock("resource2", lock)
+        multilock = self._acquire(["resource1", "resource2"])
+        self.assertFalse(multilock.is_active())
+        self.assertTrue(self.manager.get_lock("resource1", multilock.uid).is_active())
+        self.manager.delete_lock("resource2", lock.uid)
+        self.assertFalse(multilock.is_active())
+        self._run_deferred()
+        self.assertTrue(multilock.is_active())
+        self.assertEqual(self.events, ["active"])
+
+    def test_canonical_order(self):
+        multilock1 = self._acquire(["resource1", "resource2"])
+        multilock2 = self._acquire(["resource2", "resource1"])
+        self.assertFalse(multilock2.is_active())
+        # (multilock2 waits for resource1 without holding resource2)
+        self.assertEqual(self.manager.get_lock("resource2", multilock2.uid), None)
+        self.multilock_manager.release(multilock1.uid)
+        self._run_deferred()
+        self.assertTrue(multilock2.is_active())
+
+    def test_release_waiting(self):
+        lock = Lock("resource2", "test case", 5, 60)
+        self.manager.add_lock("resource2", lock)
+        multilock = self._acquire(["resource1", "resource2"])
+        self.assertTrue(self.multilock_manager.release(multilock.uid))
+        self.assertEqual(self.events, [False])
+        self.assertEqual(self.manager.get_resources_names(), ["resource2"])
+
+    def test_wait_timeout(self):
+        lock = Lock("resource2", "test case", 5, 60)
+        self.manager.add_lock("resource2", lock)
+        multilock = self._acquire(["resource1", "resource2"], wait=0)
+        self.manager.clean_expired_locks()
+        self._run_deferred()
+        self.assertTrue(multilock.is_deleted())
+        self.assertEqual(self.events, [True])
+        self.assertEqual(self.manager.get_lock("resource1", multilock.uid), None)
+        self.assertEqual(len(self.multilock_manager), 0)
+
+    def test_component_released(self):
+        multilock = self._acquire(["resource1", "resource2"])
+        self.manager.delete_lock("resource1", multilock.uid)
+        self._run_deferred()
+        self.assertTrue(multilock.is_deleted())
+        self.assertEqual(self.manager.get_lock("resource2", multilock.uid), None)
+        self.assertEqual(len(self.multilock_manager), 0)
+
+    def test_component_expired_while_waiting(self):
+        lock = Lock("resource2", "test case", 5, 60)
+        self.manager.add_lock("resource2", lock)
+        multilock = self._acquire(["resource1", "resource2"], lifetime=0)
+        self.assertTrue(self.manager.get_lock("resource1", multilock.uid) is None)
+        self.manager.clean_expired_locks()
+        self._run_deferred()
+        self.assertTrue(multilock.is_deleted())
+        self.assertFalse(multilock.is_active())
+        self.assertEqual(self.events, [True])
+        self.assertEqual(self.manager.get_resources_names(), ["resource2"])
+        self.assertEqual(len(self.multilock_manager), 0)
+        # (the multilock doesn't become active when resource2 is released)
+        self.manager.delete_lock("resource2", lock.uid)
+        self._run_deferred()
+        self.assertEqual(self.events, [True])
+        self.assertEqual(self.manager.get_resources_names(), [])
+
+    def test_component_deleted_while_waiting(self):
+        lock = Lock("resource2", "test case", 5, 60)
+        self.manager.add_lock("resource2", lock)
+        multilock = self._acquire(["resource1", "resource2"])
+        self.manager.remove_resource("resource1")
+        self._run_deferred()
+        self.assertTrue(multilock.is_deleted())
+        self.assertEqual(self.events, [False])
+        self.assertEqual(self.manager.get_lock("resource2", multilock.uid), None)
+        self.assertTrue(self.manager.get_lock("resource2", lock.uid) is lock)
+
+    def test_component_lost_before_activation(self):
+        lock = Lock("resource2", "test case", 5, 60)
+        self.manager.add_lock("resource2", lock)
+        multilock = self._acquire(["resource1", "resource2"])
+        self.manager.delete_lock("resource2", lock.uid)
+        # (resource1 is lost before the deferred activation of the multilock)
+        self.manager.delete_lock("resource1", multilock.uid)
+        self._run_deferred()
+        self.assertTrue(multilock.is_deleted())
+        self.assertFalse(multilock.is_active())
+        self.assertEqual(self.events, [False])
+        self.assertEqual(self.manager.get_resources_names(), [])
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import tornado.testing
+from rdlm.main import get_app as rdlm_get_app
+from rdlm.main import get_ioloop as rdlm_get_ioloop
+import json
+import time
+import tornado.ioloop
+
+
+class MultiLocksTestCase(tornado.testing.AsyncHTTPTestCase):
+
+    def get_app(self):
+        return rdlm_get_app()
+
+    def get_new_ioloop(self):
+        return rdlm_get_ioloop()
+
+    def tearDown(self):
+        req = tornado.httpclient.HTTPRequest(self.get_url("/resources"), method='DELETE')
+        self.http_client.fetch(req, self.stop)
+        response = self.wait()
+        self.assertEqual(response.code, 204)
+        super(MultiLocksTestCase, self).tearDown()
+
+    def _acquire_multilock(self, resources, wait=5, lifetime=60):
+        tmp = {"wait": wait, "lifetime": lifetime, "title": "test case",
+               "resources": resources}
+        req = tornado.httpclient.HTTPRequest(self.get_url('/multilocks'), method='POST',
+                                             body=json.dumps(tmp))
+        self.http_client.fetch(req, self.stop)
+        return self.wait()
+
+    def test_invalid_body(self):
+        response = self._acquire_multilock("resource1")
+        self.assertEqual(response.code, 400)
+
+    def test_acquire_and_release(self):
+        response = self._acquire_multilock(["resource2", "resource1"])
+        self.assertEqual(response.code, 201)
+        location = response.headers['Location']
+        self.assertTrue('/multilocks/' in location)
+        self.http_client.fetch(location, self.stop)
+        response = self.wait()
+        self.assertEqual(response.code, 200)
+        tmp = json.loads(response.body.decode('utf-8'))
+        self.assertTrue(tmp['active'])
+        self.assertEqual(tmp['resources'], ["resource1", "resource2"])
+        self.assertEqual(len(tmp['_links']['locks']), 2)
+        # (a single lock request on a held resource must wait)
+        tmp = {"wait": 1, "lifetime": 60, "title": "test case"}
+        req = tornado.httpclient.HTTPRequest(self.get_url('/locks/resource2'), method='POST',
+                                             body=json.dumps(tmp))
+        self.http_client.fetch(req, self.stop)
+        response = self.wait()
+        self.assertEqual(response.code, 408)
+        req = tornado.httpclient.HTTPRequest(location, method='DELETE')
+        self.http_client.fetch(req, self.stop)
+        response = self.wait()
+        self.assertEqual(response.code, 204)
+        self.http_client.fetch(location, self.stop)
+        response = self.wait()
+        self.assertEqual(response.code, 404)
+
+    def test_wait_timeout(self):
+        response = self._acquire_multilock(["resource1"])
+        self.assertEqual(response.code, 201)
+        response = self._acquire_multilock(["resource1", "resource2"], wait=1)
+        self.assertEqual(response.code, 408)
+
+    def _post_lock(self, name, wait, lifetime):
+        tmp = {"wait": wait, "lifetime": lifetime, "title": "test case"}
+        req = tornado.httpclient.HTTPRequest(self.get_url('/locks/%s' % name), method='POST',
+                                             body=json.dumps(tmp))
+        self.http_client.fetch(req, self.stop)
+        return self.wait()
+
+    def test_component_expired_while_waiting(self):
+        response = self._post_lock("resource2", 5, 0.3)
+        self.assertEqual(response.code, 201)
+        # (the lock on resource1 expires while the multilock waits for resource2)
+        response = self._acquire_multilock(["resource1", "resource2"], lifetime=0.2)
+        self.assertEqual(response.code, 408)
+        response = self._post_lock("resource1", 0, 60)
+        self.assertEqual(response.code, 201)
+
+    def test_component_deleted_while_waiting(self):
+        response = self._post_lock("resource2", 5, 60)
+        self.assertEqual(response.code, 201)
+        location = response.headers['Location']
+        tmp = {"wait": 5, "lifetime": 60, "title": "test case",
+               "resources": ["resource1", "resource2"]}
+        req = tornado.httpclient.HTTPRequest(self.get_url('/multilocks'), method='POST',
+                                             body=json.dumps(tmp))
+        self.http_client.fetch(req, self.stop)
+        delete = tornado.httpclient.HTTPRequest(self.get_url('/resources/resource1'),
+                                                method='DELETE')
+        tornado.ioloop.IOLoop.instance().add_timeout(
+            time.time() + 0.2, lambda: self.http_client.fetch(delete, lambda x: None))
+        response = self.wait()
+        self.assertEqual(response.code, 409)
+        # (the multilock isn't acquired when resource2 is released)
+        req = tornado.httpclient.HTTPRequest(location, method='DELETE')
+        self.http_client.fetch(req, self.stop)
+        response = self.wait()
+        self.assertEqual(response.code, 204)
+        response = self._post_lock("resource1", 0, 60)
+        self.assertEqual(response.code, 201)
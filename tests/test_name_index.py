@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import random
+import unittest
+import rdlm.name_index
+from rdlm.name_index import NameIndex
+
+
+class NameIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.chunk_size = rdlm.name_index.CHUNK_SIZE
+        # (small chunks to test splits and removals of chunks)
+        rdlm.name_index.CHUNK_SIZE = 4
+        self.index = NameIndex()
+
+    def tearDown(self):
+        rdlm.name_index.CHUNK_SIZE = self.chunk_size
+
+    def test_iter_from(self):
+        for name in ("foo2", "bar", "foo1", "foo10", "baz", "foo1"):
+            self.index.add(name)
+        self.assertEqual(len(self.index), 5)
+        self.assertEqual(list(self.index.iter_from()), ["bar", "baz", "foo1", "foo10", "foo2"])
+        self.assertEqual(list(self.index.iter_from("baz")), ["foo1", "foo10", "foo2"])
+        self.assertEqual(list(self.index.iter_from(prefix="foo1")), ["foo1", "foo10"])
+        self.assertEqual(list(self.index.iter_from("foo1", "foo")), ["foo10", "foo2"])
+        self.assertEqual(list(self.index.iter_from("zzz")), [])
+        self.index.remove("foo1")
+        self.index.remove("unknown")
+        self.assertFalse("foo1" in self.index)
+        self.assertTrue("foo10" in self.index)
+
+    def test_random(self):
+        names = set()
+        rand = random.Random(0)
+        for i in range(0, 3000):
+            name = "n%i" % rand.randint(0, 200)
+            if rand.random() < 0.6:
+                self.index.add(name)
+                names.add(name)
+            else:
+                self.index.remove(name)
+                names.discard(name)
+            self.assertEqual(len(self.index), len(names))
+        self.assertEqual(list(self.index.iter_from()), sorted(names))
+        self.assertEqual(list(self.index.iter_from("n150")), [x for x in sorted(names)
+                                                              if x > "n150"])
+        self.assertEqual(list(self.index.iter_from(prefix="n1")),
+                         [x for x in sorted(names) if x.startswith("n1")])
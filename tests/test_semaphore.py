@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from rdlm.lock import LockManager, Lock, MODE_SHARED
+
+
+class SemaphoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = LockManager()
+
+    def _add_lock(self, capacity=3, mode=None):
+        if mode is None:
+            lock = Lock("resource1", "test case", 5, 60, capacity=capacity)
+        else:
+            lock = Lock("resource1", "test case", 5, 60, capacity=capacity, mode=mode)
+        result = self.manager.add_lock("resource1", lock)
+        return (result, lock)
+
+    def test_from_json(self):
+        lock = Lock.from_json("resource1", '{"title": "foo", "wait": 5, "lifetime": 60, '
+                                           '"capacity": 8}')
+        self.assertEqual(lock.capacity, 8)
+        lock = Lock.from_json("resource1", '{"title": "foo", "wait": 5, "lifetime": 60, '
+                                           '"capacity": 0}')
+        self.assertEqual(lock, None)
+
+    def test_capacity(self):
+        locks = [self._add_lock()[1] for i in range(0, 4)]
+        for lock in locks[0:3]:
+            self.assertTrue(lock.is_active())
+        self.assertFalse(locks[3].is_active())
+        self.assertEqual(self.manager.get_resource_as_dict("resource1")["capacity"], 3)
+        self.manager.delete_lock("resource1", locks[1].uid)
+        self.assertTrue(locks[3].is_active())
+
+    def test_default_capacity(self):
+        (result, lock1) = self._add_lock()
+        (result, lock2) = self._add_lock(capacity=None)
+        self.assertTrue(result)
+        self.assertEqual(lock2.capacity, 3)
+        self.assertTrue(lock2.is_active())
+
+    def test_capacity_mismatch(self):
+        self._add_lock()
+        (result, lock) = self._add_lock(capacity=2)
+        self.assertFalse(result)
+        self.assertFalse(lock.is_active())
+        self.assertEqual(len(self.manager.get_resource_as_dict("resource1")["locks"]), 1)
+
+    def test_try_lock_capacity_mismatch(self):
+        self._add_lock()
+        lock = Lock("resource1", "test case", 0, 60, capacity=2)
+        self.assertEqual(self.manager.try_lock("resource1", lock), None)
+        self.assertFalse(lock.is_active())
+        lock = Lock("resource1", "test case", 0, 60, capacity=3)
+        self.assertEqual(self.manager.try_lock("resource1", lock), True)
+
+    def test_shared_and_semaphore(self):
+        (result, shared) = self._add_lock(mode=MODE_SHARED)
+        (result, exclusive) = self._add_lock()
+        self.assertFalse(exclusive.is_active())
+        self.manager.delete_lock("resource1", shared.uid)
+        self.assertTrue(exclusive.is_active())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import tornado.testing
+from rdlm.main import get_app as rdlm_get_app
+from rdlm.main import get_ioloop as rdlm_get_ioloop
+from rdlm.sharding import HashRing, SHARDING_INSTANCE
+
+
+class HashRingTestCase(unittest.TestCase):
+
+    def test_empty(self):
+        self.assertEqual(HashRing([]).get_node("resource1"), None)
+
+    def test_distribution(self):
+        ring = HashRing(range(0, 4))
+        counts = [0, 0, 0, 0]
+        for i in range(0, 4000):
+            counts[ring.get_node("resource%i" % i)] += 1
+        for count in counts:
+            self.assertTrue(count > 500)
+        self.assertEqual(ring.get_node("resource1"), HashRing(range(0, 4)).get_node("resource1"))
+
+    def test_consistency(self):
+        ring1 = HashRing(range(0, 4))
+        ring2 = HashRing(range(0, 5))
+        moved = 0
+        for i in range(0, 4000):
+            node = ring2.get_node("resource%i" % i)
+            if node != ring1.get_node("resource%i" % i):
+                self.assertEqual(node, 4)
+                moved += 1
+        self.assertTrue(moved < 2000)
+
+
+class ShardingTestCase(tornado.testing.AsyncHTTPTestCase):
+
+    def get_app(self):
+        return rdlm_get_app()
+
+    def get_new_ioloop(self):
+        return rdlm_get_ioloop()
+
+    def setUp(self):
+        super(ShardingTestCase, self).setUp()
+        SHARDING_INSTANCE.configure(2, 8888, 0)
+
+    def tearDown(self):
+        SHARDING_INSTANCE.configure(1, 8888, 0)
+        super(ShardingTestCase, self).tearDown()
+
+    def _get_resource_name(self, worker_id):
+        ring = HashRing(range(0, 2))
+        for i in range(0, 100):
+            if ring.get_node("resource%i" % i) == worker_id:
+                return "resource%i" % i
+
+    def test_redirect(self):
+        name = self._get_resource_name(1)
+        body = '{"title": "test case", "wait": 5, "lifetime": 60}'
+        req = tornado.httpclient.HTTPRequest(self.get_url('/locks/%s' % name), method='POST',
+                                             body=body, follow_redirects=False)
+        self.http_client.fetch(req, self.stop)
+        response = self.wait()
+        self.assertEqual(response.code, 307)
+        self.assertEqual(response.headers['Location'], "http://localhost:8890/locks/%s" % name)
+
+    def test_owned(self):
+        name = self._get_resource_name(0)
+        body = '{"title": "test case", "wait": 5, "lifetime": 1}'
+        req = tornado.httpclient.HTTPRequest(self.get_url('/locks/%s' % name), method='POST',
+                                             body=body, follow_redirects=False)
+        self.http_client.fetch(req, self.stop)
+        response = self.wait()
+        self.assertEqual(response.code, 201)
+        location = response.headers['Location']
+        self.assertTrue(location.startswith("http://localhost:8889/locks/%s/" % name))
+        req = tornado.httpclient.HTTPRequest(self.get_url(location[len("http://localhost:8889"):]),
+                                             method='DELETE')
+        self.http_client.fetch(req, self.stop)
+        response = self.wait()
+        self.assertEqual(response.code, 204)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import tornado.testing
+from rdlm.main import get_app as rdlm_get_app
+from rdlm.main import get_ioloop as rdlm_get_ioloop
+from rdlm.lock import LockManager, Lock
+from rdlm.multilock import MultiLockManager
+from rdlm.stats import Stats, Histogram
+
+
+class StatsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = LockManager()
+        self.multilock_manager = MultiLockManager(self.manager)
+        self.stats = Stats(self.manager, self.multilock_manager)
+
+    def _add_lock(self, wait=5):
+        lock = Lock("resource1", "test case", wait, 60)
+        self.manager.add_lock("resource1", lock)
+        return lock
+
+    def test_histogram(self):
+        histogram = Histogram((1, 10))
+        for value in (0.5, 1, 5, 20):
+            histogram.observe(value)
+        lines = histogram.to_prometheus("foo")
+        self.assertEqual(lines[0:3], ['foo_bucket{le="1"} 2', 'foo_bucket{le="10"} 3',
+                                      'foo_bucket{le="+Inf"} 4'])
+        self.assertEqual(lines[-1], 'foo_count 4')
+
+    def test_outcomes(self):
+        lock1 = self._add_lock()
+        lock2 = self._add_lock()
+        lock3 = self._add_lock(wait=0)
+        self.manager.delete_lock("resource1", lock2.uid)
+        self.manager.clean_expired_locks()
+        busy_lock = Lock("resource1", "test case", 0, 60)
+        self.assertFalse(self.manager.try_lock("resource1", busy_lock))
+        self.manager.delete_lock("resource1", lock1.uid)
+        self.assertEqual(self.stats.get_outcomes(), {"acquired": 1, "timeout": 1,
+                                                     "deleted": 1, "busy": 1})
+        self.assertTrue(lock3.is_deleted())
+        self.assertTrue('rdlm_lock_releases_total{reason="released"} 1' in
+                        self.stats.to_prometheus())
+
+    def test_gauges(self):
+        self._add_lock()
+        self._add_lock()
+        self.assertEqual(self.manager.get_locks_count(), (1, 1))
+        output = self.stats.to_prometheus()
+        self.assertTrue("rdlm_resources 1\n" in output)
+        self.assertTrue("rdlm_active_locks 1\n" in output)
+        self.assertTrue("rdlm_waiting_locks 1\n" in output)
+        self.assertTrue("rdlm_lock_wait_seconds_count 1\n" in output)
+
+    def test_gauges_follow_events(self):
+        lock1 = self._add_lock()
+        lock2 = self._add_lock()
+        lock3 = self._add_lock(wait=0)
+        self.assertEqual(self.stats.get_locks_count(), (1, 2))
+        self.manager.clean_expired_locks()
+        self.assertEqual(self.stats.get_locks_count(), (1, 1))
+        self.manager.delete_lock("resource1", lock1.uid)
+        self.assertTrue(lock2.is_active())
+        self.assertTrue(lock3.is_deleted())
+        self.assertEqual(self.stats.get_locks_count(), (1, 0))
+        restored = Lock.restore("resource2", "a" * 32, "test case", 5, 60, 30,
+                                capacity=1)
+        self.assertTrue(self.manager.restore_lock(restored))
+        self.assertEqual(self.stats.get_locks_count(), (2, 0))
+        self.manager.remove_all_resources()
+        self.assertEqual(self.stats.get_locks_count(), (0, 0))
+        self.assertEqual(self.stats.get_locks_count(), self.manager.get_locks_count())
+
+    def test_multilock_counted_once(self):
+        multilock = self.multilock_manager.new_multilock(
+            '{"title": "test case", "wait": 5, "lifetime": 60, '
+            '"resources": ["resource1", "resource2", "resource3"]}')
+        self.multilock_manager.acquire(multilock)
+        self.assertTrue(multilock.is_active())
+        self.assertEqual(self.stats.get_outcomes()["acquired"], 0)
+        self.assertEqual(self.stats.get_locks_count(), (3, 0))
+        self.manager.add_lock("resource4", Lock("resource4", "test case", 5, 60))
+        self.assertEqual(self.stats.get_outcomes()["acquired"], 1)
+        self.assertEqual(self.stats.get_locks_count(), (4, 0))
+        self.multilock_manager.release(multilock.uid)
+        self.assertEqual(self.stats.get_outcomes(), {"acquired": 1, "timeout": 0,
+                                                     "deleted": 0, "busy": 0})
+        self.assertEqual(self.stats.get_locks_count(), (1, 0))
+        output = self.stats.to_prometheus()
+        self.assertTrue('rdlm_multilock_requests_total{outcome="acquired"} 1\n' in output)
+        self.assertTrue('rdlm_lock_requests_total{outcome="acquired"} 1\n' in output)
+
+
+class StatsHandlerTestCase(tornado.testing.AsyncHTTPTestCase):
+
+    def get_app(self):
+        return rdlm_get_app()
+
+    def get_new_ioloop(self):
+        return rdlm_get_ioloop()
+
+    def test_get_stats(self):
+        self.http_client.fetch(self.get_url('/stats'), self.stop)
+        response = self.wait()
+        self.assertEqual(response.code, 200)
+        self.assertTrue(response.headers['Content-Type'].startswith('text/plain'))
+        self.assertTrue(b'# TYPE rdlm_lock_requests_total counter' in response.body)
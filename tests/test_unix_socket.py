@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import shutil
+import socket
+import stat
+import tempfile
+import tornado.testing
+from tornado.httpserver import HTTPServer
+from tornado.iostream import IOStream
+from tornado.netutil import bind_unix_socket
+from rdlm.main import get_app as rdlm_get_app
+from rdlm.main import get_ioloop as rdlm_get_ioloop
+from rdlm.lock import LOCK_MANAGER_INSTANCE
+
+
+class UnixSocketTestCase(tornado.testing.AsyncTestCase):
+
+    def get_new_ioloop(self):
+        return rdlm_get_ioloop()
+
+    def setUp(self):
+        super(UnixSocketTestCase, self).setUp()
+        LOCK_MANAGER_INSTANCE.remove_all_resources()
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "rdlm.sock")
+        self.server = HTTPServer(rdlm_get_app(), io_loop=self.io_loop)
+        self.server.add_socket(bind_unix_socket(self.path, mode=0o660))
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.tmpdir)
+        LOCK_MANAGER_INSTANCE.remove_all_resources()
+        super(UnixSocketTestCase, self).tearDown()
+
+    def _request(self, stream, method, path, body=""):
+        request = "%s %s HTTP/1.1\r\nHost: localhost\r\nContent-Length: %i\r\n\r\n%s" % (
+            method, path, len(body), body)
+        stream.write(request.encode('utf-8'))
+        stream.read_until(b"\r\n\r\n", self.stop)
+        head = self.wait().decode('latin-1').split("\r\n")
+        headers = dict([x.split(": ", 1) for x in head[1:] if x])
+        length = int(headers.get("Content-Length", "0"))
+        if length > 0:
+            stream.read_bytes(length, self.stop)
+            self.wait()
+        return (int(head[0].split(" ")[1]), headers)
+
+    def test_mode(self):
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o660)
+
+    def test_relative_location(self):
+        stream = IOStream(socket.socket(socket.AF_UNIX, socket.SOCK_STREAM), io_loop=self.io_loop)
+        stream.connect(self.path, self.stop)
+        self.wait()
+        body = json.dumps({"title": "test case", "wait": 5, "lifetime": 60})
+        (code, headers) = self._request(stream, "POST", "/locks/resource1", body)
+        self.assertEqual(code, 201)
+        location = headers['Location']
+        self.assertTrue(location.startswith("/locks/resource1/"))
+        (code, headers) = self._request(stream, "DELETE", location)
+        self.assertEqual(code, 204)
+        stream.close()
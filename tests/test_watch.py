@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import socket
+import time
+import unittest
+import tornado.testing
+from tornado.iostream import IOStream
+from rdlm.main import get_app as rdlm_get_app
+from rdlm.main import get_ioloop as rdlm_get_ioloop
+from rdlm.lock import LockManager, Lock, LOCK_MANAGER_INSTANCE
+from rdlm.watch import WatchManager, WATCH_MANAGER_INSTANCE
+
+
+class WatchManagerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = LockManager()
+        self.watch_manager = WatchManager(self.manager)
+        self.events = []
+
+    def _watcher(self, event, data):
+        self.events.append((event, json.loads(data)['resource']))
+
+    def test_dispatch(self):
+        self.watch_manager.add_watcher(self._watcher, name="foo1")
+        self.watch_manager.add_watcher(self._watcher, prefix="bar")
+        lock1 = Lock("foo1", "test case", 5, 60)
+        lock2 = Lock("foo1", "test case", 5, 60)
+        self.manager.add_lock("foo1", lock1)
+        self.manager.add_lock("foo1", lock2)
+        self.manager.add_lock("foo2", Lock("foo2", "test case", 5, 60))
+        self.manager.add_lock("bar2", Lock("bar2", "test case", 5, 0))
+        self.manager.delete_lock("foo1", lock2.uid)
+        self.manager.clean_expired_locks()
+        self.manager.delete_lock("foo1", lock1.uid)
+        self.assertEqual(self.events, [("acquired", "foo1"), ("waiter_added", "foo1"),
+                                       ("acquired", "bar2"), ("waiter_removed", "foo1"),
+                                       ("expired", "bar2"), ("released", "foo1")])
+        self.watch_manager.remove_watcher(self._watcher, name="foo1")
+        self.watch_manager.remove_watcher(self._watcher, prefix="bar")
+        self.assertEqual(len(self.watch_manager), 0)
+        self.manager.add_lock("bar1", Lock("bar1", "test case", 5, 60))
+        self.assertEqual(len(self.events), 6)
+
+
+class WatchHandlerTestCase(tornado.testing.AsyncHTTPTestCase):
+
+    def get_app(self):
+        return rdlm_get_app()
+
+    def get_new_ioloop(self):
+        return rdlm_get_ioloop()
+
+    def tearDown(self):
+        LOCK_MANAGER_INSTANCE.remove_all_resources()
+        super(WatchHandlerTestCase, self).tearDown()
+
+    def _watch(self, path):
+        stream = IOStream(socket.socket(socket.AF_INET, socket.SOCK_STREAM), io_loop=self.io_loop)
+        stream.connect(('127.0.0.1', self.get_http_port()), self.stop)
+        self.wait()
+        stream.write(("GET %s HTTP/1.1\r\nHost: localhost\r\n\r\n" % path).encode('ascii'))
+        stream.read_until(b"\r\n\r\n", self.stop)
+        self.assertTrue(b" 200 " in self.wait())
+        return stream
+
+    def _read_event(self, stream):
+        # (chunked transfer encoding: chunk size, then events)
+        lines = []
+        while len(lines) == 0 or lines[-1] != "":
+            stream.read_until(b"\n", self.stop)
+            line = self.wait().decode('utf-8').rstrip("\r\n")
+            if line.startswith("event:") or line.startswith("data:") or \
+                    (line == "" and lines):
+                lines.append(line)
+        return (lines[0][7:], json.loads(lines[1][6:]))
+
+    def test_watch(self):
+        stream1 = self._watch("/watch/resource1")
+        (event, data) = self._read_event(stream1)
+        self.assertEqual((event, data['active'], data['waiting']), ("state", 0, 0))
+        stream2 = self._watch("/watch?prefix=res")
+        lock = Lock("resource1", "test case", 5, 60)
+        LOCK_MANAGER_INSTANCE.add_lock("resource1", lock)
+        LOCK_MANAGER_INSTANCE.delete_lock("resource1", lock.uid)
+        for stream in (stream1, stream2):
+            (event, data) = self._read_event(stream)
+            self.assertEqual((event, data['uid']), ("acquired", lock.uid))
+            (event, data) = self._read_event(stream)
+            self.assertEqual((event, data['uid']), ("released", lock.uid))
+            stream.close()
+        # (let the server notice closed connections)
+        self.io_loop.add_timeout(time.time() + 0.2, self.stop)
+        self.wait()
+        self.assertEqual(len(WATCH_MANAGER_INSTANCE), 0)